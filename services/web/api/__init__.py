@@ -4,47 +4,81 @@ import os
 import sys
 
 from dotenv import load_dotenv
-from flasgger import LazyJSONEncoder, LazyString, Swagger
 from flask import Flask
 
+from .apispec import init_apispec
 from .blueprints.auth.views import auth
+from .blueprints.cache import cache
+from .blueprints.client_errors import error_metrics
 from .blueprints.default.views import default
 from .blueprints.extensions import app_logger, db, jwt, swagger
-from .error_handlers import handle_bad_request
+from .blueprints.replica import init_read_replica
+from .compression import compress
+from .error_handlers import handle_bad_request, handle_internal_server_error
 from .extensions import migrate
 from .helpers import are_environment_variables_set, set_flask_environment
+from .serialization import get_json_encoder
 
 load_dotenv()
 
 
-if not are_environment_variables_set():
-    msg = 'Unable to set Environment variables. Application existing...'
-    app_logger.critical(msg)
-    sys.exit(1)
+def create_app(config=None) -> Flask:
+    """Create the application instance.
 
+    Attributes
+    ----------
+    config: str or object
+        The configuration to use, either an import path or a configuration class.
+        Defaults to the configuration for the FLASK_ENV environment.
 
-app = Flask(__name__)
-app_logger.info('Successfully created the application instance.')
-app.register_blueprint(default)
-app_logger.info('Successfully registered the default blueprint.')
-app.register_blueprint(auth)
-app_logger.info('Successfully registered the auth blueprint.')
+    Returns
+    -------
+    app: flask.Flask
+        The application instance.
+    """
+    if not are_environment_variables_set():
+        msg = 'Unable to set Environment variables. Application existing...'
+        app_logger.critical(msg)
+        sys.exit(1)
 
-app.json_encoder = LazyJSONEncoder
-swagger.init_app(app)
+    app = Flask(__name__)
+    app_logger.info('Successfully created the application instance.')
+    app.register_blueprint(default)
+    app_logger.info('Successfully registered the default blueprint.')
+    app.register_blueprint(auth)
+    app_logger.info('Successfully registered the auth blueprint.')
 
-set_flask_environment(app)
-app_logger.info('Successfully set the environment variables.')
+    swagger.init_app(app)
 
-app_logger.info(f"The configuration used is for {os.environ['FLASK_ENV']} environment.")
-app_logger.info(f"The database connection string is {app.config['SQLALCHEMY_DATABASE_URI']}.")
+    if config:
+        app.config.from_object(config)
+    else:
+        set_flask_environment(app)
+    app_logger.info('Successfully set the environment variables.')
 
-db.init_app(app=app)
-app_logger.info('Successfully initialized the database instance.')
-migrate.init_app(app, db)
-app_logger.info('Successfully initialized the migrate instance.')
-jwt.init_app(app)
-app_logger.info('Successfully initialized the JWT instance.')
+    app.json_encoder = get_json_encoder(app.config['JSON_BACKEND'])
+    app_logger.info(f'Successfully set the {app.json_encoder.__name__} JSON encoder.')
 
-app.register_error_handler(400, handle_bad_request)
-app_logger.info('Successfully registered te 400 error handler.')
+    app_logger.info(f"The configuration used is for {os.environ['FLASK_ENV']} environment.")
+    app_logger.info(f"The database is {app.config['POSTGRES_DB']} on {app.config['POSTGRES_HOST']}.")
+
+    db.init_app(app=app)
+    app_logger.info('Successfully initialized the database instance.')
+    init_read_replica(app)
+    cache.init_app(app)
+    migrate.init_app(app, db)
+    app_logger.info('Successfully initialized the migrate instance.')
+    jwt.init_app(app)
+    app_logger.info('Successfully initialized the JWT instance.')
+
+    app.register_error_handler(400, handle_bad_request)
+    app_logger.info('Successfully registered te 400 error handler.')
+
+    app.register_error_handler(500, handle_internal_server_error)
+    app.before_request(error_metrics.record_request)
+    app_logger.info('Successfully registered the 500 error handler and the error metrics.')
+
+    init_apispec(app)
+    compress.init_app(app)
+
+    return app
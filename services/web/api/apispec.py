@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""This module serves the API spec from a copy built once, instead of on every request."""
+import hashlib
+import json
+import os
+
+from flasgger import LazyJSONEncoder
+from flask import current_app, request
+
+from .blueprints.conditional import conditional_response, make_etag
+from .blueprints.extensions import app_logger, swagger
+
+SPEC_NAME = 'apispec'
+SPEC_ENDPOINT = f'flasgger.{SPEC_NAME}'
+SPEC_HOST_PLACEHOLDER = 'apispec-host.invalid'
+SPEC_MAX_AGE = 300
+
+
+def build_apispec(app) -> bytes:
+    """Assemble the API spec from the routes and their YAML docs.
+
+    The host is left as a placeholder, to be replaced with the host of each
+    request.
+
+    Attributes
+    ----------
+    app: flask.Flask
+        The flask application object
+
+    Returns
+    -------
+    apispec: bytes
+        The API spec, as JSON.
+    """
+    with app.test_request_context(base_url=f'http://{SPEC_HOST_PLACEHOLDER}'):
+        spec = dict(swagger.get_apispecs(endpoint=SPEC_NAME))
+        spec['host'] = SPEC_HOST_PLACEHOLDER
+        return json.dumps(spec, cls=LazyJSONEncoder, sort_keys=True, separators=(',', ':')).encode()
+
+
+def write_apispec(app, path: str) -> None:
+    """Build the API spec and write it to the given path, to be loaded with APISPEC_PATH."""
+    with open(path, 'wb') as f:
+        f.write(build_apispec(app))
+
+
+def init_apispec(app) -> None:
+    """Build or load the API spec once and serve it from memory.
+
+    The spec is loaded from the file at APISPEC_PATH, if there is one, and is
+    otherwise built from the routes.
+    """
+    path = app.config.get('APISPEC_PATH')
+    if path and os.path.exists(path):
+        with open(path, 'rb') as f:
+            apispec = f.read()
+        app_logger.info(f'Successfully loaded the API spec from {path}.')
+    else:
+        apispec = build_apispec(app)
+        app_logger.info('Successfully built the API spec.')
+
+    head, host, tail = apispec.partition(json.dumps(SPEC_HOST_PLACEHOLDER).encode())
+    app.extensions['apispec'] = {
+        'head': head,
+        'has_host': bool(host),
+        'tail': tail,
+        'digest': hashlib.sha1(apispec).hexdigest()
+    }
+    app.view_functions[SPEC_ENDPOINT] = serve_apispec
+
+
+def serve_apispec():
+    """Serve the API spec, with the host of the request."""
+    apispec = current_app.extensions['apispec']
+
+    def load():
+        body = apispec['head']
+        if apispec['has_host']:
+            body += json.dumps(request.host).encode() + apispec['tail']
+        return current_app.response_class(body, mimetype='application/json')
+
+    response = conditional_response(load, make_etag(apispec['digest'], request.host))
+    response.headers['Cache-Control'] = f'public, max-age={SPEC_MAX_AGE}'
+
+    return response
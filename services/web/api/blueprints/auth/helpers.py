@@ -1,17 +1,13 @@
 # -*- coding: utf-8 -*-
 """This module has methods that are used in the other modules in this package."""
-import re
-
 from flask import jsonify
-from flask_jwt_extended import create_access_token, create_refresh_token
-
-from ..constants import (
-    EMAIL_MAX_LENGTH,
-    NAME_MAX_LENGTH,
-    NAME_MIN_LENGTH,
-    PASSWORD_MAX_LENGTH,
-    PASSWORD_MIN_LENGTH,
-)
+from flask_jwt_extended import create_access_token, create_refresh_token, get_jwt, get_jwt_identity
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+
+from ..client_errors import log_client_error
+from ..conditional import conditional_response, make_etag
 from ..exceptions import (
     AdminDoesNotExists,
     AdminExists,
@@ -24,6 +20,8 @@ from ..exceptions import (
     EmptyAdminData,
     InvalidAdminPassword,
     InvalidEmailAddressFormat,
+    InvalidPageCursor,
+    InvalidPageLimit,
     MissingEmailData,
     MissingEmailKey,
     MissingNameData,
@@ -33,20 +31,19 @@ from ..exceptions import (
     NonDictionaryAdminData,
     NonStringData,
 )
-from ..extensions import app_logger, db
-from .models import Admin
+from ..extensions import db
+from ..pagination import page_etag, paginate
+from ..replica import get_read_session
+from ..validation import ADMIN_LOGIN_SCHEMA, ADMIN_SCHEMA, ADMIN_UPDATE_SCHEMA, EMAIL_PATTERN
+from .models import Admin, AdminRow
 
 
 def check_if_admin_exists_with_id(admin_id: int) -> bool:
     """Check if the admin with the given admin_id exists."""
     if not admin_id:
-        msg = 'When checking if admin exists using their id, the admin_id was null.'
-        app_logger.exception(msg)
         raise ValueError('The admin_id has to be provided.')
 
     if not isinstance(admin_id, int):
-        msg = 'When checking if admin exists using their id, the admin_id was not an integer.'
-        app_logger.exception(msg)
         raise ValueError('The admin_id has to be an integer')
 
     admin = Admin.query.filter_by(id=admin_id).first()
@@ -60,13 +57,9 @@ def check_if_admin_exists_with_id(admin_id: int) -> bool:
 def check_if_admin_exists(admin_email: str) -> bool:
     """Check if the admin with the given admin_email exists."""
     if not admin_email:
-        msg = 'When checking if admin exists using their email, the admin_email was null.'
-        app_logger.exception(msg)
         raise ValueError('The admin_email has to be provided.')
 
     if not isinstance(admin_email, str):
-        msg = 'When checking if admin exists using their email, the admin_email was not a string.'
-        app_logger.exception(msg)
         raise ValueError('The admin_email has to be an integer')
 
     admin = Admin.query.filter_by(email=admin_email).first()
@@ -80,13 +73,9 @@ def check_if_admin_exists(admin_email: str) -> bool:
 def check_if_admin_with_name_exists(admin_name: str) -> bool:
     """Check if the admin with the given admin_name exists."""
     if not admin_name:
-        msg = 'When checking if admin exists using their name, the admin_name was null.'
-        app_logger.exception(msg)
         raise ValueError('The admin_name has to be provided.')
 
     if not isinstance(admin_name, str):
-        msg = 'When checking if admin exists using their name, the admin_name was not a string.'
-        app_logger.exception(msg)
         raise ValueError('The admin_name has to be string')
 
     admin = Admin.query.filter_by(name=admin_name).first()
@@ -100,19 +89,12 @@ def check_if_admin_with_name_exists(admin_name: str) -> bool:
 def is_email_address_format_valid(email_address: str) -> bool:
     """Check that the email address format is valid."""
     if not email_address:
-        msg = 'When checking if an email address format is valid, the admin_email was null.'
-        app_logger.exception(msg)
         raise ValueError('The email_address cannot be an empty value')
 
     if not isinstance(email_address, str):
-        msg = 'When checking if an email address format is valid, the admin_email was not a string.'
-        app_logger.exception(msg)
         raise ValueError('The email_address must be a string')
 
-    #  Regular expression for validating an Email
-    regex = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-
-    if re.fullmatch(regex, email_address):
+    if EMAIL_PATTERN.fullmatch(email_address):
         return True
 
     return False
@@ -120,116 +102,55 @@ def is_email_address_format_valid(email_address: str) -> bool:
 
 def is_admin_name_valid(admin_name: str) -> bool:
     """Check if the admin name is valid."""
-    if not admin_name:
-        msg = 'When checking if admin_name is valid, the admin_name was null.'
-        app_logger.exception(msg)
-        raise ValueError('The admin_name has to be provided.')
-
-    if not isinstance(admin_name, str):
-        msg = 'When checking if admin_name is valid, the admin_name was not a string.'
-        app_logger.exception(msg)
-        raise ValueError('The admin_name has to be string')
-
-    if len(admin_name) >= NAME_MAX_LENGTH:
-        msg = 'When checking if admin_name is valid, the admin_name was too long.'
-        app_logger.exception(msg)
-        raise AdminNameTooLong(f'The admin_name has to be less than {NAME_MAX_LENGTH}')
-
-    if len(admin_name) <= NAME_MIN_LENGTH:
-        msg = 'When checking if admin_name is valid, the admin_name was too short.'
-        app_logger.exception(msg)
-        raise AdminNameTooShort(f'The admin_name has to be more than {NAME_MIN_LENGTH}')
-
-    if not admin_name.isalnum():
-        msg = 'When checking if admin_name is valid, he admin_name was not alphanumeric.'
-        app_logger.exception(msg)
-        raise ValueError('The admin_name has to be alphanumeric.')
+    ADMIN_SCHEMA['name'].validate(admin_name)
 
     return True
 
 
 def is_admin_password_valid(admin_password: str):
     """Check if the admin_password is valid."""
-    if not admin_password:
-        msg = 'When checking if admin_password is valid, the admin_password was null.'
-        app_logger.exception(msg)
-        raise MissingPasswordData('The admin_password has to be provided.')
-
-    if not isinstance(admin_password, str):
-        msg = 'When checking if admin_password is valid, the admin_password was not a string.'
-        app_logger.exception(msg)
-        raise NonStringData('The admin_password has to be string')
-
-    if len(admin_password) >= PASSWORD_MAX_LENGTH:
-        msg = 'When checking if admin_password is valid, the admin_password was too long.'
-        app_logger.exception(msg)
-        raise AdminPasswordTooLong(f'The admin_password has to be less than {PASSWORD_MAX_LENGTH}')
-
-    if len(admin_password) <= PASSWORD_MIN_LENGTH:
-        msg = 'When checking if admin_password is valid, the admin_password was too short.'
-        app_logger.exception(msg)
-        raise AdminPaswordTooShort(f'The admin_password has to be more than {PASSWORD_MIN_LENGTH}')
-
-    if admin_password.isalnum():
-        msg = 'When checking if admin_password is valid, he admin_password was not alphanumeric.'
-        app_logger.exception(msg)
-        raise AdminPasswordNotAlphaNumeric('The admin_password has to be alphanumeric.')
+    ADMIN_SCHEMA['password'].validate(admin_password)
 
     return True
 
 
 def log_in_admin(admin_data):
     """Log in an admin."""
-    if not admin_data:
-        app_logger.exception('When creating a new admin, the admin_data was empty.')
-        raise EmptyAdminData('The admin data cannot be empty.')
+    ADMIN_LOGIN_SCHEMA.validate(admin_data)
 
-    if not isinstance(admin_data, dict):
-        app_logger.exception('When creating a new admin, the admin_data was nota dictionary.')
-        raise NonDictionaryAdminData('admin_data must be a dict')
+    admin = Admin.query.filter_by(email=admin_data['email']).first()
+    if admin:
+        if admin_data['password'] == admin.password:
+            claims = {'name': admin.name}
+            access_token = create_access_token(admin.id, additional_claims=claims)
+            refresh_token = create_refresh_token(admin.id, additional_claims=claims)
+            admin_data = admin.get_admin()
+            admin_data['access token'] = access_token
+            admin_data['refresh token'] = refresh_token
+
+            return admin_data
+        raise InvalidAdminPassword('The admin password is invalid!')
+    raise AdminDoesNotExists('That Admin does not exist!')
 
-    if 'email' not in admin_data.keys():
-        app_logger.exception('When creating a new admin, the email key was missing from the admin_data.')
-        raise MissingEmailKey('The email is missing from the admin data')
 
-    if not admin_data['email']:
-        app_logger.exception('When creating a new admin, the email data was missing from the admin_data.')
-        raise MissingEmailData('The email data is missing')
+def create_refreshed_access_token(admin_id: int) -> str:
+    """Create a new access token for the admin, with the admin's current name.
 
-    if len(admin_data['email']) >= EMAIL_MAX_LENGTH:
-        app_logger.exception(f'When creating a new admin, the email key was longer than {EMAIL_MAX_LENGTH}.')
-        raise EmailAddressTooLong(f'The email address should be less than {EMAIL_MAX_LENGTH} characters!')
+    The name is read again rather than copied from the refresh token, so a
+    renamed admin's new tokens, and the log lines using them, get the new name.
+    """
+    name = db.session.execute(select(Admin.name).where(Admin.id == admin_id)).scalar()
 
-    if not is_email_address_format_valid(admin_data['email']):
-        app_logger.exception('When creating a new admin, the email address format was invalid.')
-        raise InvalidEmailAddressFormat('The email address is invalid')
+    return create_access_token(identity=admin_id, additional_claims={'name': name})
 
-    if 'password' not in admin_data.keys():
-        app_logger.exception('When creating a new admin, the password key was missing from the admin_data.')
-        raise MissingPasswordKey('The password is missing from the admin data')
 
-    if not admin_data['password']:
-        app_logger.exception('When creating a new admin, the password data was missing from the admin_data.')
-        raise MissingPasswordData('The password data is missing')
+def get_admin_name() -> str:
+    """Get the name of the admin making the request.
 
-    try:
-        is_admin_password_valid(admin_data['password'])
-    except ValueError as e:
-        raise e
-
-    if check_if_admin_exists(admin_data['email']):
-        admin = Admin.query.filter_by(email=admin_data['email']).first()
-        if admin:
-            if admin_data['password'] == admin.password:
-                access_token = create_access_token(admin.id)
-                refresh_token = create_refresh_token(admin.id)
-                admin_data = admin.get_admin()
-                admin_data['access token'] = access_token
-                admin_data['refresh token'] = refresh_token
-
-                return admin_data
-            raise InvalidAdminPassword('The admin password is invalid!')
-    raise AdminDoesNotExists('That Admin does not exist!')
+    The name is read from the claims of the admin's token, so no query is made.
+    Tokens issued before the name claim was added fall back to the admin's id.
+    """
+    return get_jwt().get('name') or f'with id {get_jwt_identity()}'
 
 
 def handle_log_in_admin(admin_data: dict) -> dict:
@@ -251,79 +172,49 @@ def handle_log_in_admin(admin_data: dict) -> dict:
         AdminPaswordTooShort,
         AdminPasswordTooLong,
         AdminPasswordNotAlphaNumeric,
+        NonStringData,
         InvalidAdminPassword,
         AdminDoesNotExists
     ) as e:
-        app_logger.exception(e)
+        log_client_error(e)
         return jsonify({'error': str(e)}), 400
     else:
         return data, 200
 
 
-def create_new_admin(admin_data: dict) -> dict:  # pylint: disable=R0912
-    """Create a new admin."""
-    if not admin_data:
-        app_logger.exception('When creating a new admin, the admin_data was empty.')
-        raise EmptyAdminData('The admin data cannot be empty.')
-
-    if not isinstance(admin_data, dict):
-        app_logger.exception('When creating a new admin, the admin_data was nota dictionary.')
-        raise NonDictionaryAdminData('admin_data must be a dict')
-
-    if 'email' not in admin_data.keys():
-        app_logger.exception('When creating a new admin, the email key was missing from the admin_data.')
-        raise MissingEmailKey('The email is missing from the admin data')
-
-    if not admin_data['email']:
-        app_logger.exception('When creating a new admin, the email data was missing from the admin_data.')
-        raise MissingEmailData('The email data is missing')
-
-    if len(admin_data['email']) >= EMAIL_MAX_LENGTH:
-        app_logger.exception(f'When creating a new admin, the email key was longer than {EMAIL_MAX_LENGTH}.')
-        raise EmailAddressTooLong(f'The email address should be less than {EMAIL_MAX_LENGTH} characters!')
-
-    if not is_email_address_format_valid(admin_data['email']):
-        app_logger.exception('When creating a new admin, the email address format was invalid.')
-        raise InvalidEmailAddressFormat('The email address is invalid')
+def get_admin_conflict(admin_data: dict, admin_id: int = None) -> AdminExists:
+    """Get the error for an admin data whose email or name is used by another admin.
 
-    if 'name' not in admin_data.keys():
-        app_logger.exception('When creating a new admin, the name key was missing from the admin_data.')
-        raise MissingNameKey('The name is missing from the admin data')
+    It is only called once the database has rejected the data, to tell which
+    of the unique columns it conflicts on.
+    """
+    statement = select(Admin.id).where(Admin.email == admin_data.get('email'))
+    if admin_id:
+        statement = statement.where(Admin.id != admin_id)
 
-    if not admin_data['name']:
-        app_logger.exception('When creating a new admin, the name data was missing from the admin_data.')
-        raise MissingNameData('The name data is missing')
+    if 'email' in admin_data and db.session.execute(statement).first():
+        return AdminExists(f'The email adress {admin_data["email"]} is already in use.')
 
-    if 'password' not in admin_data.keys():
-        app_logger.exception('When creating a new admin, the password key was missing from the admin_data.')
-        raise MissingPasswordKey('The password is missing from the admin data')
-
-    if not admin_data['password']:
-        app_logger.exception('When creating a new admin, the password data was missing from the admin_data.')
-        raise MissingPasswordData('The password data is missing')
-
-    is_admin_name_valid(admin_data['name'])
-
-    try:
-        is_admin_password_valid(admin_data['password'])
-    except ValueError as e:
-        raise e
+    return AdminExists(f'The name {admin_data["name"]} is already in use.')
 
-    if check_if_admin_exists(admin_data['email']):
-        app_logger.exception('When creating a new admin, the admin was found to already exist.')
-        raise AdminExists(f'The email adress {admin_data["email"]} is already in use.')
 
-    if check_if_admin_with_name_exists(admin_data['name']):
-        app_logger.exception('When creating a new admin, the admin was found to already exist.')
-        raise AdminExists(f'The name {admin_data["name"]} is already in use.')
-
-    admin = Admin(email=admin_data['email'], name=admin_data['name'],
-                  password=admin_data['password'])
-
-    db.session.add(admin)
+def create_new_admin(admin_data: dict) -> dict:
+    """Create a new admin."""
+    ADMIN_SCHEMA.validate(admin_data)
+
+    statement = (
+        insert(Admin.__table__)
+        .values(email=admin_data['email'], name=admin_data['name'], password=admin_data['password'])
+        .on_conflict_do_nothing()
+        .returning(Admin.id, Admin.email, Admin.name)
+    )
+    admin = db.session.execute(statement).first()
     db.session.commit()
 
-    return admin.get_admin()
+    if not admin:
+        raise get_admin_conflict(admin_data)
+
+    return admin._asdict()
 
 
 def handle_create_admin(request_data: dict):
@@ -345,43 +236,47 @@ def handle_create_admin(request_data: dict):
         AdminPasswordTooLong,
         AdminNameTooShort,
         AdminNameTooLong,
-        MissingPasswordData
+        AdminPaswordTooShort,
+        MissingPasswordData,
+        NonStringData,
+        ValueError
     ) as e:
-        app_logger.exception(e)
+        log_client_error(e)
         return jsonify({'error': str(e)}), 400
     else:
         return new_admin, 201
 
 
-def get_admin(admin_id: int) -> dict:
-    """Get the admin with the given id."""
+def get_admin(admin_id: int) -> tuple:
+    """Get the admin with the given id, and its version."""
     if not admin_id:
         raise EmptyAdminData('The admin_id has to be provided.')
 
     if not isinstance(admin_id, int):
         raise ValueError('The admin_id has to be an integer.')
 
-    if not check_if_admin_exists_with_id(admin_id):
-        raise AdminDoesNotExists(f'The admin with id {admin_id} does not exist.')
+    statement = select(Admin.email, Admin.name, Admin.version).where(Admin.id == admin_id)
+    row = get_read_session().execute(statement).first()
 
-    admin = Admin.query.filter_by(id=admin_id).first()
+    if not row:
+        raise AdminDoesNotExists(f'The admin with id {admin_id} does not exist.')
 
-    return admin.get_admin()
+    return {'id': admin_id, 'email': row.email, 'name': row.name}, row.version
 
 
 def handle_get_admin(admin_id: int):
     """Handle the GET request to the /admin route."""
     try:
-        admin = get_admin(admin_id)
+        admin, version = get_admin(admin_id)
     except (
         ValueError,
         EmptyAdminData,
         AdminDoesNotExists
     ) as e:
-        app_logger.exception(e)
+        log_client_error(e)
         return jsonify({'error': str(e)}), 400
     else:
-        return admin, 200
+        return conditional_response(lambda: admin, make_etag(Admin.__tablename__, admin_id, version))
 
 
 def delete_admin(admin_id: int) -> dict:
@@ -392,14 +287,14 @@ def delete_admin(admin_id: int) -> dict:
     if not isinstance(admin_id, int):
         raise ValueError('The admin_id has to be an integer.')
 
-    if not check_if_admin_exists_with_id(admin_id):
-        raise AdminDoesNotExists(f'The admin with id {admin_id} does not exist.')
-
-    admin = Admin.query.filter_by(id=admin_id).first()
-    db.session.delete(admin)
+    statement = delete(Admin.__table__).where(Admin.id == admin_id).returning(Admin.id, Admin.email, Admin.name)
+    admin = db.session.execute(statement).first()
     db.session.commit()
 
-    return admin.get_admin()
+    if not admin:
+        raise AdminDoesNotExists(f'The admin with id {admin_id} does not exist.')
+
+    return admin._asdict()
 
 
 def handle_delete_admin(admin_id: int):
@@ -411,13 +306,13 @@ def handle_delete_admin(admin_id: int):
         EmptyAdminData,
         AdminDoesNotExists
     ) as e:
-        app_logger.exception(e)
+        log_client_error(e)
         return jsonify({'error': str(e)}), 400
     else:
         return admin, 200
 
 
-def update_admin(admin_id: int, admin_data: dict) -> dict:  # pylint: disable=R0912
+def update_admin(admin_id: int, admin_data: dict) -> dict:
     """Update the admin with the given id."""
     if not admin_id:
         raise EmptyAdminData('The admin_id has to be provided.')
@@ -425,47 +320,26 @@ def update_admin(admin_id: int, admin_data: dict) -> dict:  # pylint: disable=R0
     if not isinstance(admin_id, int):
         raise ValueError('The admin_id has to be an integer.')
 
-    if not check_if_admin_exists_with_id(admin_id):
-        raise AdminDoesNotExists(f'The admin with id {admin_id} does not exist.')
-
-    if not admin_data:
-        raise EmptyAdminData('The admin data cannot be empty.')
+    ADMIN_UPDATE_SCHEMA.validate(admin_data)
 
-    if not isinstance(admin_data, dict):
-        raise NonDictionaryAdminData('admin_data must be a dict')
-
-    for key in admin_data.keys():
-        valid_keys = ['name', 'email', 'password']
-        if key not in valid_keys:
-            raise KeyError(f'Invalid key {key}. The valid keys are {valid_keys}.')
-
-    if 'email' in admin_data.keys():
-        is_email_address_format_valid(admin_data['email'])
-
-        if len(admin_data['email']) >= EMAIL_MAX_LENGTH:
-            raise EmailAddressTooLong('The email address is too long')
-
-        if check_if_admin_exists(admin_data['email']):
-            raise AdminExists(f'The email adress {admin_data["email"]} is already in use.')
-
-    if 'password' in admin_data.keys():
-        is_admin_password_valid(admin_data['password'])
-
-    if 'name' in admin_data.keys():
-        is_admin_name_valid(admin_data['name'])
-        if check_if_admin_with_name_exists(admin_data['name']):
-            raise AdminExists(f'The name {admin_data["name"]} is already in use.')
+    values = {column: admin_data[column] for column in ('email', 'name', 'password') if column in admin_data}
+    statement = (
+        update(Admin.__table__)
+        .where(Admin.id == admin_id)
+        .values(version=Admin.version + 1, **values)
+        .returning(Admin.id, Admin.email, Admin.name)
+    )
+    try:
+        admin = db.session.execute(statement).first()
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        raise get_admin_conflict(admin_data, admin_id) from e
 
-    admin = Admin.query.filter_by(id=admin_id).first()
-    if 'email' in admin_data.keys():
-        admin.email = admin_data['email']
-    if 'password' in admin_data.keys():
-        admin.password = admin_data['password']
-    if 'name' in admin_data.keys():
-        admin.name = admin_data['name']
-    db.session.commit()
+    if not admin:
+        raise AdminDoesNotExists(f'The admin with id {admin_id} does not exist.')
 
-    return admin.get_admin()
+    return admin._asdict()
 
 
 def handle_update_admin(admin_id: int, admin_data: dict):
@@ -485,11 +359,42 @@ def handle_update_admin(admin_id: int, admin_data: dict):
         MissingNameKey,
         MissingEmailKey,
         NonDictionaryAdminData,
+        AdminPaswordTooShort,
+        AdminPasswordTooLong,
+        AdminPasswordNotAlphaNumeric,
+        NonStringData,
+        KeyError,
         ValueError,
         EmptyAdminData,
         AdminDoesNotExists
     ) as e:
-        app_logger.exception(e)
+        log_client_error(e)
         return jsonify({'error': str(e)}), 400
     else:
         return admin, 200
+
+
+def get_all_admins(limit: str = None, cursor: str = None) -> dict:
+    """Get a single page of admins, ordered by their id.
+
+    Only the public columns are selected, so the admins are neither loaded as
+    full Admin objects nor do their passwords leave the database.
+    """
+    rows, metadata = paginate(get_read_session().query(*AdminRow.columns), Admin.id, limit, cursor)
+
+    return {'admins': [AdminRow(row) for row in rows], 'metadata': metadata}
+
+
+def handle_get_all_admins(limit: str = None, cursor: str = None):
+    """Handle the GET request to the /admins route."""
+    try:
+        etag = page_etag(get_read_session(), Admin.id, Admin.version, limit, cursor)
+        response = conditional_response(lambda: get_all_admins(limit, cursor), etag)
+    except (
+        InvalidPageLimit,
+        InvalidPageCursor
+    ) as e:
+        log_client_error(e)
+        return jsonify({'error': str(e)}), 400
+    else:
+        return response
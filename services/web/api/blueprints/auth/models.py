@@ -20,6 +20,8 @@ class Admin(db.Model):
         The admin user's name.
     password: str
         The Admin user's password.
+    version: int
+        Incremented every time the admin is updated
 
     """
 
@@ -29,6 +31,7 @@ class Admin(db.Model):
     email: str = db.Column(db.String(EMAIL_MAX_LENGTH), unique=True, nullable=False)
     name: str = db.Column(db.String(NAME_MAX_LENGTH), unique=True, nullable=False)
     password: str = db.Column(db.String(PASSWORD_MAX_LENGTH), nullable=False)
+    version = db.Column(db.Integer, default=1, server_default='1', nullable=False)
 
     def __init__(self, email: str, name: str, password: str) -> None:
         """Create a new admin.
@@ -49,3 +52,18 @@ class Admin(db.Model):
         """Get user data."""
         user = dict(id=self.id, email=self.email, name=self.name)
         return user
+
+
+class AdminRow():
+    """A read only admin, holding only the public columns.
+
+    Unlike an Admin, it is not tracked by the session, and its attributes are
+    kept in slots instead of a dict.
+    """
+
+    __slots__ = ('id', 'email', 'name')
+    columns = (Admin.id, Admin.email, Admin.name)
+
+    def __init__(self, row) -> None:
+        """Create the admin from a row of the selected columns."""
+        self.id, self.email, self.name = row
@@ -2,13 +2,20 @@
 """This module contains the routes associated with the auth Blueprint."""
 from json import JSONDecodeError
 
-from api.blueprints.auth.models import Admin
 from flasgger import swag_from
-from flask import Blueprint, jsonify, request
-from flask_jwt_extended import create_access_token, get_jwt_identity, jwt_required
+from flask import Blueprint, jsonify, make_response, request
+from flask_jwt_extended import get_jwt_identity, jwt_required
 
+from ..client_errors import log_client_error
 from ..extensions import app_logger
-from .helpers import handle_create_admin, handle_get_admin, handle_log_in_admin, handle_update_admin
+from .helpers import (
+    create_refreshed_access_token,
+    handle_create_admin,
+    handle_get_admin,
+    handle_get_all_admins,
+    handle_log_in_admin,
+    handle_update_admin,
+)
 
 auth = Blueprint('auth', __name__, template_folder='templates',
                  static_folder='static', url_prefix='/auth')
@@ -21,7 +28,7 @@ def register():
     try:
         data = request.json
     except JSONDecodeError as e:
-        print(e)
+        log_client_error(e)
         return str(e), 400
     else:
         return handle_create_admin(data)
@@ -34,7 +41,7 @@ def login():
     try:
         data = request.json
     except JSONDecodeError as e:
-        print(e)
+        log_client_error(e)
         return str(e), 400
     else:
         return handle_log_in_admin(data)
@@ -45,8 +52,7 @@ def login():
 @swag_from("./docs/refresh_token.yml", endpoint='auth.refresh', methods=['GET'])
 def refresh():
     """Generate a refresh token."""
-    identity = get_jwt_identity()
-    access_token = create_access_token(identity=identity)
+    access_token = create_refreshed_access_token(get_jwt_identity())
     return jsonify(access_token=access_token), 200
 
 
@@ -70,7 +76,7 @@ def update_admin():
         data = request.json
         admin_id = get_jwt_identity()
     except JSONDecodeError as e:
-        print(e)
+        log_client_error(e)
         return str(e), 400
     else:
         return handle_update_admin(admin_id, data)
@@ -88,7 +94,10 @@ def delete_admin():
 @auth.route('/admins', methods=['GET'])
 @swag_from("./docs/get_all_admins.yml", endpoint='auth.get_all_admins', methods=['GET'])
 def get_all_admins():
-    """Get all admins."""
-    admins = Admin.query.all(), 200
-    app_logger.info("Successfully handled a GET request to the '/admins' route. Returning all the admins.")
-    return jsonify(admins), 200
+    """Get a page of admins."""
+    limit = request.args.get('limit')
+    cursor = request.args.get('next')
+    response = make_response(handle_get_all_admins(limit, cursor))
+    if response.status_code < 400:
+        app_logger.info("Successfully handled a GET request to the '/admins' route. Returning a page of admins.")
+    return response
@@ -0,0 +1,401 @@
+# -*- coding: utf-8 -*-
+"""This module contains the cache used to serve the hot read only routes."""
+import fnmatch
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+from .extensions import app_logger
+
+SHARED_CACHE_CLEAR_BATCH_SIZE = 500
+INVALIDATED = {}
+
+
+class LRUCache():
+    """An in process cache that evicts the least recently used entries.
+
+    Every process has its own entries, so an update only invalidates the cache
+    of the worker that served it. It is only safe with a single worker.
+
+    Attributes
+    ----------
+    max_entries: int
+        The most entries kept, after which the least recently used one is evicted.
+    ttl: float
+        The seconds an entry is served for.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 60):
+        """Create the cache."""
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__metrics = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+    def get(self, key: str):
+        """Get the value cached under the key, or None if there is none."""
+        now = time.monotonic()
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                self.__metrics['misses'] += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at <= now:
+                del self.__entries[key]
+                self.__metrics['expirations'] += 1
+                self.__metrics['misses'] += 1
+                return None
+
+            self.__entries.move_to_end(key)
+            self.__metrics['hits'] += 1
+            return value
+
+    def set(self, key: str, value) -> None:
+        """Cache the value under the key."""
+        with self.__lock:
+            self.__set(key, value)
+
+    def add(self, key: str, value) -> bool:
+        """Cache the value under the key, unless the key holds an entry that has not expired."""
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                return False
+
+            self.__set(key, value)
+            return True
+
+    def delete(self, *keys: str) -> None:
+        """Remove the keys from the cache."""
+        with self.__lock:
+            for key in keys:
+                self.__entries.pop(key, None)
+
+    def invalidate(self, *keys: str) -> None:
+        """Replace the entries of the keys with INVALIDATED, so add cannot cache them for ttl seconds."""
+        for key in keys:
+            self.set(key, INVALIDATED)
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        with self.__lock:
+            self.__entries.clear()
+
+    def metrics(self) -> dict:
+        """Return the hits, misses, evictions and expirations, and the number of entries."""
+        with self.__lock:
+            return dict(self.__metrics, entries=len(self.__entries))
+
+    def __set(self, key: str, value) -> None:
+        """Cache the value under the key, evicting the least recently used entries. The lock must be held."""
+        self.__entries[key] = (value, time.monotonic() + self.ttl)
+        self.__entries.move_to_end(key)
+        while len(self.__entries) > self.max_entries:
+            self.__entries.popitem(last=False)
+            self.__metrics['evictions'] += 1
+
+
+class LocalSharedClient():
+    """An in memory stand in for the client of a shared cache server, used for testing.
+
+    It implements the get, set, delete, scan_iter and pipeline commands of a Redis client.
+    """
+
+    def __init__(self):
+        """Create the client."""
+        self.__values = {}
+        self.__lock = threading.Lock()
+
+    def get(self, key: str):
+        """Get the value of the key, or None if it is missing or has expired."""
+        with self.__lock:
+            value, expires_at = self.__values.get(key, (None, None))
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self.__values[key]
+                return None
+            return value
+
+    def set(self, key: str, value: bytes, ex: int = None, nx: bool = False):  # pylint: disable=C0103
+        """Set the value of the key, expiring after ex seconds, only if it is missing with nx."""
+        now = time.monotonic()
+        with self.__lock:
+            _, expires_at = self.__values.get(key, (None, None))
+            if nx and key in self.__values and (expires_at is None or expires_at > now):
+                return None
+
+            self.__values[key] = (value, now + ex if ex else None)
+            return True
+
+    def delete(self, *keys: str) -> None:
+        """Delete the keys."""
+        with self.__lock:
+            for key in keys:
+                self.__values.pop(key, None)
+
+    def scan_iter(self, match: str = '*'):
+        """Iterate over the keys matching the glob style pattern."""
+        with self.__lock:
+            keys = list(self.__values)
+
+        return (key for key in keys if fnmatch.fnmatchcase(key, match))
+
+    def pipeline(self, transaction: bool = True):  # pylint: disable=W0613
+        """Create a pipeline that queues the set commands until it is executed."""
+        return LocalSharedPipeline(self)
+
+
+class LocalSharedPipeline():
+    """The pipeline of the LocalSharedClient."""
+
+    def __init__(self, client: LocalSharedClient):
+        """Create the pipeline."""
+        self.client = client
+        self.__commands = []
+
+    def set(self, *args, **kwargs) -> None:
+        """Queue a set command."""
+        self.__commands.append((args, kwargs))
+
+    def execute(self) -> list:
+        """Run the queued commands, returning their results."""
+        commands, self.__commands = self.__commands, []
+        return [self.client.set(*args, **kwargs) for args, kwargs in commands]
+
+
+class SharedCache():
+    """A cache kept on a server shared by all the workers, such as Redis.
+
+    The server evicts the entries itself, so only the hits and misses are counted.
+    The server being unreachable does not fail the requests: a get is counted
+    as an error and a miss, so the value is read from the database, and a
+    failed write is logged and skipped.
+
+    Attributes
+    ----------
+    client: object
+        A client with the get, set, delete, scan_iter and pipeline commands of a Redis client.
+    ttl: float
+        The seconds an entry is served for.
+    prefix: str
+        Prepended to every key, so the cache can share a server.
+    errors: tuple
+        The exceptions the client raises when the server is unreachable or times out.
+    """
+
+    def __init__(self, client, ttl: float = 60, prefix: str = 'api:', errors: tuple = (ConnectionError, TimeoutError)):
+        """Create the cache."""
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.errors = errors
+        self.__lock = threading.Lock()
+        self.__metrics = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'errors': 0}
+
+    def get(self, key: str):
+        """Get the value cached under the key, or None if there is none or the server is unreachable."""
+        try:
+            value = self.client.get(self.prefix + key)
+        except self.errors as e:
+            self.__record_error('get', key, e)
+            value = None
+
+        with self.__lock:
+            self.__metrics['misses' if value is None else 'hits'] += 1
+
+        return None if value is None else json.loads(value)
+
+    def set(self, key: str, value) -> None:
+        """Cache the value under the key."""
+        try:
+            self.client.set(self.prefix + key, json.dumps(value).encode(), ex=max(int(self.ttl), 1))
+        except self.errors as e:
+            self.__record_error('set', key, e)
+
+    def add(self, key: str, value) -> bool:
+        """Cache the value under the key, unless the key holds an entry, with SET NX."""
+        try:
+            return bool(self.client.set(self.prefix + key, json.dumps(value).encode(), ex=max(int(self.ttl), 1),
+                                        nx=True))
+        except self.errors as e:
+            self.__record_error('add', key, e)
+            return False
+
+    def delete(self, *keys: str) -> None:
+        """Remove the keys from the cache."""
+        if not keys:
+            return
+
+        try:
+            self.client.delete(*[self.prefix + key for key in keys])
+        except self.errors as e:
+            self.__record_error('delete', keys[0], e)
+
+    def invalidate(self, *keys: str) -> None:
+        """Replace the entries of the keys with INVALIDATED, so add cannot cache them for ttl seconds."""
+        if not keys:
+            return
+
+        data = json.dumps(INVALIDATED).encode()
+        try:
+            pipeline = self.client.pipeline(transaction=False)
+            for key in keys:
+                pipeline.set(self.prefix + key, data, ex=max(int(self.ttl), 1))
+            pipeline.execute()
+        except self.errors as e:
+            self.__record_error('invalidate', keys[0], e)
+
+    def clear(self) -> None:
+        """Remove every entry of the cache, leaving the other keys on the server."""
+        keys = []
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            keys.append(key)
+            if len(keys) == SHARED_CACHE_CLEAR_BATCH_SIZE:
+                self.client.delete(*keys)
+                keys = []
+
+        if keys:
+            self.client.delete(*keys)
+
+    def metrics(self) -> dict:
+        """Return the hits, misses and errors."""
+        with self.__lock:
+            return dict(self.__metrics)
+
+    def __record_error(self, command: str, key: str, error: Exception) -> None:
+        """Count and log a command the server failed."""
+        with self.__lock:
+            self.__metrics['errors'] += 1
+
+        app_logger.warning('The shared cache failed to %s %s: %s', command, key, error)
+
+
+class NullCache():  # pylint: disable=R0201
+    """A cache that never holds anything, used when caching is disabled."""
+
+    def get(self, key: str):  # pylint: disable=W0613
+        """Miss."""
+        return None
+
+    def set(self, key: str, value) -> None:
+        """Do nothing."""
+
+    def add(self, key: str, value) -> bool:  # pylint: disable=W0613
+        """Do nothing."""
+        return False
+
+    def delete(self, *keys: str) -> None:
+        """Do nothing."""
+
+    def invalidate(self, *keys: str) -> None:
+        """Do nothing."""
+
+    def clear(self) -> None:
+        """Do nothing."""
+
+    def metrics(self) -> dict:
+        """Return no metrics."""
+        return {}
+
+
+def get_cache_backend_name(config) -> str:
+    """Get the cache backend to use, resolving the auto CACHE_BACKEND.
+
+    The auto backend is shared if a CACHE_URL is set. Otherwise it is lru when
+    the app is served by a single process, and none when gunicorn runs several
+    workers, since an update would only invalidate the cache of one of them.
+    """
+    backend = config['CACHE_BACKEND']
+    if backend != 'auto':
+        if backend == 'lru' and config['GUNICORN_WORKERS'] > 1:
+            app_logger.warning(f"The lru cache is kept by each of the {config['GUNICORN_WORKERS']} workers, so an "
+                               'update only invalidates the cache of the worker that served it.')
+        return backend
+
+    if config.get('CACHE_URL'):
+        return 'shared'
+
+    return 'lru' if config['GUNICORN_WORKERS'] <= 1 else 'none'
+
+
+def create_cache_backend(config):
+    """Create the cache backend chosen by the CACHE_BACKEND setting.
+
+    The backend is one of auto, lru, shared or none. The shared backend connects
+    to the Redis server at CACHE_URL, which needs the redis package, and uses the
+    local stand in if no CACHE_URL is set.
+    """
+    backend = get_cache_backend_name(config)
+    ttl = config['CACHE_TTL']
+
+    if backend == 'none':
+        return NullCache()
+
+    if backend == 'shared':
+        if not config.get('CACHE_URL'):
+            return SharedCache(LocalSharedClient(), ttl=ttl)
+
+        try:
+            import redis  # pylint: disable=C0415,E0401
+        except ImportError:
+            app_logger.error('The redis package is not installed. Using the in process cache instead.')
+        else:
+            return SharedCache(redis.Redis.from_url(config['CACHE_URL']), ttl=ttl,
+                               errors=(redis.exceptions.ConnectionError, redis.exceptions.TimeoutError))
+
+    return LRUCache(max_entries=config['CACHE_MAX_ENTRIES'], ttl=ttl)
+
+
+class Cache():  # pylint: disable=R0201
+    """The cache extension, proxying to the backend of the current app."""
+
+    def init_app(self, app) -> None:
+        """Create the app's cache backend."""
+        app.extensions['cache'] = create_cache_backend(app.config)
+        app_logger.info(f"Successfully initialized the {type(app.extensions['cache']).__name__}.")
+
+    @property
+    def backend(self):
+        """The cache backend of the current app."""
+        return current_app.extensions['cache']
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the current app caches anything."""
+        return not isinstance(self.backend, NullCache)
+
+    def get(self, key: str):
+        """Get the value cached under the key, or None if there is none."""
+        return self.backend.get(key)
+
+    def set(self, key: str, value) -> None:
+        """Cache the value under the key."""
+        self.backend.set(key, value)
+
+    def add(self, key: str, value) -> bool:
+        """Cache the value under the key, unless the key holds an entry, returning whether it was cached."""
+        return self.backend.add(key, value)
+
+    def delete(self, *keys: str) -> None:
+        """Remove the keys from the cache."""
+        self.backend.delete(*keys)
+
+    def invalidate(self, *keys: str) -> None:
+        """Mark the keys as written, so that a value read before the write cannot be added back."""
+        self.backend.invalidate(*keys)
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        self.backend.clear()
+
+    def metrics(self) -> dict:
+        """Return the hit, miss and eviction metrics of the cache."""
+        return self.backend.metrics()
+
+
+cache = Cache()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""This module logs the client errors as compact records and counts every error by its exception class."""
+import re
+import threading
+
+from .extensions import app_logger
+
+ERROR_CODE_PATTERN = re.compile(r'(?<!^)(?=[A-Z])')
+
+
+def get_error_code(exception_class: type) -> str:
+    """Get the snake case error code of the exception class, such as invalid_email_address_format."""
+    return ERROR_CODE_PATTERN.sub('_', exception_class.__name__).lower()
+
+
+class ErrorMetrics():
+    """Count the requests and the errors of each exception class."""
+
+    def __init__(self):
+        """Create the metrics."""
+        self.__lock = threading.Lock()
+        self.__codes = {}
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear the metrics."""
+        with self.__lock:
+            self.__requests = 0
+            self.__errors = {}
+
+    def record_request(self) -> None:
+        """Count a request."""
+        with self.__lock:
+            self.__requests += 1
+
+    def record_error(self, exception_class: type, status: int) -> str:
+        """Count an error of the exception class, returning its error code."""
+        with self.__lock:
+            code = self.__codes.get(exception_class)
+            if code is None:
+                code = self.__codes[exception_class] = get_error_code(exception_class)
+
+            key = (exception_class.__name__, status)
+            self.__errors[key] = self.__errors.get(key, 0) + 1
+
+        return code
+
+    def report(self) -> dict:
+        """Return the requests, and the count and rate per request of the errors of each exception class."""
+        with self.__lock:
+            requests = self.__requests
+            return {
+                'requests': requests,
+                'errors': {
+                    f'{name} {status}': {'count': count, 'rate': round(count / requests, 6) if requests else 0.0}
+                    for (name, status), count in sorted(self.__errors.items())
+                }
+            }
+
+
+error_metrics = ErrorMetrics()
+
+
+def log_client_error(error: Exception, status: int = 400) -> None:
+    """Log a client error as a single compact record, without capturing its traceback.
+
+    The record has the error code, the field of the payload the error is about,
+    if it is known, and the message.
+
+    Attributes
+    ----------
+    error: Exception
+        The exception raised for the invalid request.
+    status: int
+        The status code of the response.
+    """
+    code = error_metrics.record_error(type(error), status)
+    field = getattr(error, 'field', None)
+    app_logger.warning(
+        'Client error %s: %s', code, error,
+        extra={'error_code': code, 'error_field': field, 'status': status}
+    )
+
+
+def log_server_error(error: Exception) -> None:
+    """Count a server error. Flask has already logged it, with its traceback."""
+    error_metrics.record_error(type(error), 500)
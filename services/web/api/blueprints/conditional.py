@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""This module contains the helpers for the conditional GET requests."""
+import hashlib
+
+from flask import make_response, request
+
+
+def make_etag(*parts) -> str:
+    """Create a strong ETag from the parts that identify a version of a resource."""
+    return hashlib.sha1(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def conditional_response(load, etag: str, code: int = 200):
+    """Create the response to a GET request for a resource with the given ETag.
+
+    If the ETag is in the request's If-None-Match header the client already has
+    this version, in any encoding, so a 304 Not Modified is returned without loading the resource.
+
+    Attributes
+    ----------
+    load: callable
+        Loads the resource.
+    etag: str
+        The ETag of the resource.
+    code: int
+        The status code to return the resource with.
+
+    Returns
+    -------
+    response: flask.Response
+        The response, with the ETag set.
+    """
+    if request.if_none_match.contains_weak(etag):
+        response = make_response('', 304)
+    else:
+        response = make_response(load(), code)
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+
+    return response
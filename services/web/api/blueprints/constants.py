@@ -8,3 +8,20 @@ NAME_MIN_LENGTH = 2
 
 PASSWORD_MAX_LENGTH = 20
 PASSWORD_MIN_LENGTH = 3
+
+PAGE_DEFAULT_LIMIT = 20
+PAGE_MAX_LIMIT = 100
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_IDLE_IN_TRANSACTION_TIMEOUT = 600000
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+BULK_MAX_ITEMS = 5000
+BULK_CHUNK_SIZE = 1000
+
+REPLICA_BIND = 'replica'
+
+USER_CACHE_KEY = 'user:{}'
@@ -1,34 +1,54 @@
 # -*- coding: utf-8 -*-
 """This module has methods that are used in the other modules in this package."""
-import re
-
-from flask import jsonify
-
-from ..constants import EMAIL_MAX_LENGTH
+import csv
+import io
+import json
+
+from flask import Response, jsonify, stream_with_context
+from sqlalchemy import delete, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+
+from ..cache import cache
+from ..client_errors import log_client_error
+from ..conditional import conditional_response, make_etag
+from ..constants import (
+    BULK_CHUNK_SIZE,
+    BULK_MAX_ITEMS,
+    EXPORT_BATCH_SIZE,
+    EXPORT_FORMATS,
+    EXPORT_IDLE_IN_TRANSACTION_TIMEOUT,
+    USER_CACHE_KEY,
+)
 from ..exceptions import (
+    BulkLimitExceeded,
     EmailAddressTooLong,
     EmptyUserData,
     InvalidEmailAddressFormat,
+    InvalidExportFormat,
+    InvalidPageCursor,
+    InvalidPageLimit,
+    InvalidUserFilter,
     MissingEmailData,
     MissingEmailKey,
     NonDictionaryUserData,
+    NonListUserData,
     UserDoesNotExists,
     UserExists,
 )
-from ..extensions import app_logger, db
-from .models import User
+from ..extensions import db
+from ..pagination import page_etag, paginate
+from ..replica import get_read_session
+from ..validation import EMAIL_PATTERN, USER_SCHEMA
+from .models import User, UserRow
 
 
 def check_if_user_exists_with_id(user_id: int) -> bool:
     """Check if the user with the given user_id exists."""
     if not user_id:
-        msg = 'When checking if user exists using their id, the user_id was null.'
-        app_logger.exception(msg)
         raise ValueError('The user_id has to be provided.')
 
     if not isinstance(user_id, int):
-        msg = 'When checking if user exists using their id, the user_id was not an integer.'
-        app_logger.exception(msg)
         raise ValueError('The user_id has to be an integer')
 
     user = User.query.filter_by(id=user_id).first()
@@ -42,13 +62,9 @@ def check_if_user_exists_with_id(user_id: int) -> bool:
 def check_if_user_exists(user_email: str) -> bool:
     """Check if the user with the given user_email exists."""
     if not user_email:
-        msg = 'When checking if user exists using their email, the user_email was null.'
-        app_logger.exception(msg)
         raise ValueError('The user_email has to be provided.')
 
     if not isinstance(user_email, str):
-        msg = 'When checking if user exists using their email, the user_email was not a string.'
-        app_logger.exception(msg)
         raise ValueError('The user_email has to be an integer')
 
     user = User.query.filter_by(email=user_email).first()
@@ -62,19 +78,12 @@ def check_if_user_exists(user_email: str) -> bool:
 def is_email_address_format_valid(email_address: str) -> bool:
     """Check that the email address format is valid."""
     if not email_address:
-        msg = 'When checking if an email address format is valid, the user_email was null.'
-        app_logger.exception(msg)
         raise ValueError('The email_address cannot be an empty value')
 
     if not isinstance(email_address, str):
-        msg = 'When checking if an email address format is valid, the user_email was not a string.'
-        app_logger.exception(msg)
         raise ValueError('The email_address must be a string')
 
-    #  Regular expression for validating an Email
-    regex = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-
-    if re.fullmatch(regex, email_address):
+    if EMAIL_PATTERN.fullmatch(email_address):
         return True
 
     return False
@@ -82,39 +91,21 @@ def is_email_address_format_valid(email_address: str) -> bool:
 
 def create_new_user(user_data: dict) -> dict:
     """Create a new user."""
-    if not user_data:
-        app_logger.exception('When creating a new user, the user_data was empty.')
-        raise EmptyUserData('The user data cannot be empty.')
-
-    if not isinstance(user_data, dict):
-        app_logger.exception('When creating a new user, the user_data was nota dictionary.')
-        raise NonDictionaryUserData('user_data must be a dict')
-
-    if 'email' not in user_data.keys():
-        app_logger.exception('When creating a new user, the email key was missing from the user_data.')
-        raise MissingEmailKey('The email is missing from the user data')
-
-    if not user_data['email']:
-        app_logger.exception('When creating a new user, the email data was missing from the user_data.')
-        raise MissingEmailData('The email data is missing')
-
-    if len(user_data['email']) > EMAIL_MAX_LENGTH:
-        app_logger.exception(f'When creating a new user, the email key was longer than {EMAIL_MAX_LENGTH}.')
-        raise EmailAddressTooLong(f'The email address should be less than {EMAIL_MAX_LENGTH} characters!')
-
-    if not is_email_address_format_valid(user_data['email']):
-        app_logger.exception('When creating a new user, the email address format was invalid.')
-        raise InvalidEmailAddressFormat('The email address is invalid')
+    USER_SCHEMA.validate(user_data)
+
+    statement = (
+        insert(User.__table__)
+        .values(email=user_data['email'], active=True)
+        .on_conflict_do_nothing(index_elements=['email'])
+        .returning(User.id, User.email)
+    )
+    user = db.session.execute(statement).first()
+    db.session.commit()
 
-    if check_if_user_exists(user_data['email']):
-        app_logger.exception('When creating a new user, the user was found to already exist.')
+    if not user:
         raise UserExists(f'The email adress {user_data["email"]} is already in use.')
 
-    user = User(email=user_data['email'])
-    db.session.add(user)
-    db.session.commit()
-
-    return user.get_user()
+    return user._asdict()
 
 
 def handle_create_user(request_data: dict):  # pylint: disable=R0911
@@ -130,41 +121,60 @@ def handle_create_user(request_data: dict):  # pylint: disable=R0911
         NonDictionaryUserData,
         EmptyUserData,
     ) as e:
-        app_logger.exception(e)
+        log_client_error(e)
         return jsonify({'error': str(e)}), 400
     else:
         return new_user, 201
 
 
-def get_user(user_id: int) -> dict:
-    """Get the user with the given id."""
+def get_user(user_id: int) -> tuple:
+    """Get the user with the given id, and its version.
+
+    The user is served from the cache, and is only read from the database and
+    cached if it is not there. When it is about to be cached, it is read from
+    the primary database, so that a lagging replica cannot put a user the admin
+    has just updated back in the cache, and otherwise from the read session.
+    The writes invalidate the user's key rather than deleting it, and the user
+    is only added to the cache if the key is empty, so a row read before a
+    concurrent update commits is not cached after it.
+    """
     if not user_id:
         raise EmptyUserData('The user_id has to be provided.')
 
     if not isinstance(user_id, int):
         raise ValueError('The user_id has to be an integer.')
 
-    if not check_if_user_exists_with_id(user_id):
+    cached = cache.get(USER_CACHE_KEY.format(user_id))
+    if cached:
+        return cached['user'], cached['version']
+
+    statement = select(User.email, User.version).where(User.id == user_id)
+    # An invalidated key cannot be added to, so only a missing key is filled from the primary.
+    session = db.session if cache.enabled and cached is None else get_read_session()
+    row = session.execute(statement).first()
+
+    if not row:
         raise UserDoesNotExists(f'The user with id {user_id} does not exist.')
 
-    user = User.query.filter_by(id=user_id).first()
+    user = {'id': user_id, 'email': row.email}
+    cache.add(USER_CACHE_KEY.format(user_id), {'user': user, 'version': row.version})
 
-    return user.get_user()
+    return user, row.version
 
 
 def handle_get_user(user_id: int):
     """Handle the GET request to the /user route."""
     try:
-        user = get_user(user_id)
+        user, version = get_user(user_id)
     except (
         ValueError,
         EmptyUserData,
         UserDoesNotExists
     ) as e:
-        app_logger.exception(e)
+        log_client_error(e)
         return jsonify({'error': str(e)}), 400
     else:
-        return user, 200
+        return conditional_response(lambda: user, make_etag(User.__tablename__, user_id, version))
 
 
 def delete_user(user_id: int) -> dict:
@@ -175,14 +185,15 @@ def delete_user(user_id: int) -> dict:
     if not isinstance(user_id, int):
         raise ValueError('The user_id has to be an integer.')
 
-    if not check_if_user_exists_with_id(user_id):
-        raise UserDoesNotExists(f'The user with id {user_id} does not exist.')
-
-    user = User.query.filter_by(id=user_id).first()
-    db.session.delete(user)
+    statement = delete(User.__table__).where(User.id == user_id).returning(User.id, User.email)
+    user = db.session.execute(statement).first()
     db.session.commit()
+    cache.invalidate(USER_CACHE_KEY.format(user_id))
 
-    return user.get_user()
+    if not user:
+        raise UserDoesNotExists(f'The user with id {user_id} does not exist.')
+
+    return user._asdict()
 
 
 def handle_delete_user(user_id: int):
@@ -194,7 +205,7 @@ def handle_delete_user(user_id: int):
         EmptyUserData,
         UserDoesNotExists
     ) as e:
-        app_logger.exception(e)
+        log_client_error(e)
         return jsonify({'error': str(e)}), 400
     else:
         return user, 200
@@ -208,35 +219,27 @@ def update_user(user_id: int, user_data: dict) -> dict:
     if not isinstance(user_id, int):
         raise ValueError('The user_id has to be an integer.')
 
-    if not check_if_user_exists_with_id(user_id):
-        raise UserDoesNotExists(f'The user with id {user_id} does not exist.')
-
-    if not user_data:
-        raise EmptyUserData('The user data cannot be empty.')
-
-    if not isinstance(user_data, dict):
-        raise NonDictionaryUserData('user_data must be a dict')
-
-    if 'email' not in user_data.keys():
-        raise MissingEmailKey('The email is missing from the user data')
+    USER_SCHEMA.validate(user_data)
 
-    if not user_data['email']:
-        raise MissingEmailData('The email data is missing')
-
-    if len(user_data['email']) > 120:
-        raise EmailAddressTooLong('The email address is too long')
-
-    if not is_email_address_format_valid(user_data['email']):
-        raise InvalidEmailAddressFormat('The email address is invalid')
+    statement = (
+        update(User.__table__)
+        .where(User.id == user_id)
+        .values(email=user_data['email'], version=User.version + 1)
+        .returning(User.id, User.email)
+    )
+    try:
+        user = db.session.execute(statement).first()
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        raise UserExists(f'The email adress {user_data["email"]} is already in use.') from e
 
-    if check_if_user_exists(user_data['email']):
-        raise UserExists(f'The email adress {user_data["email"]} is already in use.')
+    cache.invalidate(USER_CACHE_KEY.format(user_id))
 
-    user = User.query.filter_by(id=user_id).first()
-    user.email = user_data['email']
-    db.session.commit()
+    if not user:
+        raise UserDoesNotExists(f'The user with id {user_id} does not exist.')
 
-    return user.get_user()
+    return user._asdict()
 
 
 def handle_update_user(user_id: int, user_data: dict):  # pylint: disable=R0911
@@ -254,7 +257,399 @@ def handle_update_user(user_id: int, user_data: dict):  # pylint: disable=R0911
         EmptyUserData,
         UserDoesNotExists
     ) as e:
-        app_logger.exception(e)
+        log_client_error(e)
         return jsonify({'error': str(e)}), 400
     else:
         return user, 200
+
+
+def get_all_users(limit: str = None, cursor: str = None) -> dict:
+    """Get a single page of users, ordered by their id.
+
+    Only the returned columns are selected, into UserRows that the session
+    does not track.
+    """
+    rows, metadata = paginate(get_read_session().query(*UserRow.columns), User.id, limit, cursor)
+
+    return {'users': [UserRow(row) for row in rows], 'metadata': metadata}
+
+
+def handle_get_all_users(limit: str = None, cursor: str = None):
+    """Handle the GET request to the /users route."""
+    try:
+        etag = page_etag(get_read_session(), User.id, User.version, limit, cursor)
+        response = conditional_response(lambda: get_all_users(limit, cursor), etag)
+    except (
+        InvalidPageLimit,
+        InvalidPageCursor
+    ) as e:
+        log_client_error(e)
+        return jsonify({'error': str(e)}), 400
+    else:
+        return response
+
+
+def generate_users_ndjson(rows):
+    """Generate the users as newline delimited JSON, a batch of lines at a time."""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({'id': row.id, 'email': row.email, 'active': row.active}))
+        if len(lines) >= EXPORT_BATCH_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines.clear()
+
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def generate_users_csv(rows):
+    """Generate the users as CSV, starting with the header row."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(['id', 'email', 'active'])
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    count = 0
+    for row in rows:
+        writer.writerow([row.id, row.email, row.active])
+        count += 1
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_users(export_format: str = 'ndjson'):
+    """Export all the users in the given format.
+
+    The users are read through a server side cursor, EXPORT_BATCH_SIZE rows at a
+    time, and only the exported columns are selected, so memory use does not
+    depend on the size of the users table. The transaction stays open while the
+    client reads the rows, so it gets EXPORT_IDLE_IN_TRANSACTION_TIMEOUT instead
+    of the shorter idle_in_transaction_session_timeout of the engine.
+
+    Attributes
+    ----------
+    export_format: str
+        Either ndjson or csv.
+
+    Raises
+    ------
+    InvalidExportFormat:
+        If the export_format is not supported.
+
+    Returns
+    -------
+    chunks: generator
+        The exported users, as strings.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise InvalidExportFormat(f'The format has to be one of {list(EXPORT_FORMATS)}.')
+
+    session = get_read_session()
+    session.execute(text(f'SET LOCAL idle_in_transaction_session_timeout = {EXPORT_IDLE_IN_TRANSACTION_TIMEOUT}'))
+    rows = (
+        session.query(User.id, User.email, User.active)
+        .order_by(User.id)
+        .execution_options(stream_results=True)
+        .yield_per(EXPORT_BATCH_SIZE)
+    )
+
+    if export_format == 'csv':
+        return generate_users_csv(rows)
+
+    return generate_users_ndjson(rows)
+
+
+def handle_export_users(export_format: str = 'ndjson'):
+    """Handle the GET request to the /users/export route."""
+    try:
+        chunks = export_users(export_format)
+    except InvalidExportFormat as e:
+        log_client_error(e)
+        return jsonify({'error': str(e)}), 400
+    else:
+        return Response(
+            stream_with_context(chunks),
+            mimetype=EXPORT_FORMATS[export_format],
+            headers={'Content-Disposition': f'attachment; filename=users.{export_format}'}
+        )
+
+
+def validate_bulk_email(email) -> str:
+    """Get the reason the email cannot be used to create a user, if any."""
+    error = USER_SCHEMA['email'].first_error(email)
+
+    return error[1] if error else ''
+
+
+def create_new_users(users_data: dict) -> dict:  # pylint: disable=R0912
+    """Create many users at once.
+
+    The emails are validated in a single pass, the ones already in use are found
+    with a single query and the rest are added with a single multi-row
+    INSERT ... ON CONFLICT DO NOTHING, so the number of database round trips does
+    not depend on the number of users.
+
+    Attributes
+    ----------
+    users_data: dict
+        A dictionary with an 'emails' list.
+
+    Raises
+    ------
+    EmptyUserData:
+        If the users_data or the list of emails is empty.
+    NonDictionaryUserData:
+        If the users_data is not a dictionary.
+    MissingEmailKey:
+        If the 'emails' key is missing.
+    NonListUserData:
+        If the emails are not given as a list.
+    BulkLimitExceeded:
+        If there are more than BULK_MAX_ITEMS emails.
+
+    Returns
+    -------
+    results: dict
+        The outcome for every email, in the order given, and a summary.
+    """
+    if not users_data:
+        raise EmptyUserData('The user data cannot be empty.')
+
+    if not isinstance(users_data, dict):
+        raise NonDictionaryUserData('user_data must be a dict')
+
+    if 'emails' not in users_data.keys():
+        raise MissingEmailKey('The emails are missing from the user data')
+
+    emails = users_data['emails']
+
+    if not isinstance(emails, list):
+        raise NonListUserData('The emails must be a list')
+
+    if not emails:
+        raise EmptyUserData('The emails cannot be empty.')
+
+    if len(emails) > BULK_MAX_ITEMS:
+        raise BulkLimitExceeded(f'At most {BULK_MAX_ITEMS} users can be created at once.')
+
+    results, new_emails = [], {}
+    for email in emails:
+        error = validate_bulk_email(email)
+        if error:
+            results.append({'email': email, 'status': 'invalid', 'error': error})
+        elif email in new_emails:
+            results.append({'email': email, 'status': 'duplicate', 'error': 'The email is repeated in the request.'})
+        else:
+            new_emails[email] = len(results)
+            error = f'The email adress {email} is already in use.'
+            results.append({'email': email, 'status': 'exists', 'error': error})
+
+    if new_emails:
+        existing = {
+            row.email for row in db.session.query(User.email).filter(User.email.in_(list(new_emails)))
+        }
+        rows = [{'email': email, 'active': True} for email in new_emails if email not in existing]
+
+        if rows:
+            statement = (
+                insert(User.__table__)
+                .values(rows)
+                .on_conflict_do_nothing(index_elements=['email'])
+                .returning(User.id, User.email)
+            )
+            for row in db.session.execute(statement):
+                results[new_emails[row.email]] = {'email': row.email, 'status': 'created', 'id': row.id}
+            db.session.commit()
+
+    summary = {status: 0 for status in ('created', 'exists', 'duplicate', 'invalid')}
+    for result in results:
+        summary[result['status']] += 1
+
+    return {'users': results, 'summary': summary}
+
+
+def handle_create_users(request_data: dict):
+    """Handle the POST request to the /users/bulk route."""
+    try:
+        results = create_new_users(request_data)
+    except (
+        EmptyUserData,
+        NonDictionaryUserData,
+        MissingEmailKey,
+        NonListUserData,
+        BulkLimitExceeded
+    ) as e:
+        log_client_error(e)
+        return jsonify({'error': str(e)}), 400
+    else:
+        return results, 201
+
+
+def get_bulk_conditions(users_data: dict) -> list:
+    """Get the conditions that select the users a bulk request acts on.
+
+    The users are selected either with a list of ids or with a filter such as
+    {'active': false}, but not both.
+    """
+    if not users_data:
+        raise EmptyUserData('The user data cannot be empty.')
+
+    if not isinstance(users_data, dict):
+        raise NonDictionaryUserData('user_data must be a dict')
+
+    if ('ids' in users_data) == ('filter' in users_data):
+        raise InvalidUserFilter('Either the ids or the filter has to be provided.')
+
+    if 'ids' in users_data:
+        ids = users_data['ids']
+
+        if not isinstance(ids, list):
+            raise NonListUserData('The ids must be a list')
+
+        if not ids:
+            raise EmptyUserData('The ids cannot be empty.')
+
+        if len(ids) > BULK_MAX_ITEMS:
+            raise BulkLimitExceeded(f'At most {BULK_MAX_ITEMS} users can be selected by id at once.')
+
+        if not all(isinstance(user_id, int) and not isinstance(user_id, bool) for user_id in ids):
+            raise ValueError('The ids have to be integers.')
+
+        return [User.id.in_(ids)]
+
+    users_filter = users_data['filter']
+
+    if not users_filter or not isinstance(users_filter, dict):
+        raise InvalidUserFilter('The filter has to be a non empty dict.')
+
+    for key, value in users_filter.items():
+        if key != 'active':
+            raise InvalidUserFilter(f"Invalid filter key {key}. The valid keys are ['active'].")
+
+        if not isinstance(value, bool):
+            raise InvalidUserFilter('The active filter has to be a boolean.')
+
+    return [User.active.is_(users_filter['active'])]
+
+
+def execute_in_chunks(build_statement, conditions: list) -> int:
+    """Run a set based UPDATE or DELETE on the selected users, BULK_CHUNK_SIZE at a time.
+
+    Every chunk is picked in id order after the last id of the previous chunk and
+    is committed in its own short transaction, so locks are never held on the whole
+    selection at once.
+
+    Attributes
+    ----------
+    build_statement: callable
+        Builds the UPDATE or DELETE statement from the condition selecting a chunk.
+    conditions: list
+        The conditions that select the users.
+
+    Returns
+    -------
+    affected: int
+        The number of users updated or deleted.
+    """
+    users = User.__table__
+    affected, last_id = 0, 0
+
+    while True:
+        chunk = (
+            select(users.c.id)
+            .where(users.c.id > last_id, *conditions)
+            .order_by(users.c.id)
+            .limit(BULK_CHUNK_SIZE)
+            .scalar_subquery()
+        )
+        statement = build_statement(users.c.id.in_(chunk)).returning(users.c.id)
+        ids = db.session.execute(statement).scalars().all()
+        db.session.commit()
+        cache.invalidate(*[USER_CACHE_KEY.format(user_id) for user_id in ids])
+
+        affected += len(ids)
+        if len(ids) < BULK_CHUNK_SIZE:
+            return affected
+
+        last_id = max(ids)
+
+
+def update_users(users_data: dict) -> dict:
+    """Update the selected users in bulk."""
+    conditions = get_bulk_conditions(users_data)
+
+    values = users_data.get('data')
+
+    if not values:
+        raise EmptyUserData('The update data cannot be empty.')
+
+    if not isinstance(values, dict):
+        raise NonDictionaryUserData('The update data must be a dict')
+
+    if list(values.keys()) != ['active'] or not isinstance(values['active'], bool):
+        raise ValueError("Only the 'active' boolean can be updated in bulk.")
+
+    affected = execute_in_chunks(
+        lambda condition: (
+            update(User.__table__).where(condition).values(active=values['active'], version=User.version + 1)
+        ),
+        conditions
+    )
+
+    return {'affected': affected}
+
+
+def handle_update_users(request_data: dict):
+    """Handle the PUT request to the /users/bulk route."""
+    try:
+        results = update_users(request_data)
+    except (
+        EmptyUserData,
+        NonDictionaryUserData,
+        NonListUserData,
+        BulkLimitExceeded,
+        InvalidUserFilter,
+        ValueError
+    ) as e:
+        log_client_error(e)
+        return jsonify({'error': str(e)}), 400
+    else:
+        return results, 200
+
+
+def delete_users(users_data: dict) -> dict:
+    """Delete the selected users in bulk."""
+    conditions = get_bulk_conditions(users_data)
+
+    affected = execute_in_chunks(
+        lambda condition: delete(User.__table__).where(condition),
+        conditions
+    )
+
+    return {'affected': affected}
+
+
+def handle_delete_users(request_data: dict):
+    """Handle the DELETE request to the /users/bulk route."""
+    try:
+        results = delete_users(request_data)
+    except (
+        EmptyUserData,
+        NonDictionaryUserData,
+        NonListUserData,
+        BulkLimitExceeded,
+        InvalidUserFilter,
+        ValueError
+    ) as e:
+        log_client_error(e)
+        return jsonify({'error': str(e)}), 400
+    else:
+        return results, 200
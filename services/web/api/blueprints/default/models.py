@@ -18,6 +18,8 @@ class User(db.Model):
         The user's email
     active: bool
         Has the user activated their account
+    version: int
+        Incremented every time the user is updated
 
     """
 
@@ -26,6 +28,7 @@ class User(db.Model):
     id: int = db.Column(db.Integer, primary_key=True)
     email: str = db.Column(db.String(EMAIL_MAX_LENGTH), unique=True, nullable=False)
     active: bool = db.Column(db.Boolean(), default=True, nullable=False)
+    version = db.Column(db.Integer, default=1, server_default='1', nullable=False)
 
     def __init__(self, email: str) -> None:
         """Create a new user.
@@ -44,3 +47,18 @@ class User(db.Model):
         """Get user data."""
         user = dict(id=self.id, email=self.email)
         return user
+
+
+class UserRow():
+    """A read only user, holding only the columns the read routes return.
+
+    Unlike a User, it is not tracked by the session, and its attributes are
+    kept in slots instead of a dict.
+    """
+
+    __slots__ = ('id', 'email', 'active')
+    columns = (User.id, User.email, User.active)
+
+    def __init__(self, row) -> None:
+        """Create the user from a row of the selected columns."""
+        self.id, self.email, self.active = row
@@ -3,13 +3,23 @@
 from json import JSONDecodeError
 
 from flasgger import swag_from
-from flask import Blueprint, jsonify, request
-from flask_jwt_extended import get_jwt_identity, jwt_required
+from flask import Blueprint, jsonify, make_response, request
+from flask_jwt_extended import jwt_required
 
-from ..auth.helpers import get_admin
+from ..auth.helpers import get_admin_name
+from ..client_errors import log_client_error
 from ..extensions import app_logger
-from .helpers import handle_create_user, handle_delete_user, handle_get_user, handle_update_user
-from .models import User
+from .helpers import (
+    handle_create_user,
+    handle_create_users,
+    handle_delete_user,
+    handle_delete_users,
+    handle_export_users,
+    handle_get_all_users,
+    handle_get_user,
+    handle_update_user,
+    handle_update_users,
+)
 
 default = Blueprint('default', __name__, template_folder='templates', static_folder='static')
 
@@ -29,13 +39,12 @@ def create_user():
     """Create a new user."""
     try:
         data = request.json
-        admin_id = get_jwt_identity()
-        admin = get_admin(admin_id)
+        admin_name = get_admin_name()
     except JSONDecodeError as e:
-        print(e)
+        log_client_error(e)
         return str(e), 400
     else:
-        app_logger.info(f'The admin {admin["name"]} created a new user with email {data["email"]}.')
+        app_logger.info(f'The admin {admin_name} created a new user with email {data["email"]}.')
         return handle_create_user(data)
 
 
@@ -47,18 +56,15 @@ def get_user():
     app_logger.info("Handling a GET request to '/user' route.")
     try:
         user_id = int(request.args.get('id'))
-        admin_id = get_jwt_identity()
-        admin = get_admin(admin_id)
+        admin_name = get_admin_name()
     except TypeError as e:
-        app_logger.exception(e)
-        app_logger.error('GET request unsuccessful. This error is cause by not supplying the user id')
+        log_client_error(e)
         return 'The user id was not provided or the id is invalid type.', 400
     except ValueError as e:
-        app_logger.exception(e)
-        app_logger.error('GET request unsuccessful. This error is cause by not supplying the user id')
+        log_client_error(e)
         return 'The user id was not provided or the id is invalid.', 400
     else:
-        app_logger.info(f"The admin {admin['name']} retrieved a user with id {user_id}.")
+        app_logger.info(f"The admin {admin_name} retrieved a user with id {user_id}.")
         return handle_get_user(user_id)
 
 
@@ -70,17 +76,15 @@ def update_user():
     try:
         data = request.json
         user_id = int(request.args.get('id'))
-        admin_id = get_jwt_identity()
-        admin = get_admin(admin_id)
+        admin_name = get_admin_name()
     except JSONDecodeError as e:
-        print(e)
+        log_client_error(e)
         return str(e), 400
     except ValueError as e:
-        print(e)
-        print('This error is cause by not supplying the user id')
+        log_client_error(e)
         return 'The user id was not provided', 400
     else:
-        app_logger.info(f"The admin {admin['name']} updated a user with id {user_id} with data: {data}.")
+        app_logger.info(f"The admin {admin_name} updated a user with id {user_id} with data: {data}.")
         return handle_update_user(user_id, data)
 
 
@@ -91,22 +95,82 @@ def delete_user():
     """Delete a user."""
     try:
         user_id = int(request.args.get('id'))
-        admin_id = get_jwt_identity()
-        admin = get_admin(admin_id)
+        admin_name = get_admin_name()
     except ValueError as e:
-        print(e)
-        print('This error is cause by not supplying the user id')
+        log_client_error(e)
         return 'The user id was not provided', 400
     else:
-        app_logger.info(f"The admin {admin['name']} deleted a user with id {user_id}.")
+        app_logger.info(f"The admin {admin_name} deleted a user with id {user_id}.")
         return handle_delete_user(user_id)
 
 
 @default.route('/users', methods=['GET'])
 @swag_from("./docs/get_all_users.yml", endpoint='default.all_users', methods=['GET'])
 def all_users():
-    """Get all the users."""
+    """Get a page of users."""
     app_logger.info("Handling a GET request to '/users' route.")
-    users = User.query.all()
-    app_logger.info("Successfully handled a GET request to the '/users' route. Returning all the users.")
-    return jsonify(users), 200
+    limit = request.args.get('limit')
+    cursor = request.args.get('next')
+    response = make_response(handle_get_all_users(limit, cursor))
+    if response.status_code < 400:
+        app_logger.info("Successfully handled a GET request to the '/users' route. Returning a page of users.")
+    return response
+
+
+@default.route('/users/export', methods=['GET'])
+@jwt_required()
+@swag_from("./docs/export_users.yml", endpoint='default.export_users', methods=['GET'])
+def export_users():
+    """Stream all the users."""
+    export_format = request.args.get('format', 'ndjson')
+    admin_name = get_admin_name()
+    app_logger.info(f"The admin {admin_name} exported all the users as {export_format}.")
+    return handle_export_users(export_format)
+
+
+@default.route('/users/bulk', methods=['POST'])
+@jwt_required()
+@swag_from("./docs/create_users.yml", endpoint='default.create_users', methods=['POST'])
+def create_users():
+    """Create many users at once."""
+    try:
+        data = request.json
+        admin_name = get_admin_name()
+    except JSONDecodeError as e:
+        log_client_error(e)
+        return str(e), 400
+    else:
+        app_logger.info(f'The admin {admin_name} requested the creation of users in bulk.')
+        return handle_create_users(data)
+
+
+@default.route('/users/bulk', methods=['PUT'])
+@jwt_required()
+@swag_from("./docs/update_users.yml", endpoint='default.update_users', methods=['PUT'])
+def update_users():
+    """Update many users at once."""
+    try:
+        data = request.json
+        admin_name = get_admin_name()
+    except JSONDecodeError as e:
+        log_client_error(e)
+        return str(e), 400
+    else:
+        app_logger.info(f'The admin {admin_name} requested the update of users in bulk.')
+        return handle_update_users(data)
+
+
+@default.route('/users/bulk', methods=['DELETE'])
+@jwt_required()
+@swag_from("./docs/delete_users.yml", endpoint='default.delete_users', methods=['DELETE'])
+def delete_users():
+    """Delete many users at once."""
+    try:
+        data = request.json
+        admin_name = get_admin_name()
+    except JSONDecodeError as e:
+        log_client_error(e)
+        return str(e), 400
+    else:
+        app_logger.info(f'The admin {admin_name} requested the deletion of users in bulk.')
+        return handle_delete_users(data)
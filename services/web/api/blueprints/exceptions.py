@@ -92,3 +92,27 @@ class AdminPasswordNotAlphaNumeric(Exception):
 
 class InvalidAdminPassword(Exception):
     """Raised when an invalid admin password is given."""
+
+
+class InvalidPageLimit(Exception):
+    """Raised when the requested page size is not a positive integer."""
+
+
+class InvalidPageCursor(Exception):
+    """Raised when the given page cursor cannot be decoded."""
+
+
+class InvalidExportFormat(Exception):
+    """Raised when the requested export format is not supported."""
+
+
+class NonListUserData(Exception):
+    """Raised when the bulk user data is not provided in a list."""
+
+
+class BulkLimitExceeded(Exception):
+    """Raised when a bulk request has more items than allowed."""
+
+
+class InvalidUserFilter(Exception):
+    """Raised when the users to act on in bulk are not selected correctly."""
@@ -7,12 +7,24 @@ from flask import request
 from flask_jwt_extended import JWTManager
 from flask_sqlalchemy import SQLAlchemy
 
+from ..config.logging_config import enable_log_deduplication, enable_queue_logging
+from ..config.settings import get_setting
+
 db = SQLAlchemy()
 jwt = JWTManager()
 
 
 def create_logger():
-    """Create the application logger."""
+    """Create the application logger.
+
+    Setting LOG_QUEUE_ENABLED to true moves the root handlers behind a bounded
+    queue, of LOG_QUEUE_SIZE records, that is handled by a listener thread. The
+    LOG_QUEUE_OVERFLOW policy is one of drop-oldest, drop-debug or block.
+
+    Setting LOG_DEDUP_ENABLED to true lets through at most LOG_DEDUP_BURST
+    records with the same logger, level and message in every LOG_DEDUP_WINDOW
+    seconds, and logs how many similar records were suppressed.
+    """
     config = {
         "version": 1,
         "disable_existing_loggers": False,
@@ -34,7 +46,8 @@ def create_logger():
             },
             "kinesis": {
                 "class": "api.config.kinesis_config.KinesisFirehoseDeliveryStreamHandler",
-                "formatter": "json"
+                "formatter": "json",
+                "buffered": True
             },
             "critical mail handler": {
                 "class": "api.config.kinesis_config.CustomEmailLogger",
@@ -52,6 +65,20 @@ def create_logger():
 
     logging.config.dictConfig(config)
 
+    if get_setting('LOG_QUEUE_ENABLED'):
+        enable_queue_logging(
+            logging.getLogger(),
+            maxsize=get_setting('LOG_QUEUE_SIZE'),
+            overflow=get_setting('LOG_QUEUE_OVERFLOW')
+        )
+
+    if get_setting('LOG_DEDUP_ENABLED'):
+        enable_log_deduplication(
+            logging.getLogger(),
+            window=get_setting('LOG_DEDUP_WINDOW'),
+            burst=get_setting('LOG_DEDUP_BURST')
+        )
+
     logger = logging.getLogger(__name__)
 
     return logger
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""This module has methods used to paginate the collection routes."""
+import base64
+import binascii
+import json
+
+from sqlalchemy import func, literal
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+from .conditional import make_etag
+from .constants import PAGE_DEFAULT_LIMIT, PAGE_MAX_LIMIT
+from .exceptions import InvalidPageCursor, InvalidPageLimit
+
+
+def encode_cursor(last_id: int) -> str:
+    """Create an opaque cursor that points just after the row with the given id."""
+    payload = json.dumps({'id': last_id}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> int:
+    """Get the id of the last row returned from an opaque cursor.
+
+    Attributes
+    ----------
+    cursor: str
+        The cursor returned as 'next' in the previous page's metadata.
+
+    Raises
+    ------
+    InvalidPageCursor:
+        If the cursor was not created by encode_cursor.
+
+    Returns
+    -------
+    last_id: int
+        The id after which the next page starts, 0 for the first page.
+    """
+    if not cursor:
+        return 0
+
+    try:
+        padded_cursor = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded_cursor.encode('ascii')))
+        last_id = payload['id']
+    except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError) as e:
+        raise InvalidPageCursor('The page cursor is invalid.') from e
+
+    if not isinstance(last_id, int) or isinstance(last_id, bool) or last_id < 0:
+        raise InvalidPageCursor('The page cursor is invalid.')
+
+    return last_id
+
+
+def parse_limit(limit) -> int:
+    """Get the page size, capped at PAGE_MAX_LIMIT."""
+    if limit is None or limit == '':
+        return PAGE_DEFAULT_LIMIT
+
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError) as e:
+        raise InvalidPageLimit('The limit has to be an integer.') from e
+
+    if limit < 1:
+        raise InvalidPageLimit('The limit has to be greater than 0.')
+
+    return min(limit, PAGE_MAX_LIMIT)
+
+
+def paginate(query, key_column, limit=None, cursor=None) -> tuple:
+    """Get a single page of rows from the query using keyset pagination.
+
+    The rows are ordered by key_column and only the rows after the cursor are
+    fetched, so every page costs one index range scan no matter how deep it is.
+    One extra row is fetched to find out whether there is a next page.
+
+    Attributes
+    ----------
+    query: flask_sqlalchemy.BaseQuery
+        The query to paginate.
+    key_column: sqlalchemy.Column
+        A unique, increasing integer column such as the primary key.
+    limit: str
+        The requested page size.
+    cursor: str
+        The 'next' cursor of the previous page.
+
+    Raises
+    ------
+    InvalidPageLimit:
+        If the limit is not a positive integer.
+    InvalidPageCursor:
+        If the cursor cannot be decoded.
+
+    Returns
+    -------
+    page: tuple
+        The rows in the page and the page metadata.
+    """
+    page_size = parse_limit(limit)
+    last_id = decode_cursor(cursor)
+
+    rows = query.filter(key_column > last_id).order_by(key_column).limit(page_size + 1).all()
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(getattr(rows[-1], key_column.key))
+
+    metadata = {
+        'limit': page_size,
+        'count': len(rows),
+        'next': next_cursor
+    }
+
+    return rows, metadata
+
+
+def page_etag(session, key_column, version_column, limit=None, cursor=None) -> str:
+    """Get the ETag of the page that paginate would return for the same arguments.
+
+    Only the key and version of each row in the page are read, and they are
+    aggregated into a single digest by the database, so a client that already
+    has the page can be answered without loading the rows.
+
+    Attributes
+    ----------
+    session: sqlalchemy.orm.Session
+        The session to read the page with.
+    key_column: sqlalchemy.Column
+        The column the page is ordered by.
+    version_column: sqlalchemy.Column
+        A column that changes every time the row is updated.
+    limit: str
+        The requested page size.
+    cursor: str
+        The 'next' cursor of the previous page.
+
+    Returns
+    -------
+    etag: str
+        The ETag of the page.
+    """
+    page_size = parse_limit(limit)
+    last_id = decode_cursor(cursor)
+
+    page = (
+        session.query(key_column.label('key'), version_column.label('version'))
+        .filter(key_column > last_id)
+        .order_by(key_column)
+        .limit(page_size + 1)
+        .subquery()
+    )
+    row_versions = func.concat(page.c.key, ':', page.c.version)
+    digest = session.query(
+        func.md5(func.string_agg(row_versions, aggregate_order_by(literal(','), page.c.key)))
+    ).scalar()
+
+    return make_etag(key_column.table.name, page_size, last_id, digest)
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""This module routes the read only queries to the replica database."""
+import threading
+import time
+
+from flask import current_app, g, has_request_context
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event
+
+from .constants import REPLICA_BIND
+from .extensions import app_logger, db
+
+last_writes = {}
+last_writes_lock = threading.Lock()
+
+
+def get_current_admin():
+    """Get the id of the admin making the request, or None if there is no verified token."""
+    if not has_request_context():
+        return None
+
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        return None
+
+
+@event.listens_for(db.session, 'after_commit')
+def record_write(session):  # pylint: disable=W0613
+    """Remember when the admin making the request last wrote to the primary database."""
+    admin_id = get_current_admin()
+    if admin_id is None:
+        return
+
+    now = time.monotonic()
+    sticky_seconds = current_app.config['REPLICA_STICKY_SECONDS']
+    with last_writes_lock:
+        last_writes[admin_id] = now
+        for stale_admin_id in [key for key, at in last_writes.items() if now - at > sticky_seconds]:
+            del last_writes[stale_admin_id]
+
+
+def is_sticky_to_primary(admin_id) -> bool:
+    """Check if the admin wrote to the primary database within the last REPLICA_STICKY_SECONDS.
+
+    The writes are remembered by each process, so a read served by another
+    worker than the write may still go to the replica.
+    """
+    if admin_id is None:
+        return False
+
+    with last_writes_lock:
+        written_at = last_writes.get(admin_id)
+
+    return written_at is not None and time.monotonic() - written_at <= current_app.config['REPLICA_STICKY_SECONDS']
+
+
+def get_read_session():
+    """Get the session to run the read only queries of the request on.
+
+    This is a session on the replica database, if one is configured and the
+    admin making the request has not written to the primary database recently.
+    Otherwise it is the primary session.
+
+    Returns
+    -------
+    session: sqlalchemy.orm.Session
+        The session to read from.
+    """
+    if REPLICA_BIND not in (current_app.config.get('SQLALCHEMY_BINDS') or {}):
+        return db.session
+
+    if is_sticky_to_primary(get_current_admin()):
+        return db.session
+
+    if 'read_session' not in g:
+        session_factory = current_app.extensions.get('replica_session_factory')
+        if session_factory is None:
+            engine = db.get_engine(current_app, REPLICA_BIND)
+            session_factory = db.create_session({'bind': engine, 'binds': {}})
+            current_app.extensions['replica_session_factory'] = session_factory
+        g.read_session = session_factory()
+
+    return g.read_session
+
+
+def close_read_session(exception=None):  # pylint: disable=W0613
+    """Close the replica session of the request, if one was opened."""
+    session = g.pop('read_session', None)
+    if session is not None:
+        session.close()
+
+
+def init_read_replica(app) -> None:
+    """Close the replica session at the end of every request."""
+    app.teardown_appcontext(close_read_session)
+    if REPLICA_BIND in (app.config.get('SQLALCHEMY_BINDS') or {}):
+        app_logger.info(f"Reading from the replica database, except within {app.config['REPLICA_STICKY_SECONDS']} "
+                        'seconds of a write by the same admin.')
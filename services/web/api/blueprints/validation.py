@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""This module validates the request payloads against schemas compiled once, at import."""
+import re
+
+from .constants import (
+    EMAIL_MAX_LENGTH,
+    NAME_MAX_LENGTH,
+    NAME_MIN_LENGTH,
+    PASSWORD_MAX_LENGTH,
+    PASSWORD_MIN_LENGTH,
+)
+from .exceptions import (
+    AdminNameTooLong,
+    AdminNameTooShort,
+    AdminPasswordNotAlphaNumeric,
+    AdminPasswordTooLong,
+    AdminPaswordTooShort,
+    EmailAddressTooLong,
+    EmptyAdminData,
+    EmptyUserData,
+    InvalidEmailAddressFormat,
+    MissingEmailData,
+    MissingEmailKey,
+    MissingNameData,
+    MissingNameKey,
+    MissingPasswordData,
+    MissingPasswordKey,
+    NonDictionaryAdminData,
+    NonDictionaryUserData,
+    NonStringData,
+)
+
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+
+
+class Field():
+    """A field of a payload and the checks its value has to pass, in order.
+
+    Attributes
+    ----------
+    name: str
+        The key of the field in the payload.
+    missing: tuple
+        The exception type and message for a payload without the field, or None
+        if the field is optional.
+    checks: tuple
+        The (predicate, exception type, message) of every check. The checks stop
+        at the first one that fails, since the later ones assume it passed.
+    """
+
+    __slots__ = ('name', 'missing', 'checks')
+
+    def __init__(self, name: str, missing: tuple = None, checks: tuple = ()):
+        """Create the field."""
+        self.name = name
+        self.missing = missing
+        self.checks = tuple(checks)
+
+    def first_error(self, value) -> tuple:
+        """Get the exception type and message of the first check the value fails, or None."""
+        for predicate, exception, message in self.checks:
+            if not predicate(value):
+                return exception, message
+
+        return None
+
+    def validate(self, value) -> None:
+        """Check the value, raising the exception of the first check it fails."""
+        error = self.first_error(value)
+        if error:
+            exception, message = error
+            error = exception(message)
+            error.field = self.name
+            raise error
+
+
+class Schema():
+    """The fields of a payload, checked in a single pass that collects every error.
+
+    Attributes
+    ----------
+    empty: tuple
+        The exception type and message for an empty payload.
+    not_dict: tuple
+        The exception type and message for a payload that is not a dict.
+    fields: tuple
+        The fields of the payload.
+    allow_unknown: bool
+        Allow keys that are not fields. Otherwise they raise a KeyError.
+    """
+
+    __slots__ = ('empty', 'not_dict', 'fields', 'allow_unknown', 'names')
+
+    def __init__(self, empty: tuple, not_dict: tuple, fields: tuple, allow_unknown: bool = True):
+        """Create the schema."""
+        self.empty = empty
+        self.not_dict = not_dict
+        self.fields = tuple(fields)
+        self.allow_unknown = allow_unknown
+        self.names = [field.name for field in self.fields]
+
+    def __getitem__(self, name: str) -> Field:
+        """Get the field with the given name."""
+        return self.fields[self.names.index(name)]
+
+    def errors(self, payload) -> list:
+        """Get the exception type, message and field of every error in the payload.
+
+        The field is None for the errors about the whole payload.
+        """
+        if not payload:
+            return [(*self.empty, None)]
+
+        if not isinstance(payload, dict):
+            return [(*self.not_dict, None)]
+
+        errors = []
+        if not self.allow_unknown:
+            for key in payload:
+                if key not in self.names:
+                    errors.append((KeyError, f'Invalid key {key}. The valid keys are {self.names}.', key))
+
+        for field in self.fields:
+            if field.name not in payload:
+                if field.missing:
+                    errors.append((*field.missing, field.name))
+                continue
+
+            error = field.first_error(payload[field.name])
+            if error:
+                errors.append((*error, field.name))
+
+        return errors
+
+    def validate(self, payload) -> None:
+        """Check the payload against the schema.
+
+        Raises
+        ------
+        Exception:
+            The exception type of the first error, with the messages of all the
+            errors, an errors attribute listing them and a field attribute naming
+            the field of the first error.
+        """
+        errors = self.errors(payload)
+        if errors:
+            exception, _, field = errors[0]
+            error = exception('; '.join(message for _, message, _ in errors))
+            error.errors = [message for _, message, _ in errors]
+            error.field = field
+            raise error
+
+
+def is_string(value) -> bool:
+    """Check that the value is a string."""
+    return isinstance(value, str)
+
+
+def is_at_most(length: int):
+    """Create a predicate checking that the value is at most length characters."""
+    return lambda value: len(value) <= length
+
+
+def is_longer_than(length: int):
+    """Create a predicate checking that the value is longer than length characters."""
+    return lambda value: len(value) > length
+
+
+def is_shorter_than(length: int):
+    """Create a predicate checking that the value is shorter than length characters."""
+    return lambda value: len(value) < length
+
+
+def matches(pattern: re.Pattern):
+    """Create a predicate checking that the whole value matches the compiled pattern."""
+    return lambda value: pattern.fullmatch(value) is not None
+
+
+EMAIL_CHECKS = (
+    (bool, MissingEmailData, 'The email data is missing'),
+    (is_string, InvalidEmailAddressFormat, 'The email address must be a string'),
+    (is_at_most(EMAIL_MAX_LENGTH), EmailAddressTooLong,
+     f'The email address should be less than {EMAIL_MAX_LENGTH} characters!'),
+    (matches(EMAIL_PATTERN), InvalidEmailAddressFormat, 'The email address is invalid'),
+)
+
+NAME_CHECKS = (
+    (bool, MissingNameData, 'The name data is missing'),
+    (is_string, ValueError, 'The admin_name has to be string'),
+    (is_shorter_than(NAME_MAX_LENGTH), AdminNameTooLong, f'The admin_name has to be less than {NAME_MAX_LENGTH}'),
+    (is_longer_than(NAME_MIN_LENGTH), AdminNameTooShort, f'The admin_name has to be more than {NAME_MIN_LENGTH}'),
+    (str.isalnum, ValueError, 'The admin_name has to be alphanumeric.'),
+)
+
+PASSWORD_CHECKS = (
+    (bool, MissingPasswordData, 'The password data is missing'),
+    (is_string, NonStringData, 'The admin_password has to be string'),
+    (is_shorter_than(PASSWORD_MAX_LENGTH), AdminPasswordTooLong,
+     f'The admin_password has to be less than {PASSWORD_MAX_LENGTH}'),
+    (is_longer_than(PASSWORD_MIN_LENGTH), AdminPaswordTooShort,
+     f'The admin_password has to be more than {PASSWORD_MIN_LENGTH}'),
+    (lambda value: not value.isalnum(), AdminPasswordNotAlphaNumeric,
+     'The admin_password has to contain a character that is not alphanumeric.'),
+)
+
+USER_SCHEMA = Schema(
+    empty=(EmptyUserData, 'The user data cannot be empty.'),
+    not_dict=(NonDictionaryUserData, 'user_data must be a dict'),
+    fields=(
+        Field('email', (MissingEmailKey, 'The email is missing from the user data'), EMAIL_CHECKS),
+    )
+)
+
+ADMIN_SCHEMA = Schema(
+    empty=(EmptyAdminData, 'The admin data cannot be empty.'),
+    not_dict=(NonDictionaryAdminData, 'admin_data must be a dict'),
+    fields=(
+        Field('email', (MissingEmailKey, 'The email is missing from the admin data'), EMAIL_CHECKS),
+        Field('name', (MissingNameKey, 'The name is missing from the admin data'), NAME_CHECKS),
+        Field('password', (MissingPasswordKey, 'The password is missing from the admin data'), PASSWORD_CHECKS),
+    )
+)
+
+ADMIN_LOGIN_SCHEMA = Schema(
+    empty=ADMIN_SCHEMA.empty,
+    not_dict=ADMIN_SCHEMA.not_dict,
+    fields=(ADMIN_SCHEMA['email'], ADMIN_SCHEMA['password'])
+)
+
+ADMIN_UPDATE_SCHEMA = Schema(
+    empty=ADMIN_SCHEMA.empty,
+    not_dict=ADMIN_SCHEMA.not_dict,
+    fields=(
+        Field('name', checks=NAME_CHECKS),
+        Field('email', checks=EMAIL_CHECKS),
+        Field('password', checks=PASSWORD_CHECKS),
+    ),
+    allow_unknown=False
+)
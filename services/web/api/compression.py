@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""This module compresses the responses for the clients that accept it."""
+import gzip
+import hashlib
+import os
+
+from flask import current_app, request
+
+from .apispec import SPEC_ENDPOINT
+from .blueprints.extensions import app_logger
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = (
+    'application/json',
+    'application/javascript',
+    'application/x-ndjson',
+    'text/css',
+    'text/csv',
+    'text/html',
+    'text/javascript',
+    'text/plain',
+)
+PRECOMPRESSED_EXTENSIONS = ('.css', '.html', '.js')
+PRECOMPRESSED_LEVELS = {'br': 9, 'gzip': 9}
+STATIC_ENDPOINT = 'flasgger.static'
+
+
+def compress_data(data: bytes, encoding: str, level: int) -> bytes:
+    """Compress the data with the given encoding, either br or gzip."""
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+class Compress():
+    """Negotiate and apply the gzip or brotli compression of the responses.
+
+    Responses of at least COMPRESS_MIN_SIZE bytes are compressed at
+    COMPRESS_LEVEL for gzip and COMPRESS_BROTLI_LEVEL for brotli. The Swagger UI
+    assets are compressed at high levels once, when the app is created, and the
+    API spec is compressed once for each host it is served for.
+    """
+
+    def __init__(self):
+        """Create the extension."""
+        self.encodings = ('br', 'gzip') if brotli else ('gzip',)
+        self.precompressed = {}
+        self.spec_cache = {}
+
+    def init_app(self, app) -> None:
+        """Precompress the Swagger UI assets and compress the app's responses."""
+        self.precompress_static(app)
+        app.after_request(self.compress_response)
+        app_logger.info(f"Successfully initialized the {', '.join(self.encodings)} response compression.")
+
+    def precompress_static(self, app) -> None:
+        """Compress the Swagger UI assets with every supported encoding."""
+        blueprint = app.blueprints.get('flasgger')
+        if self.precompressed or blueprint is None or not blueprint.static_folder:
+            return
+
+        for root, _, filenames in os.walk(blueprint.static_folder):
+            for filename in filenames:
+                if not filename.endswith(PRECOMPRESSED_EXTENSIONS):
+                    continue
+
+                path = os.path.join(root, filename)
+                with open(path, 'rb') as f:
+                    data = f.read()
+
+                name = os.path.relpath(path, blueprint.static_folder).replace(os.sep, '/')
+                self.precompressed[name] = {
+                    encoding: compress_data(data, encoding, PRECOMPRESSED_LEVELS[encoding])
+                    for encoding in self.encodings
+                }
+
+    def compress_spec(self, data: bytes, encoding: str) -> bytes:
+        """Compress the API spec, once for each version of it."""
+        key = (hashlib.sha1(data).hexdigest(), encoding)
+        if key not in self.spec_cache:
+            if len(self.spec_cache) >= 2 * len(self.encodings):
+                self.spec_cache.clear()
+            self.spec_cache[key] = compress_data(data, encoding, PRECOMPRESSED_LEVELS[encoding])
+
+        return self.spec_cache[key]
+
+    def compress_response(self, response):
+        """Compress the response if the client accepts one of the supported encodings."""
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+
+        response.vary.add('Accept-Encoding')
+
+        if response.status_code != 200 or 'Content-Encoding' in response.headers:
+            return response
+
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if encoding is None:
+            return response
+
+        assets = None
+        if request.endpoint == STATIC_ENDPOINT:
+            assets = self.precompressed.get((request.view_args or {}).get('filename'))
+
+        if assets:
+            data = assets[encoding]
+            if hasattr(response.response, 'close'):
+                response.response.close()
+        else:
+            if response.is_streamed:
+                return response
+
+            data = response.get_data()
+            if len(data) < current_app.config['COMPRESS_MIN_SIZE']:
+                return response
+
+            if request.endpoint == SPEC_ENDPOINT:
+                data = self.compress_spec(data, encoding)
+            else:
+                level_setting = 'COMPRESS_BROTLI_LEVEL' if encoding == 'br' else 'COMPRESS_LEVEL'
+                data = compress_data(data, encoding, current_app.config[level_setting])
+
+        response.direct_passthrough = False
+        response.set_data(data)
+        response.headers['Content-Encoding'] = encoding
+
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+
+        return response
+
+
+compress = Compress()
@@ -2,6 +2,9 @@
 """This module contain the confuguration for the application."""
 import os
 
+from .database_config import get_engine_options
+from .settings import get_setting
+
 
 class BaseConfig():
     """Base configuration."""
@@ -20,6 +23,31 @@ class BaseConfig():
     db_conn_string = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
     SQLALCHEMY_DATABASE_URI = db_conn_string
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    REPLICA_DATABASE_URL = get_setting('REPLICA_DATABASE_URL')
+    SQLALCHEMY_BINDS = {'replica': REPLICA_DATABASE_URL} if REPLICA_DATABASE_URL else {}
+    REPLICA_STICKY_SECONDS = get_setting('REPLICA_STICKY_SECONDS')
+
+    GUNICORN_WORKERS = get_setting('GUNICORN_WORKERS')
+    CACHE_BACKEND = get_setting('CACHE_BACKEND')
+    CACHE_URL = get_setting('CACHE_URL')
+    CACHE_TTL = get_setting('CACHE_TTL')
+    CACHE_MAX_ENTRIES = get_setting('CACHE_MAX_ENTRIES')
+
+    COMPRESS_MIN_SIZE = get_setting('COMPRESS_MIN_SIZE')
+    COMPRESS_LEVEL = get_setting('COMPRESS_LEVEL')
+    COMPRESS_BROTLI_LEVEL = get_setting('COMPRESS_BROTLI_LEVEL')
+
+    APISPEC_PATH = get_setting('APISPEC_PATH')
+    JSON_BACKEND = get_setting('JSON_BACKEND')
+    SQLALCHEMY_ENGINE_OPTIONS = get_engine_options(
+        pool_size=5,
+        max_overflow=10,
+        pool_timeout=30,
+        pool_recycle=1800,
+        pool_pre_ping=True,
+        statement_timeout=30000,
+        idle_in_transaction_session_timeout=60000
+    )
 
 
 class TestingConfig(BaseConfig):
@@ -38,6 +66,15 @@ class TestingConfig(BaseConfig):
     db_conn_string = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
     SQLALCHEMY_DATABASE_URI = db_conn_string
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = get_engine_options(
+        pool_size=2,
+        max_overflow=2,
+        pool_timeout=10,
+        pool_recycle=1800,
+        pool_pre_ping=True,
+        statement_timeout=30000,
+        idle_in_transaction_session_timeout=60000
+    )
 
 
 class DevelopmentConfig(BaseConfig):
@@ -56,6 +93,15 @@ class DevelopmentConfig(BaseConfig):
     db_conn_string = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
     SQLALCHEMY_DATABASE_URI = db_conn_string
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = get_engine_options(
+        pool_size=5,
+        max_overflow=5,
+        pool_timeout=30,
+        pool_recycle=1800,
+        pool_pre_ping=True,
+        statement_timeout=30000,
+        idle_in_transaction_session_timeout=60000
+    )
 
 
 class StagingConfig(BaseConfig):
@@ -74,6 +120,15 @@ class StagingConfig(BaseConfig):
     db_conn_string = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
     SQLALCHEMY_DATABASE_URI = db_conn_string
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = get_engine_options(
+        pool_size=5,
+        max_overflow=10,
+        pool_timeout=10,
+        pool_recycle=1800,
+        pool_pre_ping=True,
+        statement_timeout=15000,
+        idle_in_transaction_session_timeout=30000
+    )
 
 
 class ProductionConfig(BaseConfig):
@@ -92,3 +147,12 @@ class ProductionConfig(BaseConfig):
     db_conn_string = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
     SQLALCHEMY_DATABASE_URI = db_conn_string
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = get_engine_options(
+        pool_size=10,
+        max_overflow=20,
+        pool_timeout=5,
+        pool_recycle=1800,
+        pool_pre_ping=True,
+        statement_timeout=10000,
+        idle_in_transaction_session_timeout=30000
+    )
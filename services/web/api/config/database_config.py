@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""This module contains the database engine and connection pool configuration."""
+import logging
+import threading
+import time
+
+from sqlalchemy.pool import QueuePool
+
+from .settings import get_setting
+
+logger = logging.getLogger(__name__)
+
+DATABASE_POOL_SETTINGS = {
+    'pool_size': 'DB_POOL_SIZE',
+    'max_overflow': 'DB_MAX_OVERFLOW',
+    'pool_timeout': 'DB_POOL_TIMEOUT',
+    'pool_recycle': 'DB_POOL_RECYCLE',
+    'pool_pre_ping': 'DB_POOL_PRE_PING',
+    'statement_timeout': 'DB_STATEMENT_TIMEOUT',
+    'idle_in_transaction_session_timeout': 'DB_IDLE_IN_TRANSACTION_TIMEOUT',
+}
+
+
+class PoolCheckoutStats():
+    """Keep track of how long the requests waited to check out a pooled connection.
+
+    Attributes
+    ----------
+    slow_checkout: float
+        The wait, in seconds, above which a checkout is logged as a warning.
+    """
+
+    def __init__(self, slow_checkout: float = 0.1):
+        """Create the statistics."""
+        self.slow_checkout = slow_checkout
+        self.__lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear the statistics."""
+        with self.__lock:
+            self.__count = 0
+            self.__slow_count = 0
+            self.__total_wait = 0.0
+            self.__max_wait = 0.0
+
+    def record(self, wait: float, pool: QueuePool) -> None:
+        """Record the wait of a single checkout."""
+        with self.__lock:
+            self.__count += 1
+            self.__total_wait += wait
+            self.__max_wait = max(self.__max_wait, wait)
+            slow = wait >= self.slow_checkout
+            if slow:
+                self.__slow_count += 1
+
+        if slow:
+            logger.warning(f'Waited {wait * 1000:.1f} ms for a database connection. {pool.status()}')
+
+    def report(self) -> dict:
+        """Return the checkout count, the slow checkouts and the average and maximum wait in milliseconds."""
+        with self.__lock:
+            average = self.__total_wait / self.__count if self.__count else 0.0
+            return {
+                'checkouts': self.__count,
+                'slow_checkouts': self.__slow_count,
+                'average_wait_ms': round(average * 1000, 3),
+                'max_wait_ms': round(self.__max_wait * 1000, 3),
+            }
+
+
+pool_checkout_stats = PoolCheckoutStats(slow_checkout=get_setting('DB_POOL_SLOW_CHECKOUT') / 1000)
+
+
+class TimedQueuePool(QueuePool):
+    """A queue pool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        """Check out a connection, recording the wait."""
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_checkout_stats.record(time.perf_counter() - start, self)
+
+
+def get_engine_options(**defaults) -> dict:
+    """Create the SQLALCHEMY_ENGINE_OPTIONS for an environment.
+
+    Each of the defaults can be overridden by its DB_ environment variable. The
+    timeouts are in milliseconds and are set on the server for every connection.
+
+    Attributes
+    ----------
+    defaults: dict
+        The defaults of the environment, keyed by the names in DATABASE_POOL_SETTINGS.
+
+    Returns
+    -------
+    engine_options: dict
+        The keyword arguments to create the engine with.
+    """
+    options = dict(defaults)
+    for option, name in DATABASE_POOL_SETTINGS.items():
+        value = get_setting(name)
+        if value is not None:
+            options[option] = value
+
+    statement_timeout = options.pop('statement_timeout')
+    idle_timeout = options.pop('idle_in_transaction_session_timeout')
+    options['poolclass'] = TimedQueuePool
+    options['connect_args'] = {
+        'options': f'-c statement_timeout={statement_timeout} '
+                   f'-c idle_in_transaction_session_timeout={idle_timeout}'
+    }
+
+    return options
@@ -1,8 +1,15 @@
 # -*- coding: utf-8 -*-
 """This module contain the confuguration for the application."""
+import gzip
 import json
 import logging
 import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from collections import deque
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.utils import formataddr
@@ -11,40 +18,457 @@ from smtplib import SMTP_SSL, SMTPException
 import boto3
 from dotenv import load_dotenv
 
+from .settings import get_setting
+
 load_dotenv()
 
+FIREHOSE_MAX_BATCH_RECORDS = 500
+FIREHOSE_MAX_BATCH_BYTES = 4 * 1024 * 1024
+FIREHOSE_RETRY_BACKOFF = 0.1
+FIREHOSE_FLUSH_TIMEOUT = 5.0
+FIREHOSE_MAX_RECORD_BYTES = 1000 * 1024
+
+AGGREGATE_COMPRESS_LEVEL = 6
+AGGREGATE_SYNC_BYTES = 64 * 1024
+AGGREGATE_GZIP_MARGIN = 1024
+AGGREGATE_GZIP_BATCH_FACTOR = 4
+
+SPOOL_FRAME_HEADER = struct.Struct('>I')
+SPOOL_MAX_BYTES = 64 * 1024 * 1024
+SPOOL_SEGMENT_BYTES = 1024 * 1024
+SPOOL_REPLAY_INTERVAL = 5.0
+SPOOL_MAX_BACKOFF = 60.0
+
+MAIL_CLOSE_TIMEOUT = 10.0
+
+
+def aggregate_records(lines: list, max_record_bytes: int = FIREHOSE_MAX_RECORD_BYTES, compress: bool = False) -> list:
+    """Pack the log lines into newline delimited records of at most max_record_bytes.
+
+    With compress, every record is a gzip member. The compressor is synced
+    every AGGREGATE_SYNC_BYTES, so the compressed size of a record is known as
+    it is packed, and the record is closed before it could pass the limit. A
+    single line larger than the limit is sent in a record of its own.
+
+    Attributes
+    ----------
+    lines: list
+        The encoded log lines, without their newlines.
+    max_record_bytes: int
+        The most bytes in a record, after compression.
+    compress: bool
+        Gzip every record.
+
+    Returns
+    -------
+    records: list
+        The records, as bytes.
+    """
+    if not compress:
+        records, parts, size = [], [], 0
+        for line in lines:
+            if parts and size + len(line) + 1 > max_record_bytes:
+                records.append(b''.join(parts))
+                parts, size = [], 0
+            parts.append(line + b'\n')
+            size += len(line) + 1
+
+        if parts:
+            records.append(b''.join(parts))
+
+        return records
+
+    records, parts, compressor, written, unsynced = [], [], None, 0, 0
+    for line in lines:
+        if compressor is not None and written + unsynced + len(line) + 1 + AGGREGATE_GZIP_MARGIN > max_record_bytes:
+            parts.append(compressor.flush())
+            records.append(b''.join(parts))
+            compressor = None
+
+        if compressor is None:
+            parts, written, unsynced = [], 0, 0
+            compressor = zlib.compressobj(AGGREGATE_COMPRESS_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+        data = compressor.compress(line + b'\n')
+        parts.append(data)
+        written += len(data)
+        unsynced += len(line) + 1
+
+        if unsynced >= AGGREGATE_SYNC_BYTES:
+            data = compressor.flush(zlib.Z_SYNC_FLUSH)
+            parts.append(data)
+            written += len(data)
+            unsynced = 0
+
+    if compressor is not None:
+        parts.append(compressor.flush())
+        records.append(b''.join(parts))
+
+    return records
+
+
+def split_batches(records: list, max_records: int = FIREHOSE_MAX_BATCH_RECORDS,
+                  max_bytes: int = FIREHOSE_MAX_BATCH_BYTES) -> list:
+    """Split the records into the batches of at most max_records records and max_bytes bytes put_record_batch takes."""
+    batches, batch, size = [], [], 0
+    for record in records:
+        if batch and (len(batch) >= max_records or size + len(record) > max_bytes):
+            batches.append(batch)
+            batch, size = [], 0
+        batch.append(record)
+        size += len(record)
+
+    if batch:
+        batches.append(batch)
+
+    return batches
+
+
+def read_spool_segment(path: str) -> list:
+    """Read the length prefixed records of a spool segment, stopping at a record cut short by a crash."""
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    records, offset = [], 0
+    while offset + SPOOL_FRAME_HEADER.size <= len(data):
+        (length,) = SPOOL_FRAME_HEADER.unpack_from(data, offset)
+        offset += SPOOL_FRAME_HEADER.size
+        if offset + length > len(data):
+            break
+        records.append(data[offset:offset + length])
+        offset += length
+
+    return records
+
+
+def is_process_alive(pid: int) -> bool:
+    """Check if the process with the given id is running."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    return True
+
+
+class FirehoseSpool():  # pylint: disable=R0902
+    """An append only spool on disk for the records that could not be delivered to Firehose.
+
+    Each process appends length prefixed records to its own open segment, named
+    after the time it was created and the process id. The segment is closed
+    once it reaches segment_bytes, or when it is the only one left to replay. A
+    background thread claims the closed segments, oldest first, by renaming
+    them, so the workers sharing the directory never replay the same segment.
+    It sends their records in batches with deliver, and writes the records that
+    were still not delivered back as a closed segment, backing off until the
+    stream recovers. The records are delivered at least once.
+
+    When the spool grows past max_bytes, the oldest closed segments are
+    deleted. The segments left open or claimed by a process that died are
+    closed again, so they are replayed by the other processes.
+
+    Attributes
+    ----------
+    directory: str
+        The directory of the segments, shared by all the workers.
+    deliver: callable
+        Puts a list of records in the delivery stream once, returning the ones
+        that were not delivered.
+    max_bytes: int
+        The most bytes kept in the directory.
+    segment_bytes: int
+        The size after which a segment is closed.
+    max_records: int
+        The most records replayed in one batch.
+    replay_interval: float
+        The seconds between the checks for segments to replay.
+    """
+
+    def __init__(self, directory: str, deliver, max_bytes: int = SPOOL_MAX_BYTES,  # pylint: disable=R0913
+                 segment_bytes: int = SPOOL_SEGMENT_BYTES, max_records: int = FIREHOSE_MAX_BATCH_RECORDS,
+                 replay_interval: float = SPOOL_REPLAY_INTERVAL):
+        """Create the spool, replaying the segments already in the directory."""
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.deliver = deliver
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.max_records = max_records
+        self.replay_interval = replay_interval
+
+        self.spooled_records = 0
+        self.replayed_records = 0
+        self.dropped_bytes = 0
+
+        self.__replayer = None
+        self.reset_after_fork()
+
+    def reset_after_fork(self) -> None:
+        """Give a forked worker its own open segment and replay thread.
+
+        The parent's open segment is dropped without being closed, since the
+        parent may still be appending to it. A replay thread that is still
+        alive means the spool is reset in the process that started it, which
+        first stops the thread and closes its own segment.
+        """
+        if self.__replayer and self.__replayer.is_alive():
+            self.close()
+
+        self.__lock = threading.Lock()
+        self.__stop = threading.Event()
+        self.__file = None
+        self.__path = None
+        self.__replayer = None
 
-class KinesisFirehoseDeliveryStreamHandler(logging.StreamHandler):
-    """This class sends our logs to Amazon Kinesis."""
+        if self.__segments('.closed', '.open', '.replay'):
+            self.start_replay()
 
-    def __init__(self):
-        """Initialize the firehose stream.."""
+    def append(self, records: list) -> None:
+        """Append the records to the open segment, closing it once it is full."""
+        if not records:
+            return
+
+        data = b''.join(SPOOL_FRAME_HEADER.pack(len(record)) + record for record in records)
+        with self.__lock:
+            if self.__file is None:
+                self.__path = os.path.join(self.directory, f'{time.time_ns():020d}-{os.getpid()}.open')
+                self.__file = open(self.__path, 'ab')  # pylint: disable=R1732
+
+            self.__file.write(data)
+            self.__file.flush()
+            self.spooled_records += len(records)
+
+            if self.__file.tell() >= self.segment_bytes:
+                self.__close_segment()
+                self.__enforce_max_bytes()
+
+        self.start_replay()
+
+    def start_replay(self) -> None:
+        """Start the replay thread, unless it is running."""
+        with self.__lock:
+            if self.__replayer is None or not self.__replayer.is_alive():
+                self.__replayer = threading.Thread(target=self.__replay, name='firehose-spool-replay', daemon=True)
+                self.__replayer.start()
+
+    def replay_once(self) -> bool:
+        """Replay the oldest closed segment, returning False if some of its records were not delivered."""
+        path = self.__claim_segment()
+        if path is None:
+            with self.__lock:
+                if self.__file is not None and self.__file.tell():
+                    self.__close_segment()
+            path = self.__claim_segment()
+            if path is None:
+                return True
+
+        records = read_spool_segment(path)
+        undelivered = []
+        start = 0
+        while start < len(records):
+            batch = records[start:start + self.max_records]
+            start += len(batch)
+            failed = self.deliver(batch)
+            self.replayed_records += len(batch) - len(failed)
+            if failed:
+                undelivered = failed + records[start:]
+                break
+
+        if undelivered:
+            self.__write_closed(os.path.basename(path).split('.')[0], undelivered)
+        os.remove(path)
+
+        return not undelivered
+
+    def close(self) -> None:
+        """Stop the replay thread and close the open segment, leaving it to be replayed on the next start."""
+        self.__stop.set()
+        if self.__replayer and self.__replayer.is_alive():
+            self.__replayer.join(FIREHOSE_FLUSH_TIMEOUT)
+
+        with self.__lock:
+            self.__close_segment()
+
+    def __replay(self) -> None:
+        """Replay the closed segments, backing off while the stream is failing, until the spool is closed."""
+        backoff = 0.0
+        while not self.__stop.wait(backoff or self.replay_interval):
+            self.__recover_segments()
+            try:
+                delivered = self.__replay_pending()
+            except Exception as e:
+                print(f"An error occurred while replaying the spooled records: {e}")
+                delivered = False
+
+            backoff = 0.0 if delivered else min(max(backoff * 2, self.replay_interval), SPOOL_MAX_BACKOFF)
+
+    def __replay_pending(self) -> bool:
+        """Replay the segments until none is left, returning False once the stream fails to take some records."""
+        while not self.__stop.is_set() and (self.__file is not None or self.__segments('.closed')):
+            if not self.replay_once():
+                return False
+
+        return True
+
+    def __segments(self, *suffixes: str) -> list:
+        """List the names of the segments with the given suffixes, oldest first."""
+        return sorted(name for name in os.listdir(self.directory) if name.endswith(suffixes))
+
+    def __close_segment(self) -> None:
+        """Close the open segment, so it can be replayed."""
+        if self.__file is None:
+            return
+
+        self.__file.close()
+        os.replace(self.__path, self.__path[:-len('.open')] + '.closed')
+        self.__file = None
+        self.__path = None
+
+    def __write_closed(self, stem: str, records: list) -> None:
+        """Write the records to a closed segment, through a temporary file."""
+        path = os.path.join(self.directory, f'{stem}.closed')
+        with open(f'{path}.tmp', 'wb') as f:
+            f.write(b''.join(SPOOL_FRAME_HEADER.pack(len(record)) + record for record in records))
+        os.replace(f'{path}.tmp', path)
+
+    def __claim_segment(self):
+        """Claim the oldest closed segment for this process, returning its path or None."""
+        for name in self.__segments('.closed'):
+            path = os.path.join(self.directory, f'{name[:-len(".closed")]}.{os.getpid()}.replay')
+            try:
+                os.rename(os.path.join(self.directory, name), path)
+            except FileNotFoundError:
+                continue
+            return path
+
+        return None
+
+    def __recover_segments(self) -> None:
+        """Close again the segments left open or claimed by the processes that died."""
+        for name in self.__segments('.open', '.replay'):
+            stem, _, suffix = name.partition('.')
+            pid = stem.split('-')[1] if suffix == 'open' else suffix.split('.')[0]
+            if pid.isdigit() and not is_process_alive(int(pid)):
+                try:
+                    os.replace(os.path.join(self.directory, name), os.path.join(self.directory, f'{stem}.closed'))
+                except FileNotFoundError:
+                    pass
+
+    def __enforce_max_bytes(self) -> None:
+        """Delete the oldest closed segments while the spool is larger than max_bytes."""
+        sizes = {entry.name: entry.stat().st_size for entry in os.scandir(self.directory) if entry.is_file()}
+        total = sum(sizes.values())
+        for name in self.__segments('.closed'):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            total -= sizes[name]
+            self.dropped_bytes += sizes[name]
+
+
+class KinesisFirehoseDeliveryStreamHandler(logging.StreamHandler):  # pylint: disable=R0902
+    """This class sends our logs to Amazon Kinesis.
+
+    By default every record is sent to Firehose as soon as it is logged. In
+    buffered mode the records are only queued, and a background thread sends
+    them with put_record_batch once max_records records or max_bytes bytes are
+    queued, or every flush_interval seconds. Records that Firehose fails to put
+    are retried on their own, up to max_retries times.
+
+    With a spool_dir, the records that are still not delivered are written to a
+    FirehoseSpool on disk and replayed once the stream recovers, instead of
+    being kept in memory. The spool and its replay thread are only created when
+    the handler emits its first record, so a handler that is configured but not
+    attached to a logger touches no file and starts no thread.
+
+    In buffered mode, aggregate packs the log lines into newline delimited
+    Firehose records of up to 1000 KiB, gzipped with compress, so far fewer
+    records are put for the same lines.
+    """
+
+    def __init__(self, buffered=False, max_records=FIREHOSE_MAX_BATCH_RECORDS,  # pylint: disable=R0913
+                 max_bytes=FIREHOSE_MAX_BATCH_BYTES, flush_interval=1.0, max_retries=3,
+                 max_buffered_records=10000, client=None, spool_dir=None, aggregate=False, compress=False):
+        """Initialize the firehose stream.
+
+        Attributes
+        ----------
+        buffered: bool
+            Send the records from a background thread, in batches.
+        max_records: int
+            The most records sent in one batch, at most 500.
+        max_bytes: int
+            The most bytes sent in one batch, at most 4 MiB.
+        flush_interval: float
+            The most seconds a record waits in the buffer.
+        max_retries: int
+            How many times the records that failed to be put are retried.
+        max_buffered_records: int
+            The most records kept in the buffer, the oldest are dropped after that.
+        client: botocore.client.Firehose
+            The firehose client to use instead of creating one.
+        spool_dir: str
+            The directory of the spool the undelivered records are written to
+            and replayed from, FIREHOSE_SPOOL_DIR by default. Without one they
+            are written to the stream.
+        aggregate: bool
+            Pack the buffered lines into newline delimited records, if
+            FIREHOSE_AGGREGATE is not set to true.
+        compress: bool
+            Gzip the aggregated records, if FIREHOSE_COMPRESS is not set to true.
+        """
         # By default, logging.StreamHandler uses sys.stderr if stream parameter is not specified
         logging.StreamHandler.__init__(self)
 
-        self.__firehose = None
+        self.__client = client
+        self.__firehose = client or self.__create_client()
         self.__stream_buffer = []
-        self.__aws_key = os.environ['AWS_KEY']
-        self.__aws_secret = os.environ['AWS_SECRET']
-        self.__aws_region = os.environ['AWS_REGION']
-
-        try:
-            self.__firehose = boto3.client(
-                'firehose',
-                aws_access_key_id=self.__aws_key,
-                aws_secret_access_key=self.__aws_secret,
-                region_name=self.__aws_region
-            )
-        except Exception:
-            print('Firehose client initialization failed.')
 
         self.__delivery_stream_name = os.environ['FIREHOSE_DELIVERY_STREAM']
 
+        self.__buffered = buffered
+        self.__max_records = min(max_records, FIREHOSE_MAX_BATCH_RECORDS)
+        self.__max_bytes = min(max_bytes, FIREHOSE_MAX_BATCH_BYTES)
+        self.__flush_interval = flush_interval
+        self.__max_retries = max_retries
+        self.__aggregate = aggregate or get_setting('FIREHOSE_AGGREGATE')
+        self.__compress = compress or get_setting('FIREHOSE_COMPRESS')
+        self.__batch_lines = self.__max_records
+        self.__batch_bytes = self.__max_bytes
+        if self.__aggregate:
+            self.__batch_lines = max(max_buffered_records // 2, 1)
+            self.__batch_bytes = self.__max_bytes * (AGGREGATE_GZIP_BATCH_FACTOR if self.__compress else 1)
+        self.__pending = deque(maxlen=max_buffered_records)
+        self.__pending_bytes = 0
+        self.__in_flight = 0
+        self.__closing = False
+        self.__flush_requested = False
+        self.__condition = threading.Condition()
+        self.__sender = None
+
+        self.dropped_records = 0
+        self.undelivered_records = 0
+
+        self.__spool_dir = spool_dir or get_setting('FIREHOSE_SPOOL_DIR')
+        self.spool = None
+
     def emit(self, record):
         """Send the formatted log to AWS Firehose."""
         try:
+            if self.spool is None and self.__spool_dir and self.__firehose:
+                self.__open_spool()
+
             msg = self.format(record)
 
+            if self.__firehose and self.__buffered:
+                self.__enqueue(msg.encode(encoding="UTF-8", errors="strict"))
+                return
+
             if self.__firehose:
                 self.__stream_buffer.append({
                     'Data': msg.encode(encoding="UTF-8", errors="strict")
@@ -60,31 +484,219 @@ class KinesisFirehoseDeliveryStreamHandler(logging.StreamHandler):
 
     def flush(self):
         """Flush the log buffer."""
+        if self.__buffered:
+            self.__drain(self.__flush_interval + FIREHOSE_FLUSH_TIMEOUT)
+            return
+
         self.acquire()
 
         try:
             if self.__firehose and self.__stream_buffer:
-                self.__firehose.put_record_batch(
-                    DeliveryStreamName=self.__delivery_stream_name,
-                    Records=self.__stream_buffer
-                )
-
+                records = [record['Data'] for record in self.__stream_buffer]
                 self.__stream_buffer.clear()
-        except Exception as e:
-            print("An error occurred during flush operation.")
-            print(f"Exception: {e}")
-            print(f"Stream buffer: {self.__stream_buffer}")
+                undelivered = self.deliver(records)
+                if undelivered:
+                    self.handle_undelivered(undelivered)
         finally:
             if self.stream and hasattr(self.stream, "flush"):
                 self.stream.flush()
 
             self.release()
 
+    def close(self):
+        """Send the buffered records and stop the sender thread."""
+        if self.__buffered:
+            with self.__condition:
+                self.__closing = True
+                self.__condition.notify_all()
+
+            if self.__sender and self.__sender.is_alive():
+                self.__sender.join(FIREHOSE_FLUSH_TIMEOUT)
+
+        if self.spool:
+            self.spool.close()
+
+        logging.StreamHandler.close(self)
+
+    def reset_after_fork(self):
+        """Give a forked worker its own Firehose client and buffer.
+
+        The client's connections, the buffered records and the sender thread
+        belong to the parent process, so the child starts afresh. Threads do
+        not survive a fork, so a sender that is still alive means the handler
+        is reset in the process that started it, which first sends what is
+        buffered and stops the sender.
+        """
+        if self.__sender and self.__sender.is_alive():
+            with self.__condition:
+                self.__closing = True
+                self.__condition.notify_all()
+            self.__sender.join(FIREHOSE_FLUSH_TIMEOUT)
+
+        self.__firehose = self.__client or self.__create_client()
+        self.__stream_buffer = []
+        self.__pending = deque(maxlen=self.__pending.maxlen)
+        self.__pending_bytes = 0
+        self.__in_flight = 0
+        self.__closing = False
+        self.__flush_requested = False
+        self.__condition = threading.Condition()
+        self.__sender = None
+        if self.spool:
+            self.spool.reset_after_fork()
+
+    def deliver(self, records: list) -> list:
+        """Put the records in the delivery stream once, returning the ones that were not delivered."""
+        try:
+            response = self.__firehose.put_record_batch(
+                DeliveryStreamName=self.__delivery_stream_name,
+                Records=[{'Data': record} for record in records]
+            )
+        except Exception as e:
+            print(f"An error occurred while putting {len(records)} records in the delivery stream: {e}")
+            return records
+
+        if not response.get('FailedPutCount'):
+            return []
+
+        return [record for record, result in zip(records, response['RequestResponses']) if result.get('ErrorCode')]
+
+    def handle_undelivered(self, records: list):
+        """Spool the records that could not be delivered, or write them to the stream, so they are not lost."""
+        self.undelivered_records += len(records)
+
+        if self.spool:
+            self.spool.append(records)
+            return
+
+        self.acquire()
+        try:
+            for record in records:
+                if record[:2] == b'\x1f\x8b':
+                    record = gzip.decompress(record)
+                self.stream.write(record.decode(encoding="UTF-8", errors="replace").rstrip('\n'))
+                self.stream.write(self.terminator)
+            self.stream.flush()
+        finally:
+            self.release()
+
+    @staticmethod
+    def __create_client():
+        """Create the Firehose client."""
+        try:
+            return boto3.client(
+                'firehose',
+                aws_access_key_id=os.environ['AWS_KEY'],
+                aws_secret_access_key=os.environ['AWS_SECRET'],
+                region_name=os.environ['AWS_REGION']
+            )
+        except Exception:
+            print('Firehose client initialization failed.')
+            return None
+
+    def __open_spool(self):
+        """Create the spool, which starts replaying the segments already in its directory."""
+        self.spool = FirehoseSpool(
+            self.__spool_dir,
+            self.deliver,
+            max_bytes=get_setting('FIREHOSE_SPOOL_MAX_MB') * 1024 * 1024,
+            max_records=self.__max_records
+        )
+
+    def __enqueue(self, data: bytes):
+        """Add an encoded record to the buffer, waking the sender once a batch is ready."""
+        with self.__condition:
+            if len(self.__pending) == self.__pending.maxlen:
+                self.__pending_bytes -= len(self.__pending[0])
+                self.dropped_records += 1
+
+            self.__pending.append(data)
+            self.__pending_bytes += len(data)
+
+            if self.__sender is None or not self.__sender.is_alive():
+                self.__sender = threading.Thread(target=self.__send_batches, name='firehose-sender', daemon=True)
+                self.__sender.start()
+
+            if self.__batch_ready():
+                self.__condition.notify_all()
+
+    def __batch_ready(self) -> bool:
+        """Check if a full batch of records is buffered."""
+        return len(self.__pending) >= self.__batch_lines or self.__pending_bytes >= self.__batch_bytes
 
-class CustomEmailLogger(logging.Handler):
-    """Custom email logger."""
+    def __take_batch(self) -> list:
+        """Remove the next batch of records from the buffer."""
+        batch, size = [], 0
+        while self.__pending and len(batch) < self.__batch_lines:
+            if batch and size + len(self.__pending[0]) > self.__batch_bytes:
+                break
+            record = self.__pending.popleft()
+            batch.append(record)
+            size += len(record)
 
-    def __init__(self) -> None:
+        self.__pending_bytes -= size
+        self.__in_flight = len(batch)
+
+        return batch
+
+    def __send_batches(self):
+        """Send the buffered records in batches until the handler is closed."""
+        while True:
+            with self.__condition:
+                if not self.__batch_ready() and not self.__closing and not self.__flush_requested:
+                    self.__condition.wait(self.__flush_interval)
+                batch = self.__take_batch()
+                closing = self.__closing
+
+            if batch and self.__aggregate:
+                records = aggregate_records(batch, compress=self.__compress)
+                for records_batch in split_batches(records, self.__max_records, self.__max_bytes):
+                    self.__put_records(records_batch)
+            elif batch:
+                self.__put_records(batch)
+
+            with self.__condition:
+                self.__in_flight = 0
+                if not self.__pending:
+                    self.__flush_requested = False
+                    self.__condition.notify_all()
+                    if closing:
+                        return
+
+    def __put_records(self, records: list):
+        """Put the records in the delivery stream, retrying only the ones that failed."""
+        for attempt in range(self.__max_retries + 1):
+            if attempt:
+                time.sleep(min(FIREHOSE_RETRY_BACKOFF * 2 ** (attempt - 1), FIREHOSE_FLUSH_TIMEOUT))
+
+            records = self.deliver(records)
+            if not records:
+                return
+
+        self.handle_undelivered(records)
+
+    def __drain(self, timeout: float):
+        """Wait until the sender thread has sent every buffered record."""
+        with self.__condition:
+            if not self.__sender or not self.__sender.is_alive():
+                return
+            self.__flush_requested = True
+            self.__condition.notify_all()
+            self.__condition.wait_for(lambda: not self.__pending and not self.__in_flight, timeout)
+
+
+class CustomEmailLogger(logging.Handler):  # pylint: disable=R0902
+    """Custom email logger.
+
+    Critical records are only queued by emit(). A background thread mails them
+    over one persistent, logged in SMTP connection. The first record with a
+    given logger name, level and message is mailed right away; identical
+    records logged in the next digest_window seconds are collapsed into a
+    single digest mail sent at the end of the window. At most max_emails mails
+    are sent every rate_period seconds, the rest wait for a later window.
+    """
+
+    def __init__(self, digest_window=60.0, max_emails=10, rate_period=60.0, max_queued_records=1000) -> None:
         """Initialize the logger."""
         logging.Handler.__init__(self)
         self.mailport = 465
@@ -95,50 +707,175 @@ class CustomEmailLogger(logging.Handler):
         self.password = os.environ['MAIL_PASSWORD']
         self.sender_name = 'Lyle from Amazon'
 
+        self.digest_window = digest_window
+        self.max_emails = max_emails
+        self.rate_period = rate_period
+        self.dropped_records = 0
+
+        self.__queue = queue.Queue(maxsize=max_queued_records)
+        self.__worker = None
+        self.__server = None
+        self.__sent_at = deque()
+
     def emit(self, record):
         """
         Emit a record.
 
-        Format the record and send it to the specified addressees.
+        Format the record and queue it to be sent to the specified addressees.
         """
         try:
             log_record = json.loads(self.format(record))
 
-            # Try to send the message.
             if log_record['levelname'] in ['CRITICAL']:
-                with SMTP_SSL(self.mailhost, self.mailport) as server:
-                    SUBJECT = log_record['levelname']
-                    BODY_HTML = f"""
-                    <html>
-                        <head>
-                        </head>
-                        <body>
-                            <h1>
-                                {log_record['name']}
-                            </h1>
-                            <p>
-                                {log_record['message']}
-                            </p>
-                        </body>
-                    </html>"""
-                    msg = MIMEMultipart('alternative')
-                    msg['Subject'] = SUBJECT
-                    msg['From'] = formataddr((self.sender_name, self.fromaddr))
-                    msg['To'] = self.toaddrs
-
-                    part2 = MIMEText(BODY_HTML, 'html')
-
-                    msg.attach(part2)
-                    server.login(self.username, self.password)
-                    server.sendmail(self.fromaddr, self.toaddrs, msg.as_string())
-                    server.close()
-                    print("Email sent!")
-
-        except SMTPException as e:
-            print("Error: ", e)
+                if self.__worker is None or not self.__worker.is_alive():
+                    self.__worker = threading.Thread(target=self.__send_emails, name='email-sender', daemon=True)
+                    self.__worker.start()
+
+                self.__queue.put_nowait(log_record)
+        except queue.Full:
+            self.dropped_records += 1
         except Exception as e:
             print(f"Exception: {e}")
 
     def close(self):
-        """Terminate the handler."""
+        """Send the pending digests and terminate the handler."""
+        if self.__worker and self.__worker.is_alive():
+            self.__queue.put(None)
+            self.__worker.join(MAIL_CLOSE_TIMEOUT)
+
         logging.Handler.close(self)
+
+    def reset_after_fork(self):
+        """Give a forked worker its own queue and SMTP connection.
+
+        The parent's connection is dropped without being closed, since the
+        parent may still be using it. A worker that is still alive belongs to
+        this process, and is stopped first.
+        """
+        if self.__worker and self.__worker.is_alive():
+            self.__queue.put(None)
+            self.__worker.join(MAIL_CLOSE_TIMEOUT)
+
+        self.__queue = queue.Queue(maxsize=self.__queue.maxsize)
+        self.__worker = None
+        self.__server = None
+        self.__sent_at = deque()
+
+    def create_email(self, log_record: dict, count: int = 1) -> MIMEMultipart:
+        """Create the mail for a log record that was logged count times."""
+        SUBJECT = log_record['levelname']
+        summary = ''
+        if count > 1:
+            SUBJECT = f"{log_record['levelname']} ({count} similar records)"
+            summary = f"<p>This record was logged {count} times in the last {self.digest_window:g} seconds.</p>"
+
+        BODY_HTML = f"""
+        <html>
+            <head>
+            </head>
+            <body>
+                <h1>
+                    {log_record['name']}
+                </h1>
+                <p>
+                    {log_record['message']}
+                </p>
+                {summary}
+            </body>
+        </html>"""
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = SUBJECT
+        msg['From'] = formataddr((self.sender_name, self.fromaddr))
+        msg['To'] = self.toaddrs
+
+        part2 = MIMEText(BODY_HTML, 'html')
+
+        msg.attach(part2)
+
+        return msg
+
+    def __send_emails(self):
+        """Mail the queued records, collapsing identical ones into digests."""
+        digests = {}
+        while True:
+            timeout = None
+            if digests:
+                timeout = max(min(digest['window_end'] for digest in digests.values()) - time.monotonic(), 0)
+
+            try:
+                log_record = self.__queue.get(timeout=timeout)
+            except queue.Empty:
+                log_record = {}
+
+            if log_record is None:
+                break
+
+            if log_record:
+                key = (log_record['name'], log_record['levelname'], log_record['message'])
+                if key in digests:
+                    digests[key]['count'] += 1
+                else:
+                    sent = self.__send_email(log_record, 1)
+                    digests[key] = {
+                        'log_record': log_record,
+                        'count': 0 if sent else 1,
+                        'window_end': self.__next_window_end()
+                    }
+
+            for key, digest in list(digests.items()):
+                if digest['window_end'] > time.monotonic():
+                    continue
+                if digest['count'] and not self.__send_email(digest['log_record'], digest['count']):
+                    digest['window_end'] = self.__next_window_end()
+                    continue
+                del digests[key]
+
+        for digest in digests.values():
+            if digest['count']:
+                self.__send_email(digest['log_record'], digest['count'], limit_rate=False)
+
+        self.__disconnect()
+
+    def __next_window_end(self) -> float:
+        """Get the end of a new digest window, pushed back until the rate limit allows a mail."""
+        window_end = time.monotonic() + self.digest_window
+        if len(self.__sent_at) >= self.max_emails:
+            window_end = max(window_end, self.__sent_at[0] + self.rate_period)
+
+        return window_end
+
+    def __send_email(self, log_record: dict, count: int, limit_rate: bool = True) -> bool:
+        """Send the mail over the persistent connection, unless the rate limit is reached."""
+        now = time.monotonic()
+        while self.__sent_at and now - self.__sent_at[0] >= self.rate_period:
+            self.__sent_at.popleft()
+
+        if limit_rate and len(self.__sent_at) >= self.max_emails:
+            return False
+
+        msg = self.create_email(log_record, count)
+        for _ in range(2):
+            try:
+                if not self.__server:
+                    self.__server = SMTP_SSL(self.mailhost, self.mailport)
+                    self.__server.login(self.username, self.password)
+                self.__server.sendmail(self.fromaddr, self.toaddrs, msg.as_string())
+            except (SMTPException, OSError) as e:
+                print("Error: ", e)
+                self.__disconnect()
+            else:
+                self.__sent_at.append(now)
+                print("Email sent!")
+                return True
+
+        # The mail failed even over a new connection, so it is dropped rather than retried forever.
+        return True
+
+    def __disconnect(self):
+        """Close the SMTP connection, if any."""
+        if self.__server:
+            try:
+                self.__server.quit()
+            except (SMTPException, OSError):
+                pass
+            self.__server = None
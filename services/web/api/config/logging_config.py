@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""This module contains the asynchronous logging pipeline."""
+import atexit
+import copy
+import logging
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_QUEUE_OVERFLOW_POLICIES = ('drop-oldest', 'drop-debug', 'block')
+
+queue_listeners = []
+
+
+class BoundedQueueHandler(QueueHandler):
+    """Put log records on a bounded queue, to be handled by a listener thread.
+
+    The records are not formatted here, so the request thread only pays for
+    merging the message arguments and putting the record on the queue. When the
+    queue is full the overflow policy decides what happens:
+
+    drop-oldest
+        The oldest queued record is dropped to make room.
+    drop-debug
+        Records below WARNING are dropped, the others wait for room.
+    block
+        Every record waits for room.
+    """
+
+    def __init__(self, maxsize: int = 10000, overflow: str = 'drop-oldest'):
+        """Create the handler and its queue."""
+        if overflow not in LOG_QUEUE_OVERFLOW_POLICIES:
+            raise ValueError(f'The overflow has to be one of {LOG_QUEUE_OVERFLOW_POLICIES}.')
+
+        QueueHandler.__init__(self, queue.Queue(maxsize=maxsize))
+        self.overflow = overflow
+        self.dropped_records = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Get the number of records waiting to be handled."""
+        return self.queue.qsize()
+
+    def prepare(self, record):
+        """Merge the message arguments, leaving the formatting to the listener's handlers."""
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        """Put the record on the queue, applying the overflow policy if it is full."""
+        if self.overflow == 'block':
+            self.queue.put(record)
+            return
+
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+
+        if self.overflow == 'drop-debug':
+            if record.levelno < logging.WARNING:
+                self.dropped_records += 1
+            else:
+                self.queue.put(record)
+            return
+
+        while True:
+            try:
+                self.queue.get_nowait()
+                self.dropped_records += 1
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(record)
+                return
+            except queue.Full:
+                continue
+
+
+def stop_queue_listener(listener: QueueListener) -> None:
+    """Stop the listener, handling the records still queued, unless it is already stopped."""
+    if listener._thread:
+        listener.stop()
+
+
+def enable_queue_logging(logger: logging.Logger, maxsize: int = 10000, overflow: str = 'drop-oldest') -> QueueListener:
+    """Move the logger's handlers behind a bounded queue.
+
+    The handlers currently attached to the logger are detached and handed to a
+    QueueListener, whose thread formats the records and passes them on. The
+    logger is left with a single BoundedQueueHandler. The listener is stopped,
+    handling the records still queued, when the interpreter exits.
+
+    Attributes
+    ----------
+    logger: logging.Logger
+        The logger whose handlers are moved behind the queue.
+    maxsize: int
+        The most records kept in the queue.
+    overflow: str
+        One of drop-oldest, drop-debug or block.
+
+    Returns
+    -------
+    listener: logging.handlers.QueueListener
+        The started listener.
+    """
+    handlers = list(logger.handlers)
+    for handler in handlers:
+        logger.removeHandler(handler)
+
+    queue_handler = BoundedQueueHandler(maxsize, overflow)
+    logger.addHandler(queue_handler)
+
+    listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(stop_queue_listener, listener)
+    queue_listeners.append((queue_handler, listener))
+
+    return listener
+
+
+class DeduplicatingFilter(logging.Filter):
+    """Let through a burst of similar records in every window, suppressing the rest.
+
+    Records are similar when they have the same logger, level and message
+    template. Once a key has passed burst records in a window, its later records
+    are dropped and counted. When the window ends, a single summary record
+    is sent to the handler, at the same level, saying how many were suppressed.
+    Expired windows are swept at most once per window, so at most burst
+    records and one summary per key are handled in each window.
+
+    Attributes
+    ----------
+    handler: logging.Handler
+        The handler the filter is attached to, which the summaries are sent to.
+    window: float
+        The seconds over which the similar records are counted.
+    burst: int
+        The similar records let through in every window.
+    """
+
+    def __init__(self, handler: logging.Handler, window: float = 10, burst: int = 5):
+        """Create the filter."""
+        logging.Filter.__init__(self)
+        self.handler = handler
+        self.window = window
+        self.burst = burst
+        self.suppressed_records = 0
+        self.__lock = threading.Lock()
+        self.__windows = {}
+        self.__next_sweep = 0.0
+
+    def filter(self, record) -> bool:
+        """Let the record through unless its key has used up the burst of the current window."""
+        if getattr(record, 'suppressed_summary', False):
+            return True
+
+        msg = record.msg if isinstance(record.msg, str) else str(record.msg)
+        key = (record.name, record.levelno, msg)
+        now = time.monotonic()
+
+        with self.__lock:
+            summaries = self.__sweep(now) if now >= self.__next_sweep else []
+
+            counts = self.__windows.get(key)
+            if counts is None:
+                self.__windows[key] = [now, 1, 0]
+                allowed = True
+            else:
+                counts[1] += 1
+                allowed = counts[1] <= self.burst
+                if not allowed:
+                    counts[2] += 1
+                    self.suppressed_records += 1
+
+        for summary in summaries:
+            self.emit_summary(*summary)
+
+        return allowed
+
+    def __sweep(self, now: float) -> list:
+        """Forget the expired windows, returning the keys and counts of the ones that suppressed records."""
+        self.__next_sweep = now + self.window
+        summaries = []
+        for key, (start, _, suppressed) in list(self.__windows.items()):
+            if now - start >= self.window:
+                del self.__windows[key]
+                if suppressed:
+                    summaries.append((key, suppressed))
+
+        return summaries
+
+    def emit_summary(self, key: tuple, suppressed: int) -> None:
+        """Send the handler a record saying how many similar records were suppressed."""
+        name, level, msg = key
+        record = logging.makeLogRecord({
+            'name': name,
+            'levelno': level,
+            'levelname': logging.getLevelName(level),
+            'msg': 'Suppressed %d similar records in %ss: %s',
+            'args': (suppressed, self.window, msg),
+            'suppressed_summary': True,
+            'suppressed': suppressed,
+        })
+        self.handler.handle(record)
+
+    def flush(self) -> None:
+        """Send the summaries of every window that suppressed records, ending the windows."""
+        with self.__lock:
+            summaries = [(key, suppressed) for key, (_, _, suppressed) in self.__windows.items() if suppressed]
+            self.__windows.clear()
+
+        for summary in summaries:
+            self.emit_summary(*summary)
+
+
+def enable_log_deduplication(logger: logging.Logger, window: float = 10, burst: int = 5) -> list:
+    """Attach a DeduplicatingFilter to each of the logger's handlers.
+
+    The filters are added to the handlers, since the filters of a logger do not
+    apply to the records its children propagate to it. Call this after
+    enable_queue_logging, so the suppressed records are dropped before they are
+    queued. The pending summaries are sent when the interpreter exits.
+
+    Attributes
+    ----------
+    logger: logging.Logger
+        The logger whose handlers are filtered.
+    window: float
+        The seconds over which the similar records are counted.
+    burst: int
+        The similar records let through in every window.
+
+    Returns
+    -------
+    filters: list
+        The filters, one for each handler.
+    """
+    filters = []
+    for handler in logger.handlers:
+        dedup_filter = DeduplicatingFilter(handler, window, burst)
+        handler.addFilter(dedup_filter)
+        atexit.register(dedup_filter.flush)
+        filters.append(dedup_filter)
+
+    return filters
+
+
+def reset_logging_after_fork() -> None:
+    """Give a forked worker its own logging queues, listener threads and handler resources.
+
+    Threads do not survive a fork, so every queue listener is restarted on a new
+    queue, and every handler that holds connections or threads is reset.
+    """
+    handlers = list(logging.getLogger().handlers)
+
+    for queue_handler, listener in queue_listeners:
+        queue_handler.queue = queue.Queue(maxsize=queue_handler.queue.maxsize)
+        listener.queue = queue_handler.queue
+        listener._thread = None
+        listener.start()
+        handlers.extend(listener.handlers)
+
+    for handler in handlers:
+        if hasattr(handler, 'reset_after_fork'):
+            handler.reset_after_fork()
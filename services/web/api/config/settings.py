@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""This module declares the settings the application reads from the environment."""
+import os
+
+FLASK_ENVIRONMENTS = ('development', 'test', 'stage', 'production')
+
+SETTINGS = {
+    'FLASK_APP': {'required': True},
+    'FLASK_ENV': {'required': True, 'choices': FLASK_ENVIRONMENTS},
+    'SECRET_KEY': {'required': True, 'secret': True},
+    'POSTGRES_HOST': {'required': True},
+    'POSTGRES_DB': {'required': True},
+    'POSTGRES_PORT': {'required': True, 'type': int},
+    'POSTGRES_USER': {'required': True},
+    'POSTGRES_PASSWORD': {'required': True, 'secret': True},
+    'MAIL_HOST': {'required': True, 'secret': True},
+    'MAIL_PORT': {'required': True, 'secret': True},
+    'MAIL_USERNAME': {'required': True, 'secret': True},
+    'MAIL_PASSWORD': {'required': True, 'secret': True},
+    'AWS_KEY': {'required': True, 'secret': True},
+    'AWS_SECRET': {'required': True, 'secret': True},
+    'AWS_REGION': {'required': True, 'secret': True},
+    'FIREHOSE_DELIVERY_STREAM': {'required': True},
+    'DATABASE_CHECK_ENABLED': {'type': bool, 'default': True},
+    'DATABASE_CHECK_TIMEOUT': {'type': int, 'default': 3},
+    'DB_POOL_SIZE': {'type': int},
+    'DB_MAX_OVERFLOW': {'type': int},
+    'DB_POOL_TIMEOUT': {'type': int},
+    'DB_POOL_RECYCLE': {'type': int},
+    'DB_POOL_PRE_PING': {'type': bool},
+    'DB_POOL_SLOW_CHECKOUT': {'type': int, 'default': 100},
+    'DB_STATEMENT_TIMEOUT': {'type': int},
+    'DB_IDLE_IN_TRANSACTION_TIMEOUT': {'type': int},
+    'REPLICA_DATABASE_URL': {'secret': True},
+    'REPLICA_STICKY_SECONDS': {'type': int, 'default': 5},
+    'GUNICORN_WORKERS': {'type': int, 'default': 1},
+    'CACHE_BACKEND': {'choices': ('auto', 'lru', 'shared', 'none'), 'default': 'auto'},
+    'CACHE_URL': {'secret': True},
+    'CACHE_TTL': {'type': int, 'default': 60},
+    'CACHE_MAX_ENTRIES': {'type': int, 'default': 1024},
+    'COMPRESS_MIN_SIZE': {'type': int, 'default': 500},
+    'COMPRESS_LEVEL': {'type': int, 'default': 6},
+    'COMPRESS_BROTLI_LEVEL': {'type': int, 'default': 4},
+    'APISPEC_PATH': {},
+    'JSON_BACKEND': {'choices': ('orjson', 'stdlib'), 'default': 'orjson'},
+    'LOG_QUEUE_ENABLED': {'type': bool, 'default': False},
+    'LOG_QUEUE_SIZE': {'type': int, 'default': 10000},
+    'LOG_QUEUE_OVERFLOW': {'choices': ('drop-oldest', 'drop-debug', 'block'), 'default': 'drop-oldest'},
+    'LOG_DEDUP_ENABLED': {'type': bool, 'default': False},
+    'LOG_DEDUP_WINDOW': {'type': int, 'default': 10},
+    'LOG_DEDUP_BURST': {'type': int, 'default': 5},
+    'FIREHOSE_SPOOL_DIR': {},
+    'FIREHOSE_SPOOL_MAX_MB': {'type': int, 'default': 64},
+    'FIREHOSE_AGGREGATE': {'type': bool, 'default': False},
+    'FIREHOSE_COMPRESS': {'type': bool, 'default': False},
+}
+
+
+def parse_setting(name: str, value: str, schema: dict):
+    """Convert the raw value of a setting to the type in its schema.
+
+    Raises
+    ------
+    ValueError:
+        If the value cannot be converted or is not one of the choices.
+    """
+    setting_type = schema.get('type', str)
+
+    if setting_type is bool:
+        if value.lower() not in ('true', 'false', '1', '0'):
+            raise ValueError(f'The {name} has to be true or false.')
+        value = value.lower() in ('true', '1')
+    elif setting_type is int:
+        try:
+            value = int(value)
+        except ValueError as e:
+            raise ValueError(f'The {name} has to be an integer.') from e
+
+    if 'choices' in schema and value not in schema['choices']:
+        raise ValueError(f"The {name} has to be one of {', '.join(schema['choices'])}.")
+
+    return value
+
+
+def get_setting(name: str, environ=None):
+    """Get the parsed value of a setting, or its default if it is not set.
+
+    The settings are read when the modules are imported, before
+    validate_settings runs, so an invalid value also gets the default here and
+    is left to validate_settings to report with the other errors.
+    """
+    if environ is None:
+        environ = os.environ
+
+    value = environ.get(name)
+    if value is None or value == '':
+        return SETTINGS[name].get('default')
+
+    try:
+        return parse_setting(name, value, SETTINGS[name])
+    except ValueError:
+        return SETTINGS[name].get('default')
+
+
+def validate_settings(environ=None) -> tuple:
+    """Validate all the settings in one pass.
+
+    Attributes
+    ----------
+    environ: dict
+        The environment to read the settings from. Defaults to os.environ.
+
+    Returns
+    -------
+    result: tuple
+        The parsed settings and the list of every error found.
+    """
+    if environ is None:
+        environ = os.environ
+
+    settings, errors = {}, []
+    for name, schema in SETTINGS.items():
+        value = environ.get(name)
+
+        if value is None or value == '':
+            if schema.get('required'):
+                errors.append(f'The {name} is not set.')
+            else:
+                settings[name] = schema.get('default')
+            continue
+
+        try:
+            settings[name] = parse_setting(name, value, schema)
+        except ValueError as e:
+            errors.append(str(e))
+
+    return settings, errors
@@ -1,8 +1,15 @@
 # -*- coding: utf-8 -*-
 """This module declares the error handlers."""
+from .blueprints.client_errors import log_client_error, log_server_error
 
 
 def handle_bad_request(e):
     """Handle all Bad Request errors."""
-    print(e)
+    log_client_error(e)
     return 'The user data provided is badly formatted. Check the JSON!', 400
+
+
+def handle_internal_server_error(e):
+    """Count the unhandled errors, leaving their response to flask."""
+    log_server_error(getattr(e, 'original_exception', None) or e)
+    return e
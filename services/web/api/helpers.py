@@ -2,9 +2,14 @@
 """This module has methods that are used in the other modules in this package."""
 import os
 
+from sqlalchemy.exc import OperationalError
 from sqlalchemy_utils import database_exists
 
-from .blueprints.extensions import app_logger
+from .blueprints.client_errors import error_metrics
+from .blueprints.extensions import app_logger, db
+from .config.database_config import pool_checkout_stats
+from .config.logging_config import reset_logging_after_fork
+from .config.settings import validate_settings
 
 
 def set_flask_environment(app) -> str:
@@ -90,7 +95,7 @@ def create_db_conn_string(flask_env: str) -> str:
     return f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 
 
-def check_if_database_exists(db_connection_string: str) -> bool:
+def check_if_database_exists(db_connection_string: str, timeout: int = None) -> bool:
     """Check if database exists.
 
     Ensures that the database exists before starting the application.
@@ -99,6 +104,8 @@ def check_if_database_exists(db_connection_string: str) -> bool:
     ----------
     db_connection: str
         The database URL
+    timeout: int
+        The most seconds to wait for the database server to accept the connection.
 
     Raises
     ------
@@ -118,18 +125,25 @@ def check_if_database_exists(db_connection_string: str) -> bool:
         app_logger.exception('When checking if the database exists, the database connection string is not a string.')
         raise ValueError('The db_connection_string has to be string')
 
-    db_exists = database_exists(db_connection_string)
+    if timeout:
+        db_connection_string = f'{db_connection_string}?connect_timeout={timeout}'
+
+    try:
+        db_exists = database_exists(db_connection_string)
+    except OperationalError as e:
+        app_logger.error(f'Unable to connect to the database server: {e}')
+        return False
 
     return db_exists
 
 
-def are_environment_variables_set() -> bool:  # pylint: disable=R0912,R0915,R0911
+def are_environment_variables_set() -> bool:
     """Check if all the environment variables are set.
 
-    Raises
-    ------
-    KeyError
-        If any of the environment variables are not set.
+    Every setting declared in api.config.settings is validated in one pass and
+    all the problems found are logged together. The database is then checked,
+    unless DATABASE_CHECK_ENABLED is false, waiting at most
+    DATABASE_CHECK_TIMEOUT seconds for the database server.
 
     Returns
     -------
@@ -137,129 +151,69 @@ def are_environment_variables_set() -> bool:  # pylint: disable=R0912,R0915,R091
         True if all the environment variables are set else False if any is missing.
 
     """
-    try:
-        os.environ['FLASK_APP']  # pylint: disable=W0104
-        app_logger.info(f"The FLASK_APP is set to {os.environ['FLASK_APP']}")
-    except KeyError:
-        app_logger.exception('The FLASK_APP is not set')
-        return False
-
-    try:
-        os.environ['FLASK_ENV']  # pylint: disable=W0104
-        app_logger.info(f"The FLASK_ENV is set to {os.environ['FLASK_ENV']}")
-    except KeyError:
-        app_logger.exception('The FLASK_ENV is not set')
-        return False
-
-    try:
-        os.environ['SECRET_KEY']  # pylint: disable=W0104
-        app_logger.info(f"The SECRET_KEY is set to {os.environ['SECRET_KEY']}")
-    except KeyError:
-        app_logger.exception('The SECRET_KEY is not set')
-        return False
-
-    try:
-        os.environ['POSTGRES_HOST']  # pylint: disable=W0104
-        app_logger.info(f"The POSTGRES_HOST is set to {os.environ['POSTGRES_HOST']}")
-    except KeyError:
-        app_logger.exception('The POSTGRES_HOST is not set')
-        return False
-
-    try:
-        os.environ['POSTGRES_DB']  # pylint: disable=W0104
-        app_logger.info(f"The POSTGRES_DB is set to {os.environ['POSTGRES_DB']}")
-    except KeyError:
-        app_logger.exception('The POSTGRES_DB is not set')
-        return False
+    settings, errors = validate_settings()
 
-    try:
-        os.environ['POSTGRES_PORT']  # pylint: disable=W0104
-        app_logger.info(f"The POSTGRES_PORT is set to {os.environ['POSTGRES_PORT']}")
-    except KeyError:
-        app_logger.exception('The POSTGRES_PORT is not set')
+    if errors:
+        for error in errors:
+            app_logger.error(error)
         return False
 
-    try:
-        os.environ['POSTGRES_USER']  # pylint: disable=W0104
-        app_logger.info(f"The POSTGRES_USER is set to {os.environ['POSTGRES_USER']}")
-    except KeyError:
-        app_logger.exception('The POSTGRES_USER is not set')
-        return False
+    app_logger.info('All the environment variables are set.')
 
-    try:
-        os.environ['POSTGRES_PASSWORD']  # pylint: disable=W0104
-        app_logger.info(f"The POSTGRES_PASSWORD is set to {os.environ['POSTGRES_PASSWORD']}")
-    except KeyError:
-        app_logger.exception('The POSTGRES_PASSWORD is not set')
-        return False
+    if not settings['DATABASE_CHECK_ENABLED']:
+        return True
 
     try:
-        os.environ['MAIL_HOST']  # pylint: disable=W0104
-        app_logger.info("The MAIL_HOST is set.")
-    except KeyError:
-        app_logger.exception('The MAIL_HOST is not set')
-        return False
+        db_con_str = create_db_conn_string(settings['FLASK_ENV'])
+        db_exists = check_if_database_exists(db_con_str, settings['DATABASE_CHECK_TIMEOUT'])
 
-    try:
-        os.environ['MAIL_PORT']  # pylint: disable=W0104
-        app_logger.info("The MAIL_PORT is set.")
-    except KeyError:
-        app_logger.exception('The MAIL_PORT is not set')
-        return False
+        if not db_exists:
+            app_logger.info(f"The database {settings['POSTGRES_DB']} does not exist.")
+            return False
 
-    try:
-        os.environ['MAIL_USERNAME']  # pylint: disable=W0104
-        app_logger.info("The MAIL_USERNAME is set.")
-    except KeyError:
-        app_logger.exception('The MAIL_USERNAME is not set')
+    except ValueError as v:
+        app_logger.exception(v)
+        app_logger.exception('Unable to verify database existence...')
         return False
 
-    try:
-        os.environ['AWS_KEY']  # pylint: disable=W0104
-        app_logger.info("The AWS_KEY is set.")
-    except KeyError:
-        app_logger.exception('The AWS_KEY is not set')
-        return False
+    return True
 
-    try:
-        os.environ['AWS_SECRET']  # pylint: disable=W0104
-        app_logger.info("The AWS_SECRET is set.")
-    except KeyError:
-        app_logger.exception('The AWS_SECRET is not set')
-        return False
 
-    try:
-        os.environ['AWS_REGION']  # pylint: disable=W0104
-        app_logger.info("The AWS_REGION is set.")
-    except KeyError:
-        app_logger.exception('The AWS_REGION is not set')
-        return False
+def dispose_database_engines(app, close: bool = True) -> None:
+    """Dispose the connection pools of all the database engines used by the app.
 
-    try:
-        os.environ['MAIL_PASSWORD']  # pylint: disable=W0104
-        app_logger.info("The MAIL_PASSWORD is set.")
-    except KeyError:
-        app_logger.exception('The MAIL_PASSWORD is not set')
-        return False
+    Attributes
+    ----------
+    app: flask.Flask
+        The flask application object
+    close: bool
+        Close the pooled connections. A forked worker passes False, so that the
+        connections it inherited are dropped without being closed under the
+        parent process that owns them.
+    """
+    binds = [None] + list(app.config.get('SQLALCHEMY_BINDS') or {})
 
-    try:
-        os.environ['FIREHOSE_DELIVERY_STREAM']  # pylint: disable=W0104
-        app_logger.info(f"The FIREHOSE_DELIVERY_STREAM is set to {os.environ['FIREHOSE_DELIVERY_STREAM']}")
-    except KeyError:
-        app_logger.exception('The FIREHOSE_DELIVERY_STREAM is not set')
-        return False
+    for bind in binds:
+        engine = db.get_engine(app, bind)
+        if close:
+            engine.dispose()
+        else:
+            engine.dispose(close=False)
 
-    try:
-        db_con_str = create_db_conn_string(os.environ['FLASK_ENV'])
-        db_exists = check_if_database_exists(db_con_str)
 
-        if not db_exists:
-            app_logger.info(f'The database {db_con_str} does not exist.')
-            return False
+def reset_after_fork(app) -> None:
+    """Recreate the per process resources of a worker forked from a preloaded app.
 
-    except ValueError as v:
-        app_logger.exception(v)
-        app_logger.exception('Unable to verify database existence...')
-        return False
+    The worker gets new database connection pools, new AWS and SMTP clients and
+    its own logging threads, instead of sharing the ones created in the parent.
 
-    return True
+    Attributes
+    ----------
+    app: flask.Flask
+        The flask application object
+    """
+    dispose_database_engines(app, close=False)
+    pool_checkout_stats.reset()
+    error_metrics.reset()
+    reset_logging_after_fork()
+    app_logger.info(f'Reset the database pools and the logging handlers in worker {os.getpid()}.')
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""This module contains the JSON encoders used to serialize the responses."""
+from operator import attrgetter
+
+from flasgger import LazyJSONEncoder
+
+from .blueprints.auth.models import Admin, AdminRow
+from .blueprints.default.models import User, UserRow
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+MODEL_FIELDS = {
+    User: ('id', 'email', 'active'),
+    UserRow: UserRow.__slots__,
+    Admin: ('id', 'email', 'name'),
+    AdminRow: AdminRow.__slots__,
+}
+
+
+def compile_serializer(fields: tuple):
+    """Create a function that turns a model into a dict of the given fields.
+
+    All the fields are read with a single attrgetter, instead of reflecting on
+    the dataclass for every object.
+    """
+    if len(fields) == 1:
+        return lambda obj: {fields[0]: getattr(obj, fields[0])}
+
+    get_values = attrgetter(*fields)
+    return lambda obj: dict(zip(fields, get_values(obj)))
+
+
+SERIALIZERS = {model: compile_serializer(fields) for model, fields in MODEL_FIELDS.items()}
+
+
+class ModelJSONEncoder(LazyJSONEncoder):
+    """The flasgger encoder, serializing the models with their precompiled serializers."""
+
+    def default(self, obj):
+        """Serialize the models, the LazyStrings and the types the flask encoder supports."""
+        serializer = SERIALIZERS.get(type(obj))
+        if serializer is not None:
+            return serializer(obj)
+
+        return super().default(obj)
+
+
+class OrjsonEncoder(ModelJSONEncoder):
+    """An encoder that serializes with orjson, falling back to the model serializers and flask's encoder.
+
+    Flask calls the encode method, so jsonify and the dicts returned by the
+    views are serialized by orjson. The dataclasses and datetimes are passed to
+    default, so the models keep their explicit fields and the dates keep flask's
+    format.
+    """
+
+    def encode(self, o) -> str:
+        """Serialize the object with orjson."""
+        option = orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self.indent:
+            option |= orjson.OPT_INDENT_2
+
+        return orjson.dumps(o, default=self.default, option=option).decode()
+
+
+def get_json_encoder(backend: str):
+    """Get the encoder for the JSON_BACKEND setting, either orjson or stdlib.
+
+    The stdlib encoder is used if orjson is not installed.
+    """
+    if backend == 'orjson' and orjson is not None:
+        return OrjsonEncoder
+
+    return ModelJSONEncoder
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""This module contains the gunicorn configuration.
+
+The app is loaded once in the master and the workers are forked from it, so
+they share its memory and respawn quickly. The hooks make sure no worker uses
+the database connections, AWS clients or threads created in the master.
+"""
+import os
+
+wsgi_app = 'main:app'
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('GUNICORN_WORKERS', '4'))
+# Let the app know how many processes serve it, for the auto cache backend.
+os.environ['GUNICORN_WORKERS'] = str(workers)
+preload_app = True
+
+
+def pre_fork(server, worker):  # pylint: disable=W0613
+    """Close the master's database connections, so that no worker inherits them."""
+    from api.helpers import dispose_database_engines  # pylint: disable=C0415
+
+    dispose_database_engines(server.app.wsgi())
+
+
+def post_fork(server, worker):  # pylint: disable=W0613
+    """Recreate the database pools, the AWS and SMTP clients and the logging threads in the worker."""
+    from api.helpers import reset_after_fork  # pylint: disable=C0415
+
+    reset_after_fork(worker.app.wsgi())
+
+
+def worker_exit(server, worker):  # pylint: disable=W0613
+    """Report how long the worker's requests waited for a database connection, and its cache and error metrics."""
+    from api.blueprints.cache import cache  # pylint: disable=C0415
+    from api.blueprints.client_errors import error_metrics  # pylint: disable=C0415
+    from api.blueprints.extensions import app_logger  # pylint: disable=C0415
+    from api.config.database_config import pool_checkout_stats  # pylint: disable=C0415
+
+    app_logger.info(f'Database pool checkouts of worker {worker.pid}: {pool_checkout_stats.report()}')
+    app_logger.info(f'Error metrics of worker {worker.pid}: {error_metrics.report()}')
+    with worker.app.wsgi().app_context():
+        app_logger.info(f'Cache metrics of worker {worker.pid}: {cache.metrics()}')
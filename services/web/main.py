@@ -3,7 +3,9 @@
 
 import os
 
-from api import app
+from api import create_app
+
+app = create_app()
 
 if __name__ == '__main__':
     port = os.getenv('PORT') or 5000
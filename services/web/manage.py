@@ -1,11 +1,16 @@
 # -*- coding: utf-8 -*-
 """This module executes the application."""
 
-from api import app, db
+import click
+from api import create_app, db
+from api.apispec import write_apispec
+from api.blueprints.constants import EXPORT_FORMATS
+from api.blueprints.default.helpers import export_users
 from api.blueprints.default.models import User
+from flask import current_app
 from flask.cli import FlaskGroup
 
-cli = FlaskGroup(app)
+cli = FlaskGroup(create_app=create_app)
 
 
 @cli.command('create_db')
@@ -24,5 +29,21 @@ def seed_db():
     db.session.commit()
 
 
+@cli.command('export_users')
+@click.option('--format', 'export_format', type=click.Choice(list(EXPORT_FORMATS)), default='ndjson')
+@click.option('--output', type=click.File('w'), default='-', help='The file to write to. Defaults to stdout.')
+def export_users_command(export_format, output):
+    """Stream all the users to a file."""
+    for chunk in export_users(export_format):
+        output.write(chunk)
+
+
+@cli.command('build_apispec')
+@click.option('--output', type=click.Path(dir_okay=False), default='apispec.json', help='The file to write to.')
+def build_apispec_command(output):
+    """Build the API spec into a JSON file, to be served from APISPEC_PATH."""
+    write_apispec(current_app, output)
+
+
 if __name__ == '__main__':
     cli()
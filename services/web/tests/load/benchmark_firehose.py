@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""This module benchmarks the Firehose log handler with and without aggregated, gzipped records.
+
+The records are put to a stub client, so the benchmark measures the handler
+alone, and reports the records and bytes that would be sent to Firehose.
+
+Run it from services/web with:
+
+    FIREHOSE_DELIVERY_STREAM=benchmark python -m tests.load.benchmark_firehose
+"""
+import logging
+import time
+
+from api.config.kinesis_config import KinesisFirehoseDeliveryStreamHandler
+from pythonjsonlogger.jsonlogger import JsonFormatter
+
+LINES = 50000
+MODES = {
+    'per line': {},
+    'aggregated': {'aggregate': True},
+    'aggregated+gzip': {'aggregate': True, 'compress': True},
+}
+
+
+class CountingFirehoseClient:
+    """A stand in for the boto3 Firehose client that only counts what it is sent."""
+
+    def __init__(self):
+        """Start the counts at zero."""
+        self.calls = 0
+        self.records = 0
+        self.bytes = 0
+
+    def put_record_batch(self, DeliveryStreamName, Records):  # pylint: disable=C0103,W0613
+        """Count the batch, accepting every record."""
+        self.calls += 1
+        self.records += len(Records)
+        self.bytes += sum(len(record['Data']) for record in Records)
+        return {'FailedPutCount': 0, 'RequestResponses': [{'RecordId': str(i)} for i in range(len(Records))]}
+
+
+def make_records(count: int) -> list:
+    """Create log records like the ones the API logs."""
+    return [
+        logging.makeLogRecord({
+            'name': 'api.blueprints.extensions',
+            'levelno': logging.INFO,
+            'levelname': 'INFO',
+            'msg': f'The admin admin1 retrieved a user with id {i}.',
+        })
+        for i in range(count)
+    ]
+
+
+def benchmark(options: dict, records: list) -> dict:
+    """Log the records through a buffered handler, returning the lines per second and what was sent."""
+    client = CountingFirehoseClient()
+    handler = KinesisFirehoseDeliveryStreamHandler(buffered=True, max_buffered_records=len(records), client=client,
+                                                   **options)
+    handler.setFormatter(JsonFormatter('%(asctime)s %(name)s %(levelname)s %(message)s'))
+
+    start = time.perf_counter()
+    for record in records:
+        handler.handle(record)
+    handler.close()
+    seconds = time.perf_counter() - start
+
+    return {
+        'lines_per_second': len(records) / seconds,
+        'calls': client.calls,
+        'records': client.records,
+        'bytes_per_line': client.bytes / len(records),
+    }
+
+
+def main() -> None:
+    """Print the throughput, the records put and the bytes sent per log line of every mode."""
+    records = make_records(LINES)
+    for name, options in MODES.items():
+        result = benchmark(options, records)
+        print(f'{name:<16} {result["lines_per_second"]:>10.0f} lines/s {result["calls"]:>5} calls '
+              f'{result["records"]:>7} records {result["bytes_per_line"]:>7.1f} bytes/line')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""This module benchmarks the serialization of large pages of users with each JSON encoder.
+
+Run it from services/web with:
+
+    python -m tests.load.benchmark_json
+"""
+import timeit
+
+from api.blueprints.default.models import User
+from api.serialization import ModelJSONEncoder, OrjsonEncoder
+from flasgger import LazyJSONEncoder
+from flask import Flask, jsonify
+
+PAGE_SIZES = (100, 1000, 10000)
+ENCODERS = (LazyJSONEncoder, ModelJSONEncoder, OrjsonEncoder)
+
+
+def make_users(count: int) -> list:
+    """Create the given number of users, without a database."""
+    users = []
+    for i in range(count):
+        user = User(email=f'user{i}@example.com')
+        user.id = i
+        user.active = i % 2 == 0
+        users.append(user)
+
+    return users
+
+
+def benchmark(encoder, users: list, number: int) -> float:
+    """Return the pages of users serialized per second by jsonify with the encoder."""
+    app = Flask(__name__)
+    app.json_encoder = encoder
+    page = {'users': users, 'metadata': {'limit': len(users), 'count': len(users), 'next': None}}
+
+    with app.app_context():
+        seconds = timeit.timeit(lambda: jsonify(page), number=number)
+
+    return number / seconds
+
+
+def main() -> None:
+    """Print the throughput of every encoder for every page size."""
+    for page_size in PAGE_SIZES:
+        users = make_users(page_size)
+        number = max(10, 100000 // page_size)
+        baseline = None
+        for encoder in ENCODERS:
+            pages_per_second = benchmark(encoder, users, number)
+            baseline = baseline or pages_per_second
+            print(f'{page_size:>6} users {encoder.__name__:<16} {pages_per_second:>10.1f} pages/s '
+                  f'{pages_per_second * page_size:>12.0f} users/s {pages_per_second / baseline:>5.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""This module benchmarks reading large pages of users as ORM objects and as projected rows.
+
+It recreates the tables of the test database and seeds them, so run it against
+the test database only, from services/web with:
+
+    python -m tests.load.benchmark_read_path
+"""
+import timeit
+import tracemalloc
+
+from api import create_app, db
+from api.blueprints.default.models import User, UserRow
+from api.config.config import TestingConfig
+from flask import jsonify
+from sqlalchemy import insert
+
+ROW_COUNTS = (100, 1000, 10000)
+REPEAT = 5
+
+
+def read_orm_users(count: int) -> list:
+    """Read the users as ORM objects, tracked by the session."""
+    return db.session.query(User).order_by(User.id).limit(count).all()
+
+
+def read_user_rows(count: int) -> list:
+    """Read only the returned columns, into UserRows."""
+    rows = db.session.query(*UserRow.columns).order_by(User.id).limit(count).all()
+    return [UserRow(row) for row in rows]
+
+
+def measure(read, count: int) -> tuple:
+    """Return the best latency, in milliseconds, of reading and serializing the users, and their peak memory in KiB."""
+    def run():
+        jsonify({'users': read(count)})
+        db.session.remove()
+
+    latency = min(timeit.repeat(run, number=1, repeat=REPEAT)) * 1000
+
+    tracemalloc.start()
+    users = read(count)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del users
+    db.session.remove()
+
+    return latency, peak / 1024
+
+
+def main() -> None:
+    """Seed the users and print the latency and memory of both read paths."""
+    app = create_app(TestingConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.execute(insert(User.__table__), [{'email': f'user{i}@example.com'} for i in range(max(ROW_COUNTS))])
+        db.session.commit()
+
+        for count in ROW_COUNTS:
+            orm_latency, orm_memory = measure(read_orm_users, count)
+            row_latency, row_memory = measure(read_user_rows, count)
+            print(f'{count:>6} users  orm {orm_latency:8.2f} ms {orm_memory:9.0f} KiB  '
+                  f'rows {row_latency:8.2f} ms {row_memory:9.0f} KiB  '
+                  f'{orm_latency / row_latency:4.1f}x faster {orm_memory / row_memory:4.1f}x less memory')
+
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,13 @@
 # -*- coding: utf-8 -*-
 """This module sets up the fixtures that will be used in our testing."""
 import pytest
-from api import app, db
+from api import create_app as create_application
+from api import db
+from api.blueprints.cache import cache
 from api.config.config import DevelopmentConfig, ProductionConfig, StagingConfig, TestingConfig
 
+app = create_application(TestingConfig)
+
 
 @pytest.fixture
 def create_app():
@@ -25,6 +29,7 @@ def client():
     with app.app_context():
         db.drop_all()
         db.create_all()
+        cache.clear()
 
     return test_client
 
@@ -55,3 +60,12 @@ def create_production_app():
     """Create the test client with the production config."""
     app.config.from_object(ProductionConfig)
     return app
+
+
+@pytest.fixture
+def auth_headers(client):
+    """Register and log in an admin, returning the authorization headers."""
+    admin_data = {'email': 'admin@example.com', 'name': 'admin1', 'password': 'pass!word'}
+    client.post('/auth/register', json=admin_data)
+    resp = client.post('/auth/login', json={'email': admin_data['email'], 'password': admin_data['password']})
+    return {'Authorization': f"Bearer {resp.json['access token']}"}
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""This module tests the admins route."""
+import logging
+
+import pytest
+from flask_jwt_extended import decode_token
+
+
+@pytest.mark.usefixtures('auth_headers')
+def test_admins_only_public_columns(client):
+    """Tests that the admins route does not return the admin passwords.
+
+    GIVEN we have a registered admin
+    WHEN we send a GET request to the /auth/admins route
+    THEN we should get the admin's id, email and name only
+    """
+    resp = client.get('/auth/admins')
+    assert resp.status_code == 200
+    assert resp.json['metadata']['count'] == 1
+    assert set(resp.json['admins'][0]) == {'id', 'email', 'name'}
+
+
+def test_admins_invalid_limit(client):
+    """Tests that an invalid page size is rejected.
+
+    GIVEN we have the /auth/admins route
+    WHEN we send a GET request with a limit that is not a positive integer
+    THEN we should get a 400 error code in the response
+    """
+    resp = client.get('/auth/admins?limit=0')
+    assert resp.status_code == 400
+
+
+def test_admins_success_is_logged_only_for_a_page(client, caplog):
+    """Tests that a rejected request to the admins route is not logged as a success.
+
+    GIVEN we have the /auth/admins route
+    WHEN we send a valid GET request and one with an invalid limit
+    THEN only the valid request should log a success
+    """
+    with caplog.at_level(logging.INFO):
+        client.get('/auth/admins')
+        client.get('/auth/admins?limit=0')
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert len([message for message in messages if message.startswith('Successfully handled a GET request')]) == 1
+
+
+@pytest.mark.usefixtures('auth_headers')
+def test_register_rejects_a_name_in_use(client):
+    """Tests that an admin cannot be registered with the name of another admin.
+
+    GIVEN a registered admin named admin1
+    WHEN we register another admin with a new email and the name admin1
+    THEN we should get a 400 saying the name is in use
+    """
+    resp = client.post('/auth/register', json={'email': 'other@example.com', 'name': 'admin1', 'password': 'pass!word'})
+    assert resp.status_code == 400
+    assert resp.json['error'] == 'The name admin1 is already in use.'
+
+
+def test_update_admin_in_one_statement(client, auth_headers):
+    """Tests that an admin is updated, and that the conflicts with the other admins are reported.
+
+    GIVEN two registered admins
+    WHEN the first one keeps its email and changes its name, then takes the email of the second one
+    THEN the first update should succeed and the second should say the email is in use
+    """
+    client.post('/auth/register', json={'email': 'other@example.com', 'name': 'other', 'password': 'pass!word'})
+
+    resp = client.put('/auth/me', headers=auth_headers, json={'email': 'admin@example.com', 'name': 'renamed'})
+    assert resp.status_code == 200
+    assert resp.json['name'] == 'renamed'
+
+    resp = client.put('/auth/me', headers=auth_headers, json={'email': 'other@example.com'})
+    assert resp.status_code == 400
+    assert resp.json['error'] == 'The email adress other@example.com is already in use.'
+
+
+def test_refreshed_token_has_the_current_name(client):
+    """Tests that a token refreshed after a rename carries the new name.
+
+    GIVEN a logged in admin who renames itself
+    WHEN it refreshes its access token with its refresh token
+    THEN the new access token should carry the new name
+    """
+    admin_data = {'email': 'admin@example.com', 'name': 'admin1', 'password': 'pass!word'}
+    client.post('/auth/register', json=admin_data)
+    tokens = client.post('/auth/login', json={'email': admin_data['email'], 'password': admin_data['password']}).json
+    client.put('/auth/me', headers={'Authorization': f"Bearer {tokens['access token']}"}, json={'name': 'renamed'})
+
+    resp = client.get('/auth/refresh', headers={'Authorization': f"Bearer {tokens['refresh token']}"})
+
+    assert resp.status_code == 200
+    with client.application.app_context():
+        assert decode_token(resp.json['access_token'])['name'] == 'renamed'
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""This module tests the serving of the prebuilt API spec."""
+from api import create_app
+from api.apispec import write_apispec
+from api.config.config import TestingConfig
+
+
+def test_apispec_is_served_with_the_request_host(client):
+    """Tests that the spec is served with the host of the request and cache headers.
+
+    GIVEN the app's prebuilt spec
+    WHEN we get it for two hosts
+    THEN each response should have its own host, ETag and a public Cache-Control
+    """
+    first = client.get('/apispec.json', headers={'Host': 'api.example.com'})
+    second = client.get('/apispec.json', headers={'Host': 'localhost:5000'})
+    assert first.json['host'] == 'api.example.com'
+    assert second.json['host'] == 'localhost:5000'
+    assert '/users' in first.json['paths']
+    assert first.headers['ETag'] != second.headers['ETag']
+    assert first.headers['Cache-Control'] == 'public, max-age=300'
+
+    headers = {'Host': 'api.example.com', 'If-None-Match': first.headers['ETag']}
+    assert client.get('/apispec.json', headers=headers).status_code == 304
+
+
+def test_apispec_is_loaded_from_the_built_file(client, tmp_path):
+    """Tests that an app loads the spec written by the build_apispec command.
+
+    GIVEN a spec file built from the app, with its title changed
+    WHEN we create an app with APISPEC_PATH set to it
+    THEN that app should serve the spec in the file
+    """
+    path = tmp_path / 'apispec.json'
+    write_apispec(client.application, str(path))
+    path.write_text(path.read_text().replace('"title":"Template API V4"', '"title":"Prebuilt"'))
+
+    class PrebuiltSpecConfig(TestingConfig):
+        """The test configuration, with the prebuilt spec."""
+
+        APISPEC_PATH = str(path)
+
+    app = create_app(PrebuiltSpecConfig)
+    resp = app.test_client().get('/apispec.json', headers={'Host': 'api.example.com'})
+    assert resp.json['info']['title'] == 'Prebuilt'
+    assert resp.json['host'] == 'api.example.com'
+    assert resp.json['paths'] == client.get('/apispec.json').json['paths']
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""This module tests the cache of the GET /user route."""
+import time
+
+from api import db
+from api.blueprints.cache import (
+    LocalSharedClient,
+    LRUCache,
+    SharedCache,
+    cache,
+    get_cache_backend_name,
+)
+from sqlalchemy import event
+
+
+def test_lru_cache_evicts_the_least_recently_used_entry():
+    """Tests that a full cache evicts the entry that was used the longest time ago.
+
+    GIVEN a cache of 2 entries holding a and b, where a was read after b was set
+    WHEN we cache c
+    THEN b should be evicted and counted as an eviction
+    """
+    lru = LRUCache(max_entries=2, ttl=60)
+    lru.set('a', 1)
+    lru.set('b', 2)
+    lru.get('a')
+    lru.set('c', 3)
+    assert lru.get('b') is None
+    assert lru.get('a') == 1
+    assert lru.metrics() == {'hits': 2, 'misses': 1, 'evictions': 1, 'expirations': 0, 'entries': 2}
+
+
+def test_lru_cache_expires_entries():
+    """Tests that an entry is not served after its ttl.
+
+    GIVEN a cache with a ttl of 10 milliseconds holding a
+    WHEN we read a after 20 milliseconds
+    THEN it should be a miss and counted as an expiration
+    """
+    lru = LRUCache(ttl=0.01)
+    lru.set('a', 1)
+    time.sleep(0.02)
+    assert lru.get('a') is None
+    assert lru.metrics()['expirations'] == 1
+
+
+def test_shared_cache_round_trips_values():
+    """Tests that the shared cache stores the values as JSON on its client.
+
+    GIVEN a shared cache on the local stand in client
+    WHEN we cache a user, read it and delete it
+    THEN the user should be read back and missing after the delete
+    """
+    shared = SharedCache(LocalSharedClient(), ttl=60)
+    shared.set('user:1', {'id': 1, 'email': 'user@example.com'})
+    assert shared.get('user:1') == {'id': 1, 'email': 'user@example.com'}
+    shared.delete('user:1')
+    assert shared.get('user:1') is None
+    assert shared.metrics() == {'hits': 1, 'misses': 1, 'evictions': 0, 'expirations': 0, 'errors': 0}
+
+
+class UnreachableSharedClient(LocalSharedClient):
+    """A stand in for the client of a shared cache server that is down."""
+
+    def get(self, key: str):
+        """Fail to connect."""
+        raise ConnectionError('The cache server is unreachable.')
+
+    def set(self, key: str, value: bytes, ex: int = None, nx: bool = False):
+        """Fail to connect."""
+        raise ConnectionError('The cache server is unreachable.')
+
+    def delete(self, *keys: str) -> None:
+        """Fail to connect."""
+        raise ConnectionError('The cache server is unreachable.')
+
+
+def test_shared_cache_outage_is_a_miss():
+    """Tests that an unreachable cache server does not fail the callers.
+
+    GIVEN a shared cache whose server is unreachable
+    WHEN we get, set, add and delete a user
+    THEN the get should be a miss and every failure should be counted
+    """
+    shared = SharedCache(UnreachableSharedClient(), ttl=60)
+    assert shared.get('user:1') is None
+    shared.set('user:1', {'id': 1})
+    assert not shared.add('user:1', {'id': 1})
+    shared.delete('user:1')
+    assert shared.metrics() == {'hits': 0, 'misses': 1, 'evictions': 0, 'expirations': 0, 'errors': 4}
+
+
+def test_invalidated_keys_cannot_be_added_back():
+    """Tests that a value read before a write is not cached after the write invalidated its key.
+
+    GIVEN an lru and a shared cache, where a user was read before an update invalidated its key
+    WHEN the stale user is added after the invalidation
+    THEN it should not be cached, while a key that was not written can be added
+    """
+    for backend in (LRUCache(ttl=60), SharedCache(LocalSharedClient(), ttl=60)):
+        backend.invalidate('user:1')
+        assert not backend.add('user:1', {'user': {'email': 'old@example.com'}, 'version': 1})
+        assert not backend.get('user:1')
+        assert backend.add('user:2', {'user': {'email': 'user@example.com'}, 'version': 1})
+        assert backend.get('user:2')['version'] == 1
+
+
+def test_shared_cache_clear_keeps_the_other_keys():
+    """Tests that clearing the shared cache only deletes its own keys.
+
+    GIVEN a shared cache on a client that also holds a key of another app
+    WHEN we cache 3 users and clear the cache
+    THEN the users should be deleted and the other key kept
+    """
+    client = LocalSharedClient()
+    client.set('sessions:1', b'other app')
+    shared = SharedCache(client, ttl=60)
+    for user_id in range(3):
+        shared.set(f'user:{user_id}', {'id': user_id})
+
+    shared.clear()
+
+    assert list(client.scan_iter()) == ['sessions:1']
+
+
+def test_auto_cache_backend_depends_on_the_workers():
+    """Tests that the in process cache is not used by several workers.
+
+    GIVEN the auto cache backend
+    WHEN we resolve it with and without a CACHE_URL, for one and for four workers
+    THEN it should be shared with a CACHE_URL, lru with one worker and none otherwise
+    """
+    config = {'CACHE_BACKEND': 'auto', 'CACHE_URL': None, 'GUNICORN_WORKERS': 1}
+    assert get_cache_backend_name(config) == 'lru'
+    assert get_cache_backend_name(dict(config, GUNICORN_WORKERS=4)) == 'none'
+    assert get_cache_backend_name(dict(config, GUNICORN_WORKERS=4, CACHE_URL='redis://cache')) == 'shared'
+    assert get_cache_backend_name(dict(config, CACHE_BACKEND='lru', GUNICORN_WORKERS=4)) == 'lru'
+
+
+def test_get_user_is_served_from_the_cache_until_updated(client, auth_headers):
+    """Tests that repeated lookups of a user skip the database until it is updated.
+
+    GIVEN a user that has been looked up once
+    WHEN we look it up again, update it and look it up once more
+    THEN the second lookup should run no query and the third should return the update
+    """
+    user_id = client.post('/user', headers=auth_headers, json={'email': 'user@example.com'}).json['id']
+    client.get('/user', headers=auth_headers, query_string={'id': user_id})
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):  # pylint: disable=W0613
+        statements.append(statement)
+
+    with client.application.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        resp = client.get('/user', headers=auth_headers, query_string={'id': user_id})
+        assert resp.json['email'] == 'user@example.com'
+        assert not [statement for statement in statements if 'FROM users' in statement]
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    client.put('/user', headers=auth_headers, query_string={'id': user_id}, json={'email': 'new@example.com'})
+    resp = client.get('/user', headers=auth_headers, query_string={'id': user_id})
+    assert resp.json['email'] == 'new@example.com'
+    with client.application.app_context():
+        assert cache.metrics()['hits'] >= 1
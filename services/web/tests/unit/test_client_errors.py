@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""This module tests the logging and the metrics of the client errors."""
+import logging
+
+from api.blueprints.client_errors import error_metrics, get_error_code
+from api.blueprints.exceptions import InvalidEmailAddressFormat
+from api.error_handlers import handle_internal_server_error
+from werkzeug.exceptions import InternalServerError
+
+
+def test_client_error_is_logged_without_a_traceback(client, auth_headers, caplog):
+    """Tests that an invalid payload is logged as a single compact record.
+
+    GIVEN a user payload with an invalid email
+    WHEN we post it to the /user route
+    THEN we should get a single record with the error code and field, and no traceback
+    """
+    error_metrics.reset()
+    with caplog.at_level(logging.INFO):
+        resp = client.post('/user', headers=auth_headers, json={'email': 'invalid'})
+
+    assert resp.status_code == 400
+    records = [record for record in caplog.records if getattr(record, 'error_code', None)]
+    assert len(records) == 1
+    assert records[0].error_code == 'invalid_email_address_format'
+    assert records[0].error_field == 'email'
+    assert records[0].exc_info is None
+    assert records[0].msg == 'Client error %s: %s'
+    assert records[0].getMessage() == 'Client error invalid_email_address_format: The email address is invalid'
+    assert error_metrics.report()['errors']['InvalidEmailAddressFormat 400']['count'] == 1
+
+
+def test_error_metrics_count_the_errors_per_exception_class():
+    """Tests the error rates.
+
+    GIVEN 4 requests, one of which failed with a client error and one with a server error
+    WHEN we report the metrics
+    THEN we should get each exception class with a rate of 0.25
+    """
+    error_metrics.reset()
+    for _ in range(4):
+        error_metrics.record_request()
+    error_metrics.record_error(InvalidEmailAddressFormat, 400)
+    handle_internal_server_error(InternalServerError(original_exception=ZeroDivisionError()))
+
+    assert error_metrics.report() == {
+        'requests': 4,
+        'errors': {
+            'InvalidEmailAddressFormat 400': {'count': 1, 'rate': 0.25},
+            'ZeroDivisionError 500': {'count': 1, 'rate': 0.25},
+        }
+    }
+    assert get_error_code(KeyError) == 'key_error'
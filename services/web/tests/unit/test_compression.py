@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""This module tests the compression of the responses."""
+import gzip
+
+import brotli
+from api.compression import compress
+
+
+def test_large_responses_are_compressed_with_the_preferred_encoding(client, auth_headers):
+    """Tests that a large page of users is compressed with the encoding the client prefers.
+
+    GIVEN a page of users larger than the minimum size
+    WHEN we get it accepting gzip and brotli, preferring gzip
+    THEN it should be gzip encoded and decompress to the page
+    """
+    client.post('/users/bulk', headers=auth_headers, json={'emails': [f'user{i}@example.com' for i in range(50)]})
+    headers = {**auth_headers, 'Accept-Encoding': 'br;q=0.5, gzip'}
+    resp = client.get('/users', headers=headers, query_string={'limit': 50})
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in resp.headers['Vary']
+    assert resp.headers['ETag'].startswith('W/')
+    assert b'user49@example.com' in gzip.decompress(resp.data)
+
+
+def test_small_responses_are_not_compressed(client, auth_headers):
+    """Tests that the responses below the minimum size are sent as they are.
+
+    GIVEN an empty page of users
+    WHEN we get it accepting gzip
+    THEN it should not be compressed
+    """
+    resp = client.get('/users', headers={**auth_headers, 'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in resp.headers
+    assert resp.json['users'] == []
+
+
+def test_swagger_assets_are_served_precompressed(client):
+    """Tests that the Swagger UI assets are served from the precompressed copies.
+
+    GIVEN the precompressed Swagger UI bundle
+    WHEN we get it accepting brotli
+    THEN the body should be the precompressed copy
+    """
+    resp = client.get('/flasgger_static/swagger-ui-bundle.js', headers={'Accept-Encoding': 'br'})
+    assert resp.headers['Content-Encoding'] == 'br'
+    assert resp.data == compress.precompressed['swagger-ui-bundle.js']['br']
+    assert brotli.decompress(resp.data).startswith(b'!function')
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""This module tests the conditional GET requests."""
+import pytest
+
+
+def test_get_user_is_not_modified_until_updated(client, auth_headers):
+    """Tests that a user is only sent again once it has changed.
+
+    GIVEN a user and its ETag
+    WHEN we get it with the ETag in If-None-Match, before and after updating it
+    THEN we should get a 304 before and the updated user with a new ETag after
+    """
+    user_id = client.post('/user', headers=auth_headers, json={'email': 'user@example.com'}).json['id']
+    etag = client.get('/user', headers=auth_headers, query_string={'id': user_id}).headers['ETag']
+
+    resp = client.get('/user', headers={**auth_headers, 'If-None-Match': etag}, query_string={'id': user_id})
+    assert resp.status_code == 304
+    assert resp.data == b''
+
+    client.put('/user', headers=auth_headers, query_string={'id': user_id}, json={'email': 'new@example.com'})
+    resp = client.get('/user', headers={**auth_headers, 'If-None-Match': etag}, query_string={'id': user_id})
+    assert resp.status_code == 200
+    assert resp.json['email'] == 'new@example.com'
+    assert resp.headers['ETag'] != etag
+
+
+def test_get_users_is_not_modified_until_a_user_in_the_page_changes(client, auth_headers):
+    """Tests that the ETag of a page of users changes when a user in it is updated or deleted.
+
+    GIVEN a page of 2 users and its ETag
+    WHEN we get the page with the ETag, before and after deactivating the users in bulk
+    THEN we should get a 304 before and a 200 after
+    """
+    for i in range(3):
+        client.post('/user', headers=auth_headers, json={'email': f'user{i}@example.com'})
+    etag = client.get('/users', headers=auth_headers, query_string={'limit': 2}).headers['ETag']
+
+    resp = client.get('/users', headers={**auth_headers, 'If-None-Match': etag}, query_string={'limit': 2})
+    assert resp.status_code == 304
+
+    client.put('/users/bulk', headers=auth_headers, json={'filter': {'active': True}, 'data': {'active': False}})
+    resp = client.get('/users', headers={**auth_headers, 'If-None-Match': etag}, query_string={'limit': 2})
+    assert resp.status_code == 200
+    assert resp.json['metadata']['count'] == 2
+
+
+@pytest.mark.usefixtures('auth_headers')
+def test_get_admins_changes_etag_with_the_page(client):
+    """Tests that the pages of admins have different ETags.
+
+    GIVEN a single admin
+    WHEN we get the admins with and without a limit
+    THEN the ETags of the two pages should differ
+    """
+    first = client.get('/auth/admins').headers['ETag']
+    second = client.get('/auth/admins', query_string={'limit': 1}).headers['ETag']
+    assert first != second
+    assert client.get('/auth/admins', headers={'If-None-Match': first}).status_code == 304
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""This module tests the database engine configuration."""
+from api.config.database_config import TimedQueuePool, get_engine_options, pool_checkout_stats
+
+DEFAULTS = {
+    'pool_size': 5,
+    'max_overflow': 5,
+    'pool_timeout': 30,
+    'pool_recycle': 1800,
+    'pool_pre_ping': True,
+    'statement_timeout': 30000,
+    'idle_in_transaction_session_timeout': 60000,
+}
+
+
+def test_engine_options_are_overridden_from_the_environment(monkeypatch):
+    """Tests that the environment overrides the defaults and the timeouts are set on the server.
+
+    GIVEN the DB_POOL_SIZE and DB_STATEMENT_TIMEOUT environment variables
+    WHEN we create the engine options
+    THEN the pool size and statement timeout should be the ones in the environment
+    """
+    monkeypatch.setenv('DB_POOL_SIZE', '12')
+    monkeypatch.setenv('DB_STATEMENT_TIMEOUT', '5000')
+    options = get_engine_options(**DEFAULTS)
+    assert options['pool_size'] == 12
+    assert options['max_overflow'] == 5
+    assert options['poolclass'] is TimedQueuePool
+    assert options['connect_args']['options'] == (
+        '-c statement_timeout=5000 -c idle_in_transaction_session_timeout=60000'
+    )
+
+
+def test_invalid_engine_options_keep_the_defaults(monkeypatch):
+    """Tests that an invalid DB_ setting does not break the import of the configuration.
+
+    GIVEN a DB_POOL_SIZE that is not an integer
+    WHEN we create the engine options
+    THEN the pool size should be the environment's default, leaving the error to the settings validation
+    """
+    monkeypatch.setenv('DB_POOL_SIZE', 'many')
+    assert get_engine_options(**DEFAULTS)['pool_size'] == 5
+
+
+def test_pool_checkouts_are_reported(client, auth_headers):
+    """Tests that the checkout waits of the application's pool are recorded.
+
+    GIVEN an application using the timed pool
+    WHEN we get a user
+    THEN the checkout should be counted in the report
+    """
+    pool_checkout_stats.reset()
+    client.get('/users', headers=auth_headers)
+    report = pool_checkout_stats.report()
+    assert report['checkouts'] >= 1
+    assert report['max_wait_ms'] >= report['average_wait_ms'] >= 0
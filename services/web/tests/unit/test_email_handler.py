@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""This module tests the critical email log handler."""
+import json
+import logging
+import time
+
+from api.config import kinesis_config
+from api.config.kinesis_config import CustomEmailLogger
+
+
+class StubSMTP:
+    """A local stand in for smtplib.SMTP_SSL."""
+
+    connections = []
+
+    def __init__(self, host, port):
+        """Open the stand in connection."""
+        self.host = host
+        self.port = port
+        self.logins = 0
+        self.messages = []
+        StubSMTP.connections.append(self)
+
+    def login(self, username, password):  # pylint: disable=W0613
+        """Log in."""
+        self.logins += 1
+
+    def sendmail(self, fromaddr, toaddrs, msg):  # pylint: disable=W0613
+        """Keep the message."""
+        self.messages.append(msg)
+
+    def quit(self):
+        """Close the stand in connection."""
+
+
+class JsonFormatter(logging.Formatter):
+    """Format the fields the email handler reads as JSON."""
+
+    def format(self, record):
+        """Format the record."""
+        return json.dumps({'name': record.name, 'levelname': record.levelname, 'message': record.getMessage()})
+
+
+def create_handler(monkeypatch, **kwargs) -> CustomEmailLogger:
+    """Create an email handler that sends its mails to the stand in."""
+    StubSMTP.connections = []
+    monkeypatch.setattr(kinesis_config, 'SMTP_SSL', StubSMTP)
+    handler = CustomEmailLogger(**kwargs)
+    handler.setFormatter(JsonFormatter())
+    return handler
+
+
+def log(handler: logging.Handler, msg: str, count: int = 1) -> None:
+    """Log a critical record through the handler count times."""
+    for _ in range(count):
+        handler.handle(logging.makeLogRecord({'name': 'api', 'levelname': 'CRITICAL', 'levelno': 50, 'msg': msg}))
+
+
+def test_email_handler_collapses_identical_records(monkeypatch):
+    """Tests that a burst of identical records is mailed once plus a digest.
+
+    GIVEN an email handler
+    WHEN we log the same critical record 50 times and close the handler
+    THEN we should get the first record and a digest of the other 49, over one connection
+    """
+    handler = create_handler(monkeypatch)
+    log(handler, 'Database unreachable', 50)
+    handler.close()
+    assert len(StubSMTP.connections) == 1
+    assert StubSMTP.connections[0].logins == 1
+    messages = StubSMTP.connections[0].messages
+    assert len(messages) == 2
+    assert '49 similar records' in messages[1]
+
+
+def test_email_handler_limits_the_send_rate(monkeypatch):
+    """Tests that no more than max_emails mails are sent per rate period.
+
+    GIVEN an email handler that sends at most 2 mails per period and has no digest window
+    WHEN we log 5 different critical records
+    THEN only 2 mails should be sent until the handler is closed and sends the rest
+    """
+    handler = create_handler(monkeypatch, digest_window=0, max_emails=2, rate_period=60)
+    for i in range(5):
+        log(handler, f'Failure {i}')
+    time.sleep(0.5)
+    assert len(StubSMTP.connections[0].messages) == 2
+    handler.close()
+    assert len(StubSMTP.connections[0].messages) == 5
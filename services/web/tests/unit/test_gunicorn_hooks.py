@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""This module tests the gunicorn hooks and the fork safe helpers they call."""
+import importlib.util
+import logging
+import os
+from types import SimpleNamespace
+from unittest import mock
+
+from api import db
+from api.blueprints.client_errors import error_metrics
+from api.config.database_config import pool_checkout_stats
+from api.helpers import dispose_database_engines
+from sqlalchemy.engine import Engine
+
+GUNICORN_CONF = os.path.join(os.path.dirname(__file__), '..', '..', 'gunicorn.conf.py')
+
+
+def load_gunicorn_conf():
+    """Import the gunicorn.conf.py module."""
+    spec = importlib.util.spec_from_file_location('gunicorn_conf', GUNICORN_CONF)
+    module = importlib.util.module_from_spec(spec)
+    with mock.patch.dict(os.environ):
+        spec.loader.exec_module(module)
+    return module
+
+
+def make_worker(app):
+    """Create a stand in for a gunicorn server or worker serving the app."""
+    return SimpleNamespace(pid=os.getpid(), app=SimpleNamespace(wsgi=lambda: app))
+
+
+def spy_on_dispose(monkeypatch) -> list:
+    """Record the close argument of every engine dispose."""
+    calls = []
+    dispose = Engine.dispose
+
+    def spy(engine, close=True):
+        calls.append(close)
+        dispose(engine, close=close)
+
+    monkeypatch.setattr(Engine, 'dispose', spy)
+    return calls
+
+
+def test_dispose_database_engines_replaces_the_pools(create_test_app):
+    """Tests that the engines get new, empty pools.
+
+    GIVEN an engine with a pooled connection
+    WHEN we dispose the engines
+    THEN the engine should have a new pool without connections
+    """
+    app = create_test_app
+    with app.app_context():
+        engine = db.get_engine(app)
+        engine.connect().close()
+        pool = engine.pool
+        assert pool.checkedin() == 1
+
+        dispose_database_engines(app)
+
+        assert engine.pool is not pool
+        assert engine.pool.checkedin() == 0
+
+
+def test_pre_fork_closes_the_masters_connections(create_test_app, monkeypatch):
+    """Tests that the master closes its connections before forking a worker.
+
+    GIVEN the gunicorn configuration
+    WHEN the pre_fork hook runs
+    THEN every engine should be disposed, closing its connections
+    """
+    calls = spy_on_dispose(monkeypatch)
+    app = create_test_app
+    load_gunicorn_conf().pre_fork(make_worker(app), make_worker(app))
+    assert calls == [True] * (1 + len(app.config['SQLALCHEMY_BINDS']))
+
+
+def test_post_fork_resets_the_workers_resources(create_test_app, monkeypatch):
+    """Tests that a forked worker drops the inherited connections and clears its metrics.
+
+    GIVEN a worker that inherited pool checkout and error metrics
+    WHEN the post_fork hook runs
+    THEN the engines should be disposed without closing their connections and the metrics cleared
+    """
+    calls = spy_on_dispose(monkeypatch)
+    app = create_test_app
+    pool_checkout_stats.record(0.0, db.get_engine(app).pool)
+    error_metrics.record_error(ValueError, 400)
+
+    load_gunicorn_conf().post_fork(make_worker(app), make_worker(app))
+
+    assert calls == [False] * (1 + len(app.config['SQLALCHEMY_BINDS']))
+    assert pool_checkout_stats.report()['checkouts'] == 0
+    assert error_metrics.report() == {'requests': 0, 'errors': {}}
+
+
+def test_worker_exit_reports_the_metrics(create_test_app, caplog):
+    """Tests that an exiting worker logs its metrics.
+
+    GIVEN the gunicorn configuration
+    WHEN the worker_exit hook runs
+    THEN the pool checkout, error and cache metrics should be logged
+    """
+    with caplog.at_level(logging.INFO):
+        load_gunicorn_conf().worker_exit(None, make_worker(create_test_app))
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert any(message.startswith('Database pool checkouts of worker') for message in messages)
+    assert any(message.startswith('Error metrics of worker') for message in messages)
+    assert any(message.startswith('Cache metrics of worker') for message in messages)
@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+"""This module tests the buffered mode of the Firehose log handler."""
+import gzip
+import io
+import logging
+import os
+import random
+import threading
+import time
+
+from api.config.kinesis_config import (
+    FirehoseSpool,
+    KinesisFirehoseDeliveryStreamHandler,
+    aggregate_records,
+    read_spool_segment,
+    split_batches,
+)
+
+
+class StubFirehoseClient:
+    """A local stand in for the boto3 Firehose client."""
+
+    def __init__(self, failures: int = 0):
+        """Fail the first record of the first failures calls."""
+        self.batches = []
+        self.failures = failures
+
+    def put_record_batch(self, DeliveryStreamName, Records):  # pylint: disable=C0103,W0613
+        """Record the batch, failing the first record if there are failures left."""
+        self.batches.append([record['Data'] for record in Records])
+        responses = [{'RecordId': str(i)} for i in range(len(Records))]
+        if self.failures:
+            self.failures -= 1
+            responses[0] = {'ErrorCode': 'ServiceUnavailableException', 'ErrorMessage': 'Slow down.'}
+        return {'FailedPutCount': int(not responses[0].get('RecordId')), 'RequestResponses': responses}
+
+
+class UnreachableFirehoseClient(StubFirehoseClient):
+    """A stand in for a Firehose client that fails every call until the stream is back up."""
+
+    def __init__(self):
+        """Start with the stream down."""
+        StubFirehoseClient.__init__(self)
+        self.down = True
+
+    def put_record_batch(self, DeliveryStreamName, Records):  # pylint: disable=C0103
+        """Fail while the stream is down."""
+        if self.down:
+            raise ConnectionError('The stream is unreachable.')
+        return StubFirehoseClient.put_record_batch(self, DeliveryStreamName, Records)
+
+
+def log(handler: logging.Handler, count: int) -> None:
+    """Log the given number of records through the handler."""
+    for i in range(count):
+        handler.handle(logging.makeLogRecord({'msg': f'record {i}'}))
+
+
+def test_buffered_handler_batches_by_record_count():
+    """Tests that the buffered records are sent in batches of at most max_records.
+
+    GIVEN a buffered handler with a maximum of 10 records per batch
+    WHEN we log 25 records and flush the handler
+    THEN all the 25 records should be sent, in batches of at most 10 records
+    """
+    client = StubFirehoseClient()
+    handler = KinesisFirehoseDeliveryStreamHandler(buffered=True, max_records=10, flush_interval=60, client=client)
+    log(handler, 25)
+    handler.flush()
+    handler.close()
+    assert sum(len(batch) for batch in client.batches) == 25
+    assert max(len(batch) for batch in client.batches) <= 10
+
+
+def test_buffered_handler_retries_failed_records():
+    """Tests that only the records Firehose failed to put are sent again.
+
+    GIVEN a buffered handler whose client fails the first record once
+    WHEN we log 3 records and close the handler
+    THEN the failed record alone should be sent in a second batch
+    """
+    client = StubFirehoseClient(failures=1)
+    handler = KinesisFirehoseDeliveryStreamHandler(buffered=True, client=client)
+    log(handler, 3)
+    handler.close()
+    assert len(client.batches) == 2
+    assert client.batches[1] == [b'record 0']
+
+
+def test_buffered_handler_keeps_undelivered_records():
+    """Tests that records that cannot be delivered are written to the stream.
+
+    GIVEN a buffered handler whose client always fails the first record
+    WHEN we log a record and close the handler
+    THEN the record should be written to the stream
+    """
+    client = StubFirehoseClient(failures=10)
+    handler = KinesisFirehoseDeliveryStreamHandler(buffered=True, max_retries=1, client=client)
+    handler.setStream(io.StringIO())
+    stream = handler.stream
+    log(handler, 1)
+    handler.close()
+    assert handler.undelivered_records == 1
+    assert stream.getvalue() == 'record 0\n'
+
+
+def test_buffered_handler_delivers_after_a_fork_reset():
+    """Tests that a handler reset in a forked child starts a new sender and drops the parent's buffer.
+
+    GIVEN a buffered handler holding 5 records it has not sent
+    WHEN we fork, reset it in the child, log 3 records and close the handler
+    THEN the child should only send the 3 records logged after the reset
+    """
+    client = StubFirehoseClient()
+    handler = KinesisFirehoseDeliveryStreamHandler(buffered=True, max_records=100, flush_interval=60, client=client)
+    log(handler, 5)
+
+    pid = os.fork()
+    if pid == 0:
+        sent = len(client.batches)
+        handler.reset_after_fork()
+        log(handler, 3)
+        handler.close()
+        os._exit(0 if sum(len(batch) for batch in client.batches[sent:]) == 3 else 1)  # pylint: disable=W0212
+
+    _, status = os.waitpid(pid, 0)
+    handler.close()
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert sum(len(batch) for batch in client.batches) == 5
+
+
+def test_buffered_handler_reset_in_process_stops_its_sender():
+    """Tests that a handler reset in the process that started its sender stops the sender first.
+
+    GIVEN a buffered handler holding 5 records it has not sent
+    WHEN we reset it without forking, log 3 records and close the handler
+    THEN the 5 records should be sent before the reset and the 3 after it
+    """
+    client = StubFirehoseClient()
+    handler = KinesisFirehoseDeliveryStreamHandler(buffered=True, max_records=100, flush_interval=60, client=client)
+    log(handler, 5)
+    handler.reset_after_fork()
+    assert [len(batch) for batch in client.batches] == [5]
+
+    log(handler, 3)
+    handler.close()
+    assert [len(batch) for batch in client.batches] == [5, 3]
+
+
+def test_handler_spools_the_undelivered_records_and_replays_them(tmp_path):
+    """Tests that the records are kept on disk during an outage and delivered once the stream recovers.
+
+    GIVEN a handler with a spool, whose stream is unreachable
+    WHEN we log 3 records, bring the stream back up and replay the spool
+    THEN the records should be sent in order and the spool should be empty
+    """
+    client = UnreachableFirehoseClient()
+    handler = KinesisFirehoseDeliveryStreamHandler(client=client, spool_dir=str(tmp_path))
+    log(handler, 3)
+    assert handler.undelivered_records == 3
+    assert handler.spool.spooled_records == 3
+
+    assert not handler.spool.replay_once()
+    assert not client.batches
+
+    client.down = False
+    assert handler.spool.replay_once()
+    handler.close()
+    assert client.batches == [[b'record 0', b'record 1', b'record 2']]
+    assert handler.spool.replayed_records == 3
+    assert os.listdir(tmp_path) == []
+
+
+def test_handler_creates_its_spool_on_the_first_record(tmp_path):
+    """Tests that a handler that logs nothing touches no file and starts no thread.
+
+    GIVEN a handler with a spool directory that already holds a segment to replay
+    WHEN we create it without logging anything
+    THEN it should have no spool and no replay thread, until it logs a record
+    """
+    (tmp_path / '00000000000000000001-999999999.closed').write_bytes(b'\x00\x00\x00\x03abc')
+    client = StubFirehoseClient()
+    handler = KinesisFirehoseDeliveryStreamHandler(client=client, spool_dir=str(tmp_path))
+    assert handler.spool is None
+    assert 'firehose-spool-replay' not in [thread.name for thread in threading.enumerate()]
+
+    log(handler, 1)
+    assert handler.spool is not None
+    assert 'firehose-spool-replay' in [thread.name for thread in threading.enumerate()]
+    handler.close()
+
+
+def test_handler_spool_falls_back_to_the_default_size_on_an_invalid_setting(tmp_path, monkeypatch):
+    """Tests that an invalid spool size does not break the logging path.
+
+    GIVEN FIREHOSE_SPOOL_MAX_MB set to a value that is not an integer
+    WHEN a handler with a spool logs its first record
+    THEN the spool should be created with the default size
+    """
+    monkeypatch.setenv('FIREHOSE_SPOOL_MAX_MB', 'abc')
+    handler = KinesisFirehoseDeliveryStreamHandler(client=StubFirehoseClient(), spool_dir=str(tmp_path))
+    log(handler, 1)
+    handler.close()
+
+    assert handler.spool.max_bytes == 64 * 1024 * 1024
+
+
+def test_spool_reset_in_process_stops_its_replay_thread(tmp_path):
+    """Tests that a spool reset in the process that started its replay thread stops the thread first.
+
+    GIVEN a spool replaying a segment, with a record in its open segment
+    WHEN we reset it without forking
+    THEN the old replay thread should be stopped and the open segment closed, to be replayed
+    """
+    spool = FirehoseSpool(str(tmp_path), lambda records: records, replay_interval=60)
+    spool.append([b'abc'])
+    replayers = [thread for thread in threading.enumerate() if thread.name == 'firehose-spool-replay']
+
+    spool.reset_after_fork()
+
+    assert not any(thread.is_alive() for thread in replayers)
+    assert [name.split('.')[-1] for name in os.listdir(tmp_path)] == ['closed']
+    spool.close()
+
+
+def test_spool_drops_the_oldest_segments_past_its_size_cap(tmp_path):
+    """Tests that the spool stays under its size cap.
+
+    GIVEN a spool of at most 1000 bytes, in segments of 100 bytes
+    WHEN we append 50 records of 100 bytes
+    THEN the oldest segments should be dropped and the newest records kept
+    """
+    spool = FirehoseSpool(str(tmp_path), lambda records: records, max_bytes=1000, segment_bytes=100,
+                          replay_interval=60)
+    for i in range(50):
+        spool.append([f'{i:03d}'.encode().ljust(100, b'.')])
+    spool.close()
+
+    names = sorted(os.listdir(tmp_path))
+    assert sum(os.path.getsize(tmp_path / name) for name in names) <= 1000 + 104
+    assert spool.dropped_bytes > 0
+    assert read_spool_segment(str(tmp_path / names[-1]))[0].startswith(b'049')
+
+
+def test_spool_recovers_the_segments_of_a_dead_worker(tmp_path):
+    """Tests that a segment left open by a worker that died is replayed by another one.
+
+    GIVEN an open segment written by a process that no longer exists
+    WHEN a new spool replays the directory
+    THEN its records should be delivered
+    """
+    delivered = []
+    with open(tmp_path / '00000000000000000001-999999999.open', 'wb') as f:
+        f.write(b'\x00\x00\x00\x03abc\x00\x00\x00\x09cut sh')
+
+    spool = FirehoseSpool(str(tmp_path), lambda records: delivered.extend(records) or [], replay_interval=0.01)
+    for _ in range(200):
+        if os.listdir(tmp_path) == []:
+            break
+        time.sleep(0.01)
+    spool.close()
+
+    assert delivered == [b'abc']
+    assert os.listdir(tmp_path) == []
+
+
+def test_aggregate_records_respects_the_record_limit():
+    """Tests that the lines are packed into newline delimited records under the limit.
+
+    GIVEN 2000 log lines of random text, which compress poorly
+    WHEN we aggregate them into records of at most 10 KiB, with and without gzip
+    THEN every record should be under the limit and the records should hold every line in order
+    """
+    rng = random.Random(0)
+    lines = [''.join(rng.choice('abcdefghij0123456789') for _ in range(rng.randint(20, 200))).encode()
+             for _ in range(2000)]
+
+    for compress in (False, True):
+        records = aggregate_records(lines, max_record_bytes=10 * 1024, compress=compress)
+        assert all(len(record) <= 10 * 1024 for record in records)
+        data = b''.join(gzip.decompress(record) if compress else record for record in records)
+        assert data.split(b'\n')[:-1] == lines
+
+    assert [len(batch) for batch in split_batches([b'x' * 10] * 7, max_records=3, max_bytes=1000)] == [3, 3, 1]
+    assert [len(batch) for batch in split_batches([b'x' * 10] * 7, max_records=10, max_bytes=25)] == [2, 2, 2, 1]
+
+
+def test_buffered_handler_aggregates_and_compresses_the_lines():
+    """Tests that the aggregating handler sends many lines in a few gzipped records.
+
+    GIVEN a buffered handler with aggregation and compression
+    WHEN we log 1000 records and close the handler
+    THEN a single gzipped record holding the 1000 lines should be sent
+    """
+    client = StubFirehoseClient()
+    handler = KinesisFirehoseDeliveryStreamHandler(buffered=True, client=client, aggregate=True, compress=True)
+    log(handler, 1000)
+    handler.close()
+
+    assert [len(batch) for batch in client.batches] == [1]
+    lines = gzip.decompress(client.batches[0][0]).decode().splitlines()
+    assert lines == [f'record {i}' for i in range(1000)]
+
+
+def test_buffered_handler_reads_the_aggregation_settings(monkeypatch):
+    """Tests that the aggregation settings accept every boolean the settings schema accepts.
+
+    GIVEN FIREHOSE_AGGREGATE and FIREHOSE_COMPRESS set to 1
+    WHEN we log 10 records through a buffered handler and close it
+    THEN a single gzipped record should be sent
+    """
+    monkeypatch.setenv('FIREHOSE_AGGREGATE', '1')
+    monkeypatch.setenv('FIREHOSE_COMPRESS', '1')
+    client = StubFirehoseClient()
+    handler = KinesisFirehoseDeliveryStreamHandler(buffered=True, client=client)
+    log(handler, 10)
+    handler.close()
+
+    assert [len(batch) for batch in client.batches] == [1]
+    assert gzip.decompress(client.batches[0][0]).decode().splitlines() == [f'record {i}' for i in range(10)]
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""This module tests the asynchronous logging pipeline."""
+import logging
+import time
+
+from api.blueprints.client_errors import log_client_error
+from api.blueprints.exceptions import InvalidEmailAddressFormat
+from api.blueprints.extensions import app_logger
+from api.config.logging_config import (
+    BoundedQueueHandler,
+    DeduplicatingFilter,
+    enable_queue_logging,
+    queue_listeners,
+    reset_logging_after_fork,
+)
+
+
+class ListHandler(logging.Handler):
+    """Keep the formatted records in a list."""
+
+    def __init__(self):
+        """Create the handler."""
+        logging.Handler.__init__(self)
+        self.messages = []
+
+    def emit(self, record):
+        """Keep the formatted record."""
+        self.messages.append(self.format(record))
+
+
+def make_record(msg: str, level: int = logging.INFO) -> logging.LogRecord:
+    """Create a log record."""
+    return logging.makeLogRecord({'msg': msg, 'levelno': level, 'levelname': logging.getLevelName(level)})
+
+
+def test_queue_logging_hands_records_to_the_handlers():
+    """Tests that the records logged are handled by the logger's original handlers.
+
+    GIVEN a logger with a handler that has been moved behind the queue
+    WHEN we log a record with arguments and stop the listener
+    THEN the handler should get the formatted record
+    """
+    logger = logging.getLogger('test_queue_logging')
+    logger.propagate = False
+    handler = ListHandler()
+    logger.addHandler(handler)
+    listener = enable_queue_logging(logger)
+    logger.warning('Hello %s', 'world')
+    listener.stop()
+    assert isinstance(logger.handlers[0], BoundedQueueHandler)
+    assert handler.messages == ['Hello world']
+
+
+def test_reset_logging_after_fork_restarts_the_listeners():
+    """Tests that a forked worker gets a new queue and listener thread, and resets its handlers.
+
+    GIVEN a logger whose handler has been moved behind the queue
+    WHEN we reset the logging as a forked worker would and log a record
+    THEN the handler should be reset and the record handled by the new listener
+    """
+    class ResettableHandler(ListHandler):
+        """Count the resets."""
+
+        resets = 0
+
+        def reset_after_fork(self):
+            """Count the reset."""
+            self.resets += 1
+
+    logger = logging.getLogger('test_reset_logging_after_fork')
+    logger.propagate = False
+    handler = ResettableHandler()
+    logger.addHandler(handler)
+    listener = enable_queue_logging(logger)
+    old_queue = listener.queue
+
+    try:
+        reset_logging_after_fork()
+        logger.warning('Hello %s', 'worker')
+    finally:
+        listener.stop()
+        queue_listeners.remove((logger.handlers[0], listener))
+
+    assert listener.queue is not old_queue
+    assert logger.handlers[0].queue is listener.queue
+    assert handler.resets == 1
+    assert handler.messages == ['Hello worker']
+
+
+def test_queue_logging_drop_oldest():
+    """Tests that the oldest records are dropped when the queue is full.
+
+    GIVEN a queue handler with room for 2 records and the drop-oldest policy
+    WHEN we log 5 records
+    THEN the last 2 records should be queued and 3 should be counted as dropped
+    """
+    handler = BoundedQueueHandler(maxsize=2, overflow='drop-oldest')
+    for i in range(5):
+        handler.handle(make_record(f'record {i}'))
+    assert handler.dropped_records == 3
+    assert handler.queue_depth == 2
+    assert [handler.queue.get().msg for _ in range(2)] == ['record 3', 'record 4']
+
+
+def test_queue_logging_drop_debug():
+    """Tests that only records below WARNING are dropped when the queue is full.
+
+    GIVEN a full queue handler with the drop-debug policy
+    WHEN we log an INFO record
+    THEN the record should be dropped
+    """
+    handler = BoundedQueueHandler(maxsize=1, overflow='drop-debug')
+    handler.handle(make_record('error', logging.ERROR))
+    handler.handle(make_record('info'))
+    assert handler.dropped_records == 1
+    assert handler.queue.get().msg == 'error'
+
+
+def test_deduplicating_filter_suppresses_repeats_and_summarizes_them():
+    """Tests that the repeats of a record are suppressed and summarized.
+
+    GIVEN a handler with a deduplicating filter letting through 2 similar records per window
+    WHEN we log the same record 10 times and another record once, then log again after the window
+    THEN we should get 2 repeats, the other record, a summary of the 8 suppressed repeats and the new record
+    """
+    handler = ListHandler()
+    dedup_filter = DeduplicatingFilter(handler, window=0.05, burst=2)
+    handler.addFilter(dedup_filter)
+
+    for _ in range(10):
+        handler.handle(make_record('The email address is invalid'))
+    handler.handle(make_record('Another message'))
+    time.sleep(0.06)
+    handler.handle(make_record('The email address is invalid'))
+
+    assert dedup_filter.suppressed_records == 8
+    assert handler.messages == [
+        'The email address is invalid',
+        'The email address is invalid',
+        'Another message',
+        'Suppressed 8 similar records in 0.05s: The email address is invalid',
+        'The email address is invalid',
+    ]
+
+
+def test_deduplicating_filter_flushes_the_pending_summaries():
+    """Tests that the summaries of the current windows are sent on flush.
+
+    GIVEN a deduplicating filter that suppressed 3 WARNING records
+    WHEN we flush it
+    THEN we should get a WARNING summary of the 3 records
+    """
+    handler = ListHandler()
+    dedup_filter = DeduplicatingFilter(handler, window=60, burst=1)
+    handler.addFilter(dedup_filter)
+    for _ in range(4):
+        handler.handle(make_record('warning', logging.WARNING))
+    handler.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+
+    dedup_filter.flush()
+
+    assert handler.messages == ['warning', 'WARNING Suppressed 3 similar records in 60s: warning']
+
+
+def test_deduplicating_filter_groups_the_client_errors_by_their_format():
+    """Tests that the client errors are deduplicated even though their arguments differ.
+
+    GIVEN a deduplicating filter letting through 2 similar records per window on the app logger
+    WHEN we log 5 client errors with different messages
+    THEN the first 2 should be logged with their own messages and the other 3 suppressed
+    """
+    handler = ListHandler()
+    dedup_filter = DeduplicatingFilter(handler, window=60, burst=2)
+    handler.addFilter(dedup_filter)
+    app_logger.addHandler(handler)
+    try:
+        for i in range(5):
+            log_client_error(InvalidEmailAddressFormat(f'The email address invalid{i} is invalid'))
+    finally:
+        app_logger.removeHandler(handler)
+
+    assert dedup_filter.suppressed_records == 3
+    assert handler.messages == [
+        'Client error invalid_email_address_format: The email address invalid0 is invalid',
+        'Client error invalid_email_address_format: The email address invalid1 is invalid',
+    ]
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""This module tests the routing of the read only queries to the replica database."""
+import pytest
+from api import create_app, db
+from api.blueprints.cache import cache
+from api.blueprints.replica import get_read_session, last_writes
+from api.config.config import TestingConfig
+from flask_jwt_extended import verify_jwt_in_request
+from sqlalchemy import event
+
+
+class ReplicaTestingConfig(TestingConfig):
+    """The test configuration, with the test database standing in for the replica."""
+
+    SQLALCHEMY_BINDS = {'replica': TestingConfig.SQLALCHEMY_DATABASE_URI}
+    REPLICA_STICKY_SECONDS = 60
+
+
+replica_app = create_app(ReplicaTestingConfig)
+
+
+class UncachedReplicaTestingConfig(ReplicaTestingConfig):
+    """The replica test configuration, without a cache."""
+
+    CACHE_BACKEND = 'none'
+
+
+uncached_replica_app = create_app(UncachedReplicaTestingConfig)
+
+
+def log_in(client) -> dict:
+    """Register and log in an admin, returning the authorization headers."""
+    admin_data = {'email': 'admin@example.com', 'name': 'admin1', 'password': 'pass!word'}
+    client.post('/auth/register', json=admin_data)
+    resp = client.post('/auth/login', json={'email': admin_data['email'], 'password': admin_data['password']})
+    return {'Authorization': f"Bearer {resp.json['access token']}"}
+
+
+@pytest.mark.usefixtures('client')
+def test_reads_go_to_the_replica():
+    """Tests that the reads of an admin who has not written anything use the replica.
+
+    GIVEN an app with a replica database
+    WHEN an admin who has not written anything gets the users
+    THEN the read session should be bound to the replica engine
+    """
+    last_writes.clear()
+    replica_client = replica_app.test_client()
+    headers = log_in(replica_client)
+    assert replica_client.get('/users', headers=headers).status_code == 200
+
+    with replica_app.test_request_context(headers=headers):
+        verify_jwt_in_request()
+        session = get_read_session()
+        assert session is not db.session
+        assert session.bind is db.get_engine(replica_app, 'replica')
+
+
+@pytest.mark.usefixtures('client')
+def test_reads_stick_to_the_primary_after_a_write():
+    """Tests that the reads of an admin who has just written use the primary.
+
+    GIVEN an app with a replica database
+    WHEN an admin creates a user
+    THEN the admin's reads should use the primary session
+    """
+    last_writes.clear()
+    replica_client = replica_app.test_client()
+    headers = log_in(replica_client)
+    resp = replica_client.post('/user', headers=headers, json={'email': 'user@example.com'})
+    assert resp.status_code == 201
+
+    with replica_app.test_request_context(headers=headers):
+        verify_jwt_in_request()
+        assert get_read_session() is db.session
+
+
+@pytest.mark.usefixtures('client')
+def test_cache_is_filled_from_the_primary():
+    """Tests that a cache miss reads the user from the primary, not the replica.
+
+    GIVEN an app with a replica database and a user that is not cached
+    WHEN an admin who has not written recently gets the user
+    THEN no query on the users should run on the replica
+    """
+    replica_client = replica_app.test_client()
+    headers = log_in(replica_client)
+    user_id = replica_client.post('/user', headers=headers, json={'email': 'user@example.com'}).json['id']
+    last_writes.clear()
+    with replica_app.app_context():
+        cache.clear()
+        engine = db.get_engine(replica_app, 'replica')
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):  # pylint: disable=W0613
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        resp = replica_client.get('/user', headers=headers, query_string={'id': user_id})
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    assert resp.json['email'] == 'user@example.com'
+    assert not [statement for statement in statements if 'FROM users' in statement]
+
+
+@pytest.mark.usefixtures('client')
+def test_uncached_user_is_read_from_the_replica():
+    """Tests that a user that will not be cached is read from the replica.
+
+    GIVEN an app with a replica database and no cache
+    WHEN an admin who has not written recently gets a user
+    THEN the query on the users should run on the replica
+    """
+    uncached_client = uncached_replica_app.test_client()
+    headers = log_in(uncached_client)
+    user_id = uncached_client.post('/user', headers=headers, json={'email': 'user@example.com'}).json['id']
+    last_writes.clear()
+    with uncached_replica_app.app_context():
+        engine = db.get_engine(uncached_replica_app, 'replica')
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):  # pylint: disable=W0613
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        resp = uncached_client.get('/user', headers=headers, query_string={'id': user_id})
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    assert resp.json['email'] == 'user@example.com'
+    assert [statement for statement in statements if 'FROM users' in statement]
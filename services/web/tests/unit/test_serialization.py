@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""This module tests the JSON encoders."""
+import json
+
+from api.blueprints.auth.models import Admin
+from api.blueprints.default.models import User
+from api.serialization import ModelJSONEncoder, OrjsonEncoder
+from flasgger import LazyString
+
+
+def make_user() -> User:
+    """Create a user without a database."""
+    user = User(email='user@example.com')
+    user.id = 1
+    user.active = True
+    return user
+
+
+def test_encoders_serialize_the_models_with_their_fields():
+    """Tests that both encoders serialize the models with their explicit fields and the LazyStrings.
+
+    GIVEN a user, an admin and a LazyString
+    WHEN we encode them with the stdlib and orjson encoders
+    THEN both should give the same JSON, without the admin's password
+    """
+    admin = Admin(email='admin@example.com', name='admin1', password='pass!word')
+    admin.id = 2
+    data = {'user': make_user(), 'admin': admin, 'host': LazyString(lambda: 'api.example.com')}
+
+    stdlib = ModelJSONEncoder(sort_keys=True, separators=(',', ':')).encode(data)
+    fast = OrjsonEncoder(sort_keys=True, separators=(',', ':')).encode(data)
+
+    assert stdlib == fast
+    assert json.loads(fast) == {
+        'user': {'id': 1, 'email': 'user@example.com', 'active': True},
+        'admin': {'id': 2, 'email': 'admin@example.com', 'name': 'admin1'},
+        'host': 'api.example.com',
+    }
+
+
+def test_users_page_is_served_by_the_app_encoder(client, auth_headers):
+    """Tests that the app serializes a page of users with the configured encoder.
+
+    GIVEN the app with the orjson encoder and a user
+    WHEN we get the users
+    THEN the user should be serialized with its fields
+    """
+    assert client.application.json_encoder is OrjsonEncoder
+    client.post('/user', headers=auth_headers, json={'email': 'user@example.com'})
+    resp = client.get('/users', headers=auth_headers)
+    assert resp.json['users'] == [{'id': 1, 'email': 'user@example.com', 'active': True}]
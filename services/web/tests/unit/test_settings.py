@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""This module tests the validation of the settings."""
+from api.config.settings import SETTINGS, get_setting, validate_settings
+
+
+def required_settings() -> dict:
+    """Create an environment with every required setting."""
+    environ = {name: 'value' for name, schema in SETTINGS.items() if schema.get('required')}
+    environ.update({'FLASK_ENV': 'test', 'POSTGRES_PORT': '5432'})
+    return environ
+
+
+def test_settings_defaults():
+    """Tests that the optional settings get their defaults.
+
+    GIVEN an environment with only the required settings
+    WHEN we validate the settings
+    THEN there should be no errors and the optional settings should be set to their defaults
+    """
+    settings, errors = validate_settings(required_settings())
+    assert not errors
+    assert settings['POSTGRES_PORT'] == 5432
+    assert settings['DATABASE_CHECK_ENABLED'] is True
+
+
+def test_settings_reports_every_error():
+    """Tests that all the invalid settings are reported at once.
+
+    GIVEN an environment with a missing, an invalid and a mistyped setting
+    WHEN we validate the settings
+    THEN all three errors should be reported
+    """
+    environ = required_settings()
+    del environ['SECRET_KEY']
+    environ.update({'FLASK_ENV': 'prod', 'DATABASE_CHECK_TIMEOUT': 'soon'})
+    _, errors = validate_settings(environ)
+    assert len(errors) == 3
+
+
+def test_get_setting_parses_the_value_or_falls_back_to_the_default():
+    """Tests that a single setting is parsed or defaulted like in the full validation.
+
+    GIVEN an environment setting the cache TTL but not the cache backend
+    WHEN we get both settings
+    THEN the TTL should be parsed and the backend should get its default
+    """
+    environ = {'CACHE_TTL': '30'}
+    assert get_setting('CACHE_TTL', environ) == 30
+    assert get_setting('CACHE_BACKEND', environ) == SETTINGS['CACHE_BACKEND']['default']
+
+
+def test_get_setting_leaves_invalid_values_to_the_validation():
+    """Tests that an invalid setting read at import time does not raise.
+
+    GIVEN an environment with an invalid queue size and a log queue enabled with 1
+    WHEN we get the settings and validate the environment
+    THEN the size should get its default, the queue should be enabled and the validation should report the size
+    """
+    environ = dict(required_settings(), LOG_QUEUE_SIZE='abc', LOG_QUEUE_ENABLED='1')
+    assert get_setting('LOG_QUEUE_SIZE', environ) == SETTINGS['LOG_QUEUE_SIZE']['default']
+    assert get_setting('LOG_QUEUE_ENABLED', environ) is True
+    _, errors = validate_settings(environ)
+    assert errors == ['The LOG_QUEUE_SIZE has to be an integer.']
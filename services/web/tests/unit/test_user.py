@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""This module tests the user route."""
+
+
+def test_create_existing_user(client, auth_headers):
+    """Tests that a user cannot be created twice.
+
+    GIVEN we have a user
+    WHEN we send a POST request with the same email
+    THEN we should get a 400 error code in the response
+    """
+    resp = client.post('/user', json={'email': 'test@example.com'}, headers=auth_headers)
+    assert resp.status_code == 201
+    resp = client.post('/user', json={'email': 'test@example.com'}, headers=auth_headers)
+    assert resp.status_code == 400
+
+
+def test_update_user_to_existing_email(client, auth_headers):
+    """Tests that a user cannot take another user's email.
+
+    GIVEN we have two users
+    WHEN we send a PUT request setting the first user's email to the second user's
+    THEN we should get a 400 error code in the response
+    """
+    user_id = client.post('/user', json={'email': 'test@example.com'}, headers=auth_headers).json['id']
+    client.post('/user', json={'email': 'test1@example.com'}, headers=auth_headers)
+    resp = client.put(f'/user?id={user_id}', json={'email': 'test1@example.com'}, headers=auth_headers)
+    assert resp.status_code == 400
+
+
+def test_delete_missing_user(client, auth_headers):
+    """Tests that deleting a user that does not exist fails.
+
+    GIVEN we have a deleted user
+    WHEN we send a DELETE request for the same user
+    THEN we should get a 400 error code in the response
+    """
+    user_id = client.post('/user', json={'email': 'test@example.com'}, headers=auth_headers).json['id']
+    resp = client.delete(f'/user?id={user_id}', headers=auth_headers)
+    assert resp.status_code == 200
+    resp = client.delete(f'/user?id={user_id}', headers=auth_headers)
+    assert resp.status_code == 400
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""This module tests the users route."""
+import logging
+
+from api import db
+from api.blueprints.constants import EXPORT_IDLE_IN_TRANSACTION_TIMEOUT
+from api.blueprints.default.helpers import export_users, get_all_users
+from api.blueprints.default.models import User, UserRow
+from sqlalchemy import text
+
+
+def seed_users(client, count: int) -> None:
+    """Add the given number of users."""
+    with client.application.app_context():
+        for i in range(count):
+            db.session.add(User(email=f'test{i}@example.com'))
+        db.session.commit()
+
+
+def test_users_first_page(client):
+    """Tests that the users route returns the first page of users.
+
+    GIVEN we have 5 users
+    WHEN we send a GET request with a limit of 2
+    THEN we should get 2 users and a cursor for the next page
+    """
+    seed_users(client, 5)
+    resp = client.get('/users?limit=2')
+    assert resp.status_code == 200
+    assert len(resp.json['users']) == 2
+    assert resp.json['metadata']['count'] == 2
+    assert resp.json['metadata']['next']
+
+
+def test_users_follow_cursor(client):
+    """Tests that following the cursors returns every user exactly once.
+
+    GIVEN we have 5 users
+    WHEN we follow the next cursor until it is null
+    THEN we should get all the 5 users in order of their id
+    """
+    seed_users(client, 5)
+    ids, cursor = [], ''
+    while cursor is not None:
+        resp = client.get(f'/users?limit=2&next={cursor}')
+        ids.extend(user['id'] for user in resp.json['users'])
+        cursor = resp.json['metadata']['next']
+    assert ids == sorted(ids)
+    assert len(ids) == 5
+
+
+def test_users_success_is_logged_after_the_page_is_built(client, caplog):
+    """Tests that only a handled request to the users route is logged as a success.
+
+    GIVEN we have the /users route
+    WHEN we send a valid GET request and one with an invalid cursor
+    THEN only the valid request should log a success
+    """
+    with caplog.at_level(logging.INFO):
+        client.get('/users?limit=2')
+        client.get('/users?next=not-a-cursor')
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert len([message for message in messages if message.startswith('Successfully handled a GET request')]) == 1
+
+
+def test_users_limit_is_capped(client):
+    """Tests that the page size cannot exceed the server side maximum.
+
+    GIVEN we have the /users route
+    WHEN we send a GET request with a very large limit
+    THEN the limit in the metadata should be the maximum page size
+    """
+    resp = client.get('/users?limit=100000')
+    assert resp.status_code == 200
+    assert resp.json['metadata']['limit'] == 100
+
+
+def test_users_invalid_cursor(client):
+    """Tests that an invalid cursor is rejected.
+
+    GIVEN we have the /users route
+    WHEN we send a GET request with a cursor that was not issued by the api
+    THEN we should get a 400 error code in the response
+    """
+    resp = client.get('/users?next=not-a-cursor')
+    assert resp.status_code == 400
+
+
+def test_users_export_csv(client, auth_headers):
+    """Tests that the users can be exported as CSV.
+
+    GIVEN we have 3 users
+    WHEN we send a GET request to /users/export with the csv format
+    THEN we should get a header row and a row for every user
+    """
+    seed_users(client, 3)
+    resp = client.get('/users/export?format=csv', headers=auth_headers)
+    assert resp.status_code == 200
+    assert resp.mimetype == 'text/csv'
+    assert len(resp.data.decode().splitlines()) == 4
+
+
+def test_users_export_outlives_the_idle_in_transaction_timeout(client):
+    """Tests that the export transaction is exempt from the engine's idle timeout.
+
+    GIVEN we have 3 users
+    WHEN we start streaming the export
+    THEN its transaction should use the export idle in transaction timeout
+    """
+    seed_users(client, 3)
+    with client.application.test_request_context():
+        chunks = export_users()
+        next(chunks)
+        timeout = db.session.execute(text('SHOW idle_in_transaction_session_timeout')).scalar()
+        chunks.close()
+
+    assert timeout == f'{EXPORT_IDLE_IN_TRANSACTION_TIMEOUT // 60000}min'
+
+
+def test_users_export_invalid_format(client, auth_headers):
+    """Tests that an unsupported export format is rejected.
+
+    GIVEN we have the /users/export route
+    WHEN we send a GET request with an unsupported format
+    THEN we should get a 400 error code in the response
+    """
+    resp = client.get('/users/export?format=xml', headers=auth_headers)
+    assert resp.status_code == 400
+
+
+def test_users_bulk_create(client, auth_headers):
+    """Tests that many users can be created in one request.
+
+    GIVEN we have an existing user
+    WHEN we send a POST request to /users/bulk with new, existing, repeated and invalid emails
+    THEN we should get the status of every email in the order they were given
+    """
+    seed_users(client, 1)
+    emails = ['test0@example.com', 'new@example.com', 'new@example.com', 'invalid']
+    resp = client.post('/users/bulk', json={'emails': emails}, headers=auth_headers)
+    assert resp.status_code == 201
+    assert [user['status'] for user in resp.json['users']] == ['exists', 'created', 'duplicate', 'invalid']
+    assert resp.json['summary']['created'] == 1
+
+
+def test_users_bulk_update_and_delete(client, auth_headers):
+    """Tests that users can be deactivated and deleted in bulk.
+
+    GIVEN we have 3 users
+    WHEN we deactivate 2 of them by id and then delete the inactive users
+    THEN only the remaining active user should be left
+    """
+    seed_users(client, 3)
+    ids = [user['id'] for user in client.get('/users').json['users']]
+    resp = client.put('/users/bulk', json={'ids': ids[:2], 'data': {'active': False}}, headers=auth_headers)
+    assert resp.status_code == 200
+    assert resp.json['affected'] == 2
+    resp = client.delete('/users/bulk', json={'filter': {'active': False}}, headers=auth_headers)
+    assert resp.status_code == 200
+    assert resp.json['affected'] == 2
+    assert [user['id'] for user in client.get('/users').json['users']] == ids[2:]
+
+
+def test_users_are_read_into_untracked_rows(client):
+    """Tests that a page of users is read into UserRows without loading User objects into the session.
+
+    GIVEN we have 3 users
+    WHEN we get the page of users
+    THEN the users should be UserRows and the session should track no users
+    """
+    seed_users(client, 3)
+    with client.application.test_request_context():
+        users = get_all_users()['users']
+        assert [type(user) for user in users] == [UserRow] * 3
+        assert [user.email for user in users] == ['test0@example.com', 'test1@example.com', 'test2@example.com']
+        assert not list(db.session.identity_map.values())
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""This module tests the schema validation of the request payloads."""
+import pytest
+from api.blueprints.exceptions import (
+    AdminPasswordNotAlphaNumeric,
+    EmailAddressTooLong,
+    EmptyUserData,
+    InvalidEmailAddressFormat,
+    MissingNameKey,
+)
+from api.blueprints.validation import ADMIN_SCHEMA, ADMIN_UPDATE_SCHEMA, USER_SCHEMA
+
+
+def test_schema_collects_every_error_and_raises_the_first():
+    """Tests that a payload is checked in one pass.
+
+    GIVEN an admin payload with an invalid email, no name and an alphanumeric password
+    WHEN we validate it
+    THEN we should get the exception of the email error, with the messages of all three
+    """
+    payload = {'email': 'not-an-email', 'password': 'password123'}
+
+    with pytest.raises(InvalidEmailAddressFormat) as error:
+        ADMIN_SCHEMA.validate(payload)
+
+    assert [(exception, field) for exception, _, field in ADMIN_SCHEMA.errors(payload)] == [
+        (InvalidEmailAddressFormat, 'email'), (MissingNameKey, 'name'), (AdminPasswordNotAlphaNumeric, 'password')
+    ]
+    assert error.value.field == 'email'
+    assert len(error.value.errors) == 3
+    assert str(error.value) == '; '.join(error.value.errors)
+
+
+def test_field_stops_at_its_first_failing_check():
+    """Tests that the checks of a field stop at the first one that fails.
+
+    GIVEN an email that is both too long and invalid
+    WHEN we validate it
+    THEN we should only get the length error
+    """
+    with pytest.raises(EmailAddressTooLong) as error:
+        USER_SCHEMA.validate({'email': 'a' * 200})
+
+    assert len(error.value.errors) == 1
+
+
+def test_schema_rejects_empty_payloads_and_unknown_keys():
+    """Tests the payload level checks.
+
+    GIVEN an empty payload and an update payload with an unknown key
+    WHEN we validate them
+    THEN we should get the empty data and key errors
+    """
+    with pytest.raises(EmptyUserData):
+        USER_SCHEMA.validate({})
+
+    with pytest.raises(KeyError):
+        ADMIN_UPDATE_SCHEMA.validate({'role': 'admin'})
+
+    ADMIN_UPDATE_SCHEMA.validate({'name': 'lyle'})
+
+
+def test_create_admin_reports_every_error(client):
+    """Tests that the API reports all the errors of a payload at once.
+
+    GIVEN an admin payload with an invalid email and a short name
+    WHEN we post it to the /auth/register route
+    THEN we should get a 400 with both errors
+    """
+    resp = client.post('/auth/register', json={'email': 'invalid', 'name': 'ly', 'password': 'secret#123'})
+
+    assert resp.status_code == 400
+    assert 'The email address is invalid' in resp.json['error']
+    assert 'The admin_name has to be more than' in resp.json['error']